@@ -2,6 +2,7 @@
 # 说明：
 # 本脚本演示如何用线性回归学习“平均分”的计算。
 # 流程包含：造数据 -> 计算真实平均分 -> 划分数据集 -> 训练 -> 评估 -> 预测 -> 查看参数 -> 保存模型。
+# 成绩表很大、无法一次读入内存（CSV/Parquet）时，使用 avgscore_stream.py：分块并行累加统计量，结果与本脚本的模型一致。
 
 import numpy as np, pandas as pd  # numpy: 数值计算；pandas: 表格数据处理
 from sklearn.model_selection import train_test_split  # 划分训练/测试集的便捷函数
@@ -0,0 +1,281 @@
+# file: avgscore_stream.py
+# 说明：
+# 本脚本用“流式 + 闭式解”训练 avgscore.py 中的平均分线性回归，用于放不进内存的大成绩表（CSV 或 Parquet）。
+# avgscore.py 把整张表读入内存后调用 LinearRegression().fit；这里改为：
+# 1) 把文件切成若干块（CSV 按字节范围切、在换行处对齐；Parquet 按 row group 切），每块只在读取时占用内存；
+# 2) 每块计算“充分统计量”：样本数 n、均值、以及 [X, y] 去均值后的叉积矩阵（其中包含 XᵀX 与 Xᵀy），
+#    各块在进程池中并行计算，再两两合并（合并公式见 merge_stats）；
+# 3) 全部合并后只求解一次正规方程 XᵀX w = Xᵀy，得到权重与截距，结果与 LinearRegression 在数值上一致；
+# 4) 再并行扫描一遍测试集部分，累加 |残差|、残差² 和 y 的统计量，得到 MAE 与 R²。
+#
+# 训练/测试划分：无法像 train_test_split 那样先把全部行读进来再打乱，
+# 这里对每一行的数值计算哈希，哈希值落在前 test_size 比例的行作为测试集。
+# 划分结果与分块方式、进程数无关，每次运行都相同（但与 avgscore.py 的 train_test_split 划分不同）。
+# 含缺失值（空白、NaN）的行不参与训练和评估，跳过的行数会打印出来。
+#
+# 运行示例：
+#     python avgscore_stream.py --make 10000000 --data scores.csv      # 先生成 1000 万行的示例成绩表
+#     python avgscore_stream.py --data scores.csv --jobs 4
+#     python avgscore_stream.py --data scores.parquet --features 语文 数学 英文 --target 平均分
+# 表中没有目标列（默认“平均分”）时，与 avgscore.py 一样按行求各科平均分作为 y。
+
+import argparse  # 命令行参数
+import io  # BytesIO: 把字节块交给 pandas 解析
+import os  # 文件与路径操作
+import time  # 计时
+from concurrent.futures import ProcessPoolExecutor  # 进程池：各块并行计算
+from functools import reduce  # 把各块的统计量依次合并
+
+import numpy as np, pandas as pd  # numpy: 数值计算；pandas: 表格数据处理
+from sklearn.linear_model import LinearRegression  # 训练结果装进 LinearRegression，用法与 avgscore.py 相同
+import joblib  # 模型的持久化保存
+
+DEFAULT_FEATURES = ["语文", "数学", "英文"]  # 与 avgscore.py 相同的特征列
+DEFAULT_TARGET = "平均分"                     # 目标列；表中没有时按行求平均
+DEFAULT_CHUNK_BYTES = 32 * 2 ** 20            # CSV 每块的字节数（32MB）
+DEFAULT_TEST_SIZE = 0.3                       # 测试集比例，与 avgscore.py 相同
+HASH_BUCKETS = 10_000                         # 按哈希划分时的桶数，test_size 精确到 0.0001
+
+
+# 1) 切块与读取
+def make_tasks(path, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """
+    把数据文件切成若干块，返回 (任务列表, 文件中的全部列名)；每个任务是一个元组，子进程据此自行读取对应的数据。
+
+    CSV：("csv", 路径, 起始字节, 结束字节, 全部列名)，第一块从表头之后开始；
+    Parquet：("parquet", 路径, row group 编号)。
+    """
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq  # 读取 Parquet 需要 pip install pyarrow
+        pf = pq.ParquetFile(path)
+        return [("parquet", path, i) for i in range(pf.num_row_groups)], pf.schema_arrow.names
+    header = list(pd.read_csv(path, nrows=0).columns)  # 只读表头
+    with open(path, "rb") as f:
+        f.readline()
+        start = f.tell()  # 数据从表头的下一行开始
+    size = os.path.getsize(path)
+    return [("csv", path, s, min(s + chunk_bytes, size), header) for s in range(start, size, chunk_bytes)], header
+
+
+def read_task(task, usecols):
+    """读取一个任务对应的数据块，返回只含 usecols 各列（按 usecols 顺序）的 DataFrame（列类型与文件中相同）。"""
+    if task[0] == "parquet":
+        import pyarrow.parquet as pq
+        _, path, group = task
+        return pq.ParquetFile(path).read_row_group(group, columns=usecols).to_pandas()
+    _, path, start, end, header = task
+    with open(path, "rb") as f:
+        # 一行属于“起始位置落在 [start, end) 内”的那一块：
+        # 从 start-1 读到换行为止，丢掉上一块的半行（start 恰好是行首时只读到一个换行符）
+        f.seek(start - 1)
+        f.readline()
+        data = f.read(max(end - f.tell(), 0))
+        if data and not data.endswith(b"\n"):
+            data += f.readline()  # 最后一行跨过了 end，把它读完整
+    if not data.strip():
+        return pd.DataFrame(columns=usecols)
+    return pd.read_csv(io.BytesIO(data), header=None, names=header, usecols=usecols)[usecols]
+
+
+def read_clean(task, usecols):
+    """
+    读取数据块，统一转为 float64 并去掉含缺失值的行，返回 (DataFrame, 去掉的行数)。
+
+    read_csv 对每块单独推断列类型：某块里出现一个小数或空白，整列就会变成 float64，
+    而同一行按 int64 和 float64 计算的哈希不同。统一类型后，一行落在哪个集合才与分块方式无关。
+    """
+    df = read_task(task, usecols).astype("float64")
+    clean = df.dropna()
+    return clean, len(df) - len(clean)
+
+
+def split_xy(df, features, target):
+    """从数据块取出特征矩阵 X 和目标 y；没有目标列时按行求平均（同 avgscore.py 第 2 步）。"""
+    X = df[features].to_numpy(dtype=float)
+    y = df[target].to_numpy(dtype=float) if target in df.columns else X.mean(axis=1)
+    return X, y
+
+
+def eval_mask(df, test_size=DEFAULT_TEST_SIZE, seed=0):
+    """
+    按每行数值的哈希划分训练/测试集，返回布尔数组（True 表示测试集）。
+
+    同一行无论落在哪一块、由哪个进程读取，哈希值都相同，因此划分结果可复现。
+    哈希与列类型有关（3 与 3.0 的哈希不同），所以先统一转为 float64。
+    """
+    key = f"{seed:016d}"[-16:]  # 哈希密钥必须是 16 个字符，不同 seed 得到不同划分
+    h = pd.util.hash_pandas_object(df.astype("float64"), index=False, hash_key=key).to_numpy()
+    return h % HASH_BUCKETS < int(round(test_size * HASH_BUCKETS))
+
+
+# 2) 充分统计量：(样本数 n, 均值向量, 去均值叉积矩阵)
+def chunk_moments(Z):
+    """计算一块数据 Z（每行一个样本）的统计量 (n, 均值, 去均值后的 ZᵀZ)。"""
+    if len(Z) == 0:
+        return 0, np.zeros(Z.shape[1]), np.zeros((Z.shape[1], Z.shape[1]))
+    mean = Z.mean(axis=0)
+    Zc = Z - mean
+    return len(Z), mean, Zc.T @ Zc
+
+
+def merge_stats(a, b):
+    """
+    合并两块数据的统计量，结果与把两块拼在一起直接计算相同。
+
+    不直接累加 XᵀX（成绩的平方和很大，相减求方差时会损失精度），而是保存均值与去均值后的叉积，
+    合并时用两块均值之差 d 修正：M = Ma + Mb + d dᵀ · na·nb / (na + nb)。
+    """
+    na, mean_a, Ma = a
+    nb, mean_b, Mb = b
+    if na == 0:
+        return b
+    if nb == 0:
+        return a
+    n = na + nb
+    d = mean_b - mean_a
+    return n, mean_a + d * (nb / n), Ma + Mb + np.outer(d, d) * (na * nb / n)
+
+
+def chunk_stats(task, usecols, features, target, test_size, seed):
+    """
+    子进程：读取一块数据，返回 (训练集部分 [X, y] 的统计量, 含缺失值而跳过的行数)。
+    """
+    from threadpoolctl import threadpool_limits  # scikit-learn 自带的依赖
+    with threadpool_limits(1):  # 每个进程只用一个线程，避免多个进程抢占同一批 CPU 核
+        df, n_dropped = read_clean(task, usecols)
+        X, y = split_xy(df, features, target)
+        test = eval_mask(df, test_size, seed)
+        Z = np.column_stack([X, y])[~test]
+        return chunk_moments(Z), n_dropped
+
+
+def chunk_errors(task, usecols, features, target, test_size, seed, coef, intercept):
+    """
+    子进程：读取一块数据，对测试集部分返回 (行数, |残差| 之和, 残差² 之和, y 的统计量)。
+    """
+    from threadpoolctl import threadpool_limits
+    with threadpool_limits(1):
+        df = read_clean(task, usecols)[0]
+        X, y = split_xy(df, features, target)
+        test = eval_mask(df, test_size, seed)
+        X, y = X[test], y[test]
+        r = y - (X @ coef + intercept)
+        return len(y), float(np.abs(r).sum()), float((r ** 2).sum()), chunk_moments(y[:, None])
+
+
+# 3) 求解与评估
+def solve(stats):
+    """由合并后的训练集统计量求解线性回归，返回 (权重, 截距)。"""
+    n, mean, M = stats
+    if n == 0:
+        raise ValueError("训练集为空")
+    p = len(mean) - 1
+    # 去均值后的正规方程：(Xc)ᵀXc w = (Xc)ᵀyc；lstsq 在特征共线时给出最小范数解，与 LinearRegression 相同
+    coef = np.linalg.lstsq(M[:p, :p], M[:p, p], rcond=None)[0]
+    intercept = mean[p] - mean[:p] @ coef
+    return coef, intercept
+
+
+def run_tasks(fn, tasks, args, jobs):
+    """对每个任务调用 fn(task, *args)；jobs > 1 时在进程池中并行执行，结果顺序与任务顺序相同。"""
+    if jobs == 1:
+        return [fn(task, *args) for task in tasks]
+    with ProcessPoolExecutor(max_workers=jobs) as ex:
+        futures = [ex.submit(fn, task, *args) for task in tasks]
+        return [f.result() for f in futures]
+
+
+def fit_stream(path, features=DEFAULT_FEATURES, target=DEFAULT_TARGET, test_size=DEFAULT_TEST_SIZE,
+               seed=0, jobs=None, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """
+    流式训练并评估平均分回归模型。
+
+    参数:
+        path: CSV 或 .parquet 文件路径
+        features: 特征列名列表
+        target: 目标列名；表中没有该列时按行求特征的平均值
+        test_size: 测试集比例
+        seed: 划分用的随机种子
+        jobs: 并行进程数，默认等于 CPU 核数；1 表示不开进程池
+        chunk_bytes: CSV 每块的字节数
+    返回:
+        (模型, 结果字典)。模型是设置好 coef_、intercept_ 的 LinearRegression，可直接 predict / joblib 保存；
+        结果字典包含训练/测试行数、跳过的行数、MAE、R²、块数和各阶段用时
+    """
+    jobs = jobs or os.cpu_count() or 1
+    tasks, columns = make_tasks(path, chunk_bytes)
+    usecols = list(features) + ([target] if target in columns and target not in features else [])
+    missing = [c for c in usecols if c not in columns]
+    if missing:
+        raise ValueError(f"{path} 中没有这些列: {missing}")
+    shared = (usecols, list(features), target, test_size, seed)
+
+    # 第一遍：各块统计量并行计算，合并后求解一次
+    t0 = time.perf_counter()
+    results = run_tasks(chunk_stats, tasks, shared, jobs)
+    stats = reduce(merge_stats, [r[0] for r in results], (0, np.zeros(len(features) + 1), 0))
+    coef, intercept = solve(stats)
+    t_fit = time.perf_counter() - t0
+
+    # 第二遍：只看测试集，累加 MAE 与 R² 需要的量
+    t0 = time.perf_counter()
+    errors = run_tasks(chunk_errors, tasks, shared + (coef, intercept), jobs)
+    n_test = sum(e[0] for e in errors)
+    sum_abs = sum(e[1] for e in errors)
+    sum_sq = sum(e[2] for e in errors)
+    y_stats = reduce(merge_stats, [e[3] for e in errors], (0, np.zeros(1), 0))
+    ss_tot = float(y_stats[2][0, 0]) if n_test else 0.0  # Σ(y - 测试集 y 均值)²，即 r2_score 的分母
+    t_eval = time.perf_counter() - t0
+
+    lr = LinearRegression()
+    lr.coef_, lr.intercept_, lr.n_features_in_ = coef, float(intercept), len(features)
+    report = {"n_train": stats[0], "n_test": n_test, "n_dropped": sum(r[1] for r in results), "chunks": len(tasks),
+              "mae": sum_abs / n_test if n_test else float("nan"),
+              "r2": 1 - sum_sq / ss_tot if ss_tot > 0 else float("nan"),
+              "fit_seconds": t_fit, "eval_seconds": t_eval}
+    return lr, report
+
+
+def make_scores_csv(path, n, seed=100, block_rows=1_000_000):
+    """
+    按 avgscore.py 的方式生成 n 行三科成绩（50~100 分的整数），分块写入 CSV，生成大文件时也不占太多内存。
+    n ≤ block_rows 时与 avgscore.py 生成的数据完全相同。
+    """
+    rng = np.random.default_rng(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(",".join(DEFAULT_FEATURES) + "\n")
+        for start in range(0, n, block_rows):
+            np.savetxt(f, rng.integers(50, 101, size=(min(block_rows, n - start), 3)), fmt="%d", delimiter=",")
+
+
+if __name__ == "__main__":  # 进程池在 Windows/macOS 上会重新导入本文件，入口代码必须放在这里
+    parser = argparse.ArgumentParser(description="平均分线性回归：流式闭式解训练（适合放不进内存的大成绩表）")
+    parser.add_argument("--data", type=str, default="scores.csv", help="CSV 或 .parquet 成绩表")
+    parser.add_argument("--make", type=int, default=None, help="先生成这么多行的示例成绩表（CSV）到 --data")
+    parser.add_argument("--features", nargs="+", default=DEFAULT_FEATURES, help="特征列")
+    parser.add_argument("--target", type=str, default=DEFAULT_TARGET, help="目标列（不存在时按行求平均）")
+    parser.add_argument("--test-size", type=float, default=DEFAULT_TEST_SIZE)
+    parser.add_argument("--jobs", type=int, default=None, help="并行进程数（默认等于 CPU 核数）")
+    parser.add_argument("--chunk-mb", type=int, default=DEFAULT_CHUNK_BYTES // 2 ** 20, help="CSV 每块的大小（MB）")
+    parser.add_argument("--save", type=str, default="avgscore_lr.joblib", help="模型保存路径")
+    args = parser.parse_args()
+
+    if args.make:
+        make_scores_csv(args.data, args.make)
+        print(f"✅ 已生成 {args.data}（{args.make} 行）")
+    if not os.path.exists(args.data):
+        raise SystemExit(f"❌ 未找到 {args.data}，可先用 --make 行数 生成示例成绩表")
+
+    lr, report = fit_stream(args.data, args.features, args.target, args.test_size,
+                            jobs=args.jobs, chunk_bytes=args.chunk_mb * 2 ** 20)
+    print(f"📁 {args.data}：{report['chunks']} 块，训练 {report['n_train']} 行，测试 {report['n_test']} 行")
+    if report["n_dropped"]:
+        print(f"⚠️ 跳过含缺失值的行 {report['n_dropped']} 行")
+    print(f"⏱ 训练用时 {report['fit_seconds']:.2f} 秒，评估用时 {report['eval_seconds']:.2f} 秒")
+    print("MAE =", report["mae"])
+    print("R2  =", report["r2"])
+    print("分数 58,74,53 -> 预测平均分 =", lr.predict([[58, 74, 53]])[0])
+    print("分数 80,90,100 -> 预测平均分 =", lr.predict([[80, 90, 100]])[0])
+    print("Learned weights:", lr.coef_, "intercept:", lr.intercept_)
+    joblib.dump(lr, args.save)
+    print("已保存 ->", args.save)
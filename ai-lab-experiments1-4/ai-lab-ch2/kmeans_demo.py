@@ -9,13 +9,25 @@
 # - 优先使用：data/kmeans.txt（如果存在）
 # - 备选使用：kmeans.txt（如果存在）
 # - 自动生成：如果上述文件都不存在，使用 make_blobs 生成80个样本，4个中心点，保存到 data/kmeans.txt
+# - 读取文本文件后会在旁边生成二进制缓存 “文件名.cache.npy”，文件不变时下次直接内存映射读取（见 kmeans_io.py）
+#
+# 大数据文件（放不进内存）可使用流式模式：按块读取并用小批量 KMeans 训练，详见 kmeans_stream.py
+#     python kmeans_demo.py --stream 大数据文件.txt --block-size 100000 --epochs 1
+# 流式模式默认也会在数据文件旁生成与原数据同样大的 .npy 缓存；磁盘空间紧张时加 --no-cache，每遍都直接解析文本
+# 不确定簇数时，先用 kmeans_sweep.py 并行比较多个 k 的肘部/轮廓系数，再用 --k 指定：
+#     python kmeans_sweep.py --k-min 2 --k-max 10 && python kmeans_demo.py --k 4
 
+import argparse  # 命令行参数
 import os, numpy as np  # os: 文件与路径操作；numpy: 数组与数值计算
 import matplotlib
 matplotlib.use('Agg')  # 设置非交互式后端，用于保存图片
 import matplotlib.pyplot as plt  # matplotlib: 绘图
+from matplotlib.colors import ListedColormap  # 用簇配色给决策区域图着色
 from sklearn.cluster import KMeans  # KMeans 聚类算法
 from sklearn.datasets import make_blobs  # 生成可控簇结构的模拟数据
+from kmeans_io import load_points  # 带 .npy 缓存的数据读取
+from kmeans_render import decision_regions  # 按像素数计算决策区域
+from kmeans_stream import DEFAULT_BLOCK_SIZE, evaluate_stream, fit_stream  # 流式（小批量）KMeans
 
 # 1) 智能数据加载函数：按优先级读取或生成数据
 def load_or_make():
@@ -28,10 +40,10 @@ def load_or_make():
     path_a = "data/kmeans.txt"; path_b = "kmeans.txt"  # 两个候选路径：优先 data 目录
     if os.path.exists(path_a):
         print("📁 从 data/kmeans.txt 加载数据")
-        return np.genfromtxt(path_a, delimiter=" ")  # 从文件读取空格分隔的二维数据
+        return load_points(path_a)  # 从文件读取空格分隔的二维数据（有缓存时直接内存映射）
     if os.path.exists(path_b):
         print("📁 从 kmeans.txt 加载数据")
-        return np.genfromtxt(path_b, delimiter=" ")  # 退而求其次，从当前目录读取
+        return load_points(path_b)  # 退而求其次，从当前目录读取
     # 若无文件，自动生成 80×2 的 4 簇数据
     print("🔧 未找到数据文件，正在自动生成...")
     # make_blobs 便于生成可控中心与方差的聚类数据；这里 80 个样本，4 个中心点，二维特征
@@ -42,16 +54,33 @@ def load_or_make():
     print("✅ 已自动生成 data/kmeans.txt（80个样本，4个簇）")
     return X
 
-data = load_or_make()  # 加载（或生成）数据，shape 约为 (80, 2)
+parser = argparse.ArgumentParser(description="KMeans 聚类演示")
+parser.add_argument("--k", type=int, default=4, help="簇数量（可先用 kmeans_sweep.py 选择）")
+parser.add_argument("--stream", type=str, default=None, help="流式模式：按块读取该数据文件，用小批量 KMeans 训练")
+parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE, help="流式模式：每块读取的行数")
+parser.add_argument("--epochs", type=int, default=1, help="流式模式：扫描文件的遍数")
+parser.add_argument("--no-cache", action="store_true", help="流式模式：不生成 .npy 缓存（节省磁盘空间，每遍都解析文本）")
+args = parser.parse_args()
 
-# 2) 训练 KMeans（4 类）
-k = 4  # 预期的簇数量
-km = KMeans(n_clusters=k, n_init=10, random_state=0).fit(data)  # 训练模型；n_init 指不同初始中心的重启次数
+# 2) 训练 KMeans（默认 4 类）
+k = args.k  # 预期的簇数量
+if args.stream:
+    # 流式模式：内存中只保留一块数据；画图用的 data 是从全部数据中随机抽取的点
+    use_cache = not args.no_cache
+    km = fit_stream(args.stream, k, block_size=args.block_size, n_epochs=args.epochs, use_cache=use_cache)
+    inertia, n_points, data = evaluate_stream(km, args.stream, block_size=args.block_size, use_cache=use_cache)
+    print(f"📁 流式训练完成：共 {n_points} 个样本，惯性 inertia = {inertia:.2f}，画图抽样 {len(data)} 个点")
+else:
+    data = load_or_make()  # 加载（或生成）数据，shape 约为 (80, 2)
+    km = KMeans(n_clusters=k, n_init=10, random_state=0).fit(data)  # 训练模型；n_init 指不同初始中心的重启次数
 centers = km.cluster_centers_  # 学到的簇中心坐标，shape: (k, 2)
 labels  = km.predict(data)     # 每个样本的簇标签，整数 0..k-1
 
 # 3) 散点簇图
 colors = np.array(["#e41a1c","#377eb8","#4daf4a","#ff7f00"])  # 4 个簇的配色
+if k > len(colors):
+    colors = np.array([matplotlib.colors.to_hex(plt.cm.tab20(i % 20)) for i in range(k)])  # 簇更多时改用 tab20 配色
+colors = colors[:k]  # 每个簇一种颜色
 plt.figure(figsize=(6,5))  # 新建画布
 for i in range(k):
     # 绘制属于第 i 簇的样本点
@@ -65,16 +94,16 @@ plt.tight_layout(); plt.savefig("kmeans_clusters.png", dpi=150, bbox_inches='tig
 print("✅ 聚类散点图已保存为: kmeans_clusters.png")
 plt.close()  # 关闭图形以释放内存
 
-# 4) 决策区域（等高线式着色）
-# 为绘图构建一个覆盖数据范围的网格，并对每个网格点预测其所属簇
+# 4) 决策区域（按像素着色）
+# 网格大小按图片像素数决定（最多约 50 万像素），与数据范围无关；
+# 只在簇边界附近逐像素计算最近的中心，其余区域整块填色（原理见 kmeans_render.py）
 x_min, x_max = data[:,0].min()-1, data[:,0].max()+1  # x 轴边界向外扩 1 个单位，便于显示
 y_min, y_max = data[:,1].min()-1, data[:,1].max()+1  # y 轴边界向外扩 1 个单位
-xx, yy = np.meshgrid(np.arange(x_min, x_max, 0.02),
-                     np.arange(y_min, y_max, 0.02))  # 生成网格采样点
-Z = km.predict(np.c_[xx.ravel(), yy.ravel()]).reshape(xx.shape)  # 预测每个网格点的簇并重塑回网格形状
+Z, n_evaluated = decision_regions(centers, x_min, x_max, y_min, y_max)  # Z[i, j]: 第 i 行第 j 列像素所属的簇
 
 plt.figure(figsize=(6,5))  # 新建画布用于决策区域
-plt.contourf(xx, yy, Z, alpha=0.35, levels=k, colors=colors)  # 用不同颜色填充不同簇的区域
+plt.imshow(Z, extent=(x_min, x_max, y_min, y_max), origin="lower", aspect="auto",
+           interpolation="nearest", alpha=0.35, cmap=ListedColormap(colors), vmin=0, vmax=k-1)  # 不同簇的区域填不同颜色
 for i in range(k):
     # 在决策区域上再次叠加训练样本，便于对照
     plt.scatter(data[labels==i,0], data[labels==i,1],
@@ -82,6 +111,7 @@ for i in range(k):
 plt.scatter(centers[:,0], centers[:,1], s=180, marker="*",
             edgecolors="k", c=colors)  # 突出显示中心
 plt.title("KMeans Decision Regions")
+print(f"决策区域: {Z.shape[1]}×{Z.shape[0]} 像素，只在簇边界附近计算了 {n_evaluated} 个点")
 plt.tight_layout(); plt.savefig("kmeans_decision_regions.png", dpi=150, bbox_inches='tight')  # 保存图片
 print("✅ 决策区域图已保存为: kmeans_decision_regions.png")
 plt.close()  # 关闭图形以释放内存
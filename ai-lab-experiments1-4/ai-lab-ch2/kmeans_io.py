@@ -0,0 +1,173 @@
+# file: kmeans_io.py
+# 说明：
+# 本脚本负责读取聚类数据文件（格式同 kmeans.txt：每行一个样本，数值用空格分隔），并维护二进制缓存：
+# 1) 第一次读取文本文件时，按字节块读取、逐块解析（np.loadtxt 的 C 解析器，比 np.genfromtxt 快约 10 倍），
+#    边解析边写入同目录下的 “文件名.cache.npy”，内存中只保留一块数据；
+# 2) 同时在 “文件名.cache.json” 中记录源文件的大小、修改时间（mtime）和 SHA-256；
+# 3) 之后再读取时，只要源文件没有变化，就直接用 np.load(mmap_mode="r") 内存映射缓存文件：
+#    不解析文本、不复制数据，几乎瞬间完成，由操作系统按需把用到的部分读入内存。
+#
+# 缓存是否有效的判断：大小和 mtime 都没变 -> 有效；mtime 变了但大小没变 -> 重新计算哈希，
+# 哈希相同（例如文件只是被 touch 过）仍然有效；否则重新生成缓存。
+# 缓存目录不可写时退回为直接解析到内存，不影响使用。
+
+import hashlib  # 计算源文件的 SHA-256
+import io  # BytesIO: 把字节块包装成文件对象交给 np.loadtxt
+import json  # 读写缓存说明文件
+import os  # 文件与路径操作
+import numpy as np  # numpy: 数组与数值计算
+
+DEFAULT_BLOCK_BYTES = 16 * 2 ** 20  # 冷启动时每次读取的字节数（16MB）
+
+
+def cache_paths(path):
+    """返回 (缓存数据文件路径, 缓存说明文件路径)。"""
+    return path + ".cache.npy", path + ".cache.json"
+
+
+def file_sha256(path, block_bytes=DEFAULT_BLOCK_BYTES):
+    """分块计算文件的 SHA-256，不会一次读入整个文件。"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(block_bytes), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def iter_text_blocks(f, block_bytes=DEFAULT_BLOCK_BYTES):
+    """
+    从二进制文件对象中按字节块读取文本数据，每次产出一个 (行数, 列数) 的数组。
+
+    每块在最后一个换行处切开，剩下的半行留给下一块，保证不会把一行拆开解析。
+    """
+    rest = b""
+    while True:
+        chunk = f.read(block_bytes)
+        if not chunk:
+            break
+        chunk = rest + chunk
+        cut = chunk.rfind(b"\n") + 1  # 最后一个完整行的结尾
+        chunk, rest = chunk[:cut], chunk[cut:]
+        if chunk.strip():
+            yield np.loadtxt(io.BytesIO(chunk), ndmin=2)
+    if rest.strip():
+        yield np.loadtxt(io.BytesIO(rest), ndmin=2)
+
+
+def _source_info(path):
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def cache_is_valid(path):
+    """缓存存在且与源文件一致时返回 True。"""
+    npy_path, meta_path = cache_paths(path)
+    if not (os.path.exists(npy_path) and os.path.exists(meta_path)):
+        return False
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        size, mtime_ns, sha256 = meta["size"], meta["mtime_ns"], meta["sha256"]
+    except (ValueError, KeyError, TypeError):
+        return False  # 说明文件损坏（如写到一半被中断）：当作缓存无效，重新生成
+    info = _source_info(path)
+    if info["size"] != size:
+        return False
+    if info["mtime_ns"] == mtime_ns:
+        return True
+    # 修改时间变了但大小没变：比较内容哈希，内容相同就只更新记录的 mtime
+    if file_sha256(path) != sha256:
+        return False
+    meta["mtime_ns"] = info["mtime_ns"]
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+    return True
+
+
+def build_cache(path, block_bytes=DEFAULT_BLOCK_BYTES):
+    """
+    解析文本文件并写出 .npy 缓存与说明文件，边解析边写，内存中只保留一块数据。
+
+    .npy 文件头记录了数组形状，但总行数要读完才知道：先写一个占位文件头，
+    数据写完后再回到开头写入真实形状（两种形状的文件头都补齐到 128 字节，长度相同）。
+    """
+    npy_path, meta_path = cache_paths(path)
+    tmp_path = npy_path + ".tmp"
+    info = _source_info(path)  # 解析前记录，解析期间文件若被修改，下次会发现 mtime 不一致
+    h = hashlib.sha256()
+    n_rows, n_cols = 0, None
+
+    class HashingReader:
+        """读取的同时计算哈希，避免为了哈希再读一遍文件。"""
+
+        def __init__(self, f):
+            self.f = f
+
+        def read(self, size):
+            data = self.f.read(size)
+            h.update(data)
+            return data
+
+    try:
+        with open(path, "rb") as src, open(tmp_path, "wb") as out:
+            header_len = _write_header(out, (0, 0))
+            for block in iter_text_blocks(HashingReader(src), block_bytes):
+                if n_cols is None:
+                    n_cols = block.shape[1]
+                elif block.shape[1] != n_cols:
+                    raise ValueError(f"{path}: 各行的列数不一致（{n_cols} 与 {block.shape[1]}）")
+                out.write(np.ascontiguousarray(block, dtype="<f8").tobytes())
+                n_rows += len(block)
+            if n_rows == 0:
+                raise ValueError(f"数据文件为空: {path}")
+            out.seek(0)
+            if _write_header(out, (n_rows, n_cols)) != header_len:
+                raise RuntimeError("npy 文件头长度不一致")  # 理论上不会发生
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)  # 解析失败或被中断：删掉写了一半的临时文件
+        raise
+    os.replace(tmp_path, npy_path)  # 写完再改名：中途失败不会留下半个缓存
+    info["sha256"] = h.hexdigest()
+    with open(meta_path, "w") as f:
+        json.dump(info, f)
+
+
+def _write_header(f, shape):
+    """写入 float64、C 顺序的 npy 文件头，返回文件头长度。"""
+    start = f.tell()
+    np.lib.format.write_array_header_1_0(f, {"descr": "<f8", "fortran_order": False, "shape": shape})
+    return f.tell() - start
+
+
+def open_cached(path, block_bytes=DEFAULT_BLOCK_BYTES):
+    """
+    返回数据的只读内存映射（必要时先生成缓存）；缓存目录不可写时返回 None。
+    """
+    try:
+        if not cache_is_valid(path):
+            build_cache(path, block_bytes)
+        return np.load(cache_paths(path)[0], mmap_mode="r")
+    except OSError:
+        return None
+
+
+def load_points(path, use_cache=True, block_bytes=DEFAULT_BLOCK_BYTES):
+    """
+    读取数据文件，返回形状为 (样本数, 特征数) 的 float64 数组。
+
+    参数:
+        path: 文本数据文件路径
+        use_cache: 是否使用/生成 .npy 缓存；为 False 时每次都解析文本
+        block_bytes: 解析文本时每块的字节数
+    返回:
+        有缓存时是只读的内存映射数组（np.memmap），用法与普通数组相同；否则是普通数组
+    """
+    if use_cache:
+        data = open_cached(path, block_bytes)
+        if data is not None:
+            return data
+    # 不使用缓存或缓存目录不可写：直接解析到内存
+    with open(path, "rb") as f:
+        blocks = list(iter_text_blocks(f, block_bytes))
+    return np.concatenate(blocks) if blocks else np.empty((0, 0))
@@ -0,0 +1,89 @@
+# file: kmeans_render.py
+# 说明：
+# 本脚本负责计算 KMeans 决策区域图（每个像素属于哪个簇），供 kmeans_demo.py 画图使用。
+# 原来的做法是按固定步长 0.02 生成网格再逐点 km.predict：数据范围越大网格越大，
+# 数据分布很散时网格可能有上亿个点，耗尽内存。这里改为：
+# 1) 按图片像素数决定网格大小（默认最多 50 万像素），与数据范围无关；
+# 2) 用向量化的“最近中心”计算代替 predict，并分块（tile）计算，内存占用固定；
+# 3) 先在粗网格的角点上计算簇编号，四个角同属一簇的粗格子整块直接填色，
+#    只对跨越簇边界的格子逐像素计算。KMeans 的每个簇区域都是凸的（Voronoi 区域），
+#    一个矩形的四个角都在同一个凸区域里，整个矩形也一定在里面，所以结果与逐像素计算完全相同。
+
+import numpy as np  # numpy: 数组与数值计算
+
+DEFAULT_MAX_PIXELS = 500_000  # 决策区域图最多计算的像素数
+DEFAULT_BLOCK = 8             # 粗网格每格边长（像素）；1 表示不做粗网格，逐像素计算
+DEFAULT_TILE = 65_536         # 每次计算距离的点数，控制中间数组大小
+
+
+def nearest_center(points, centers, tile=DEFAULT_TILE):
+    """
+    计算每个点距离最近的中心编号（与 KMeans.predict 的结果相同）。
+
+    距离平方 |p - c|² = |p|² - 2 p·c + |c|²，其中 |p|² 对同一个点的所有中心都一样，
+    求最小值时可以省去，因此只需一次矩阵乘法。按 tile 个点一块计算，中间数组大小固定。
+    """
+    centers = np.asarray(centers, dtype=float)
+    c2 = (centers ** 2).sum(axis=1)  # 每个中心的 |c|²
+    labels = np.empty(len(points), dtype=np.intp)
+    for start in range(0, len(points), tile):
+        p = points[start:start + tile]
+        labels[start:start + tile] = (c2 - 2 * p @ centers.T).argmin(axis=1)
+    return labels
+
+
+def grid_shape(x_min, x_max, y_min, y_max, max_pixels=DEFAULT_MAX_PIXELS):
+    """
+    按数据范围的宽高比，把 max_pixels 个像素分配到 x、y 两个方向，返回 (nx, ny)，保证 nx * ny <= max(max_pixels, 4)。
+
+    每个方向至少 2 个像素，所以数据极扁（或极高）时，较长的一边最多 max_pixels // 2 个像素。
+    """
+    longest = max(max_pixels // 2, 2)
+    aspect = (x_max - x_min) / max(y_max - y_min, 1e-12)
+    nx = min(max(int(np.sqrt(max_pixels * aspect)), 2), longest)
+    ny = min(max(max_pixels // nx, 2), longest)
+    nx = min(max(max_pixels // ny, 2), longest)  # ny 被截断时，把剩余的像素还给 x 方向
+    return nx, ny
+
+
+def decision_regions(centers, x_min, x_max, y_min, y_max,
+                     max_pixels=DEFAULT_MAX_PIXELS, block=DEFAULT_BLOCK):
+    """
+    计算决策区域图。
+
+    参数:
+        centers: 簇中心，形状 (k, 2)
+        x_min, x_max, y_min, y_max: 图的范围
+        max_pixels: 最多计算的像素数，决定图片分辨率
+        block: 粗网格每格边长（像素），1 表示逐像素计算
+    返回:
+        (Z, 实际计算距离的点数)。Z 形状为 (ny, nx)，Z[i, j] 是第 i 行、第 j 列像素所属的簇，
+        第 0 行对应 y_min，可直接用 plt.imshow(Z, origin="lower", extent=...) 画出。
+    """
+    nx, ny = grid_shape(x_min, x_max, y_min, y_max, max_pixels)
+    xs = np.linspace(x_min, x_max, nx)  # 每列像素的 x 坐标
+    ys = np.linspace(y_min, y_max, ny)  # 每行像素的 y 坐标
+
+    if block <= 1:
+        # 逐像素计算：像素数已受 max_pixels 限制，坐标数组大小固定
+        rows, cols = np.divmod(np.arange(nx * ny), nx)
+        Z = nearest_center(np.column_stack([xs[cols], ys[rows]]), centers).reshape(ny, nx)
+        return Z, nx * ny
+
+    # 1) 粗网格角点：每隔 block 个像素取一行/一列，最后一行/列也包含在内
+    cy = np.unique(np.append(np.arange(0, ny, block), ny - 1))
+    cx = np.unique(np.append(np.arange(0, nx, block), nx - 1))
+    gy, gx = np.meshgrid(ys[cy], xs[cx], indexing="ij")
+    L = nearest_center(np.column_stack([gx.ravel(), gy.ravel()]), centers).reshape(len(cy), len(cx))
+
+    # 2) 四个角同属一簇的格子整块填色，其余格子标记为 -1 待计算
+    uniform = (L[:-1, :-1] == L[1:, :-1]) & (L[:-1, :-1] == L[:-1, 1:]) & (L[:-1, :-1] == L[1:, 1:])
+    cell_label = np.where(uniform, L[:-1, :-1], -1)
+    row_cell = np.minimum(np.searchsorted(cy, np.arange(ny), side="right") - 1, len(cy) - 2)  # 每行像素所在的格子
+    col_cell = np.minimum(np.searchsorted(cx, np.arange(nx), side="right") - 1, len(cx) - 2)
+    Z = cell_label[row_cell[:, None], col_cell[None, :]]
+
+    # 3) 只对跨越簇边界的格子逐像素计算
+    rows, cols = np.nonzero(Z < 0)
+    Z[rows, cols] = nearest_center(np.column_stack([xs[cols], ys[rows]]), centers)
+    return Z, L.size + len(rows)
@@ -0,0 +1,129 @@
+# file: kmeans_stream.py
+# 说明：
+# 本脚本提供“流式（小批量）KMeans”，用于数据文件太大、无法一次读入内存的情况：
+# 1) 按固定行数分块读取数据（每块 block_size 行），内存占用只与块大小有关，与文件大小无关；
+#    数据来自 kmeans_io.py 维护的 .npy 内存映射缓存（第一次读取时自动生成），之后的每一遍扫描都不必再解析文本；
+#    缓存与原数据一样大，磁盘空间紧张时可以传 use_cache=False（kmeans_demo.py 的 --no-cache），每遍都直接解析文本；
+# 2) 用 MiniBatchKMeans.partial_fit 逐个小批量更新簇中心（可以多遍扫描文件）；
+# 3) 再扫描一遍文件，计算惯性 inertia（每个点到所属中心的距离平方和），可与全量 KMeans 直接比较；
+# 4) 扫描时随机抽样保留少量点，供画散点图使用。
+#
+# 由 kmeans_demo.py 的 --stream 参数调用；../benchmarks/bench_kmeans.py 用它与全量 KMeans 做对比。
+
+import numpy as np  # numpy: 数组与数值计算
+from sklearn.cluster import MiniBatchKMeans  # 小批量 KMeans，支持 partial_fit 增量训练
+from kmeans_io import iter_text_blocks, open_cached  # 数据文件的分块解析与 .npy 缓存
+
+DEFAULT_BLOCK_SIZE = 100_000  # 每块读取的行数（10万行二维数据约占 1.6MB 内存）
+DEFAULT_BATCH_SIZE = 4096     # 每次 partial_fit 使用的小批量大小
+DEFAULT_SAMPLE_SIZE = 5000    # 为画图保留的抽样点数
+
+
+def iter_blocks(path, block_size=DEFAULT_BLOCK_SIZE, use_cache=True):
+    """
+    按块读取空格分隔的数据文件，每次产出一个形状为 (行数, 列数) 的数组。
+
+    参数:
+        path: 数据文件路径（格式与 kmeans.txt 相同，每行一个样本）；
+              也可以直接传入数组（如 np.load(..., mmap_mode="r") 得到的内存映射），按行切块
+        block_size: 每块的行数
+        use_cache: 是否使用/生成 .npy 缓存；为 False 时每次都直接解析文本，不占用额外的磁盘空间
+    """
+    if not isinstance(path, str):
+        data = path
+    else:
+        data = open_cached(path) if use_cache else None
+    if data is not None:
+        # 内存映射：切片时才由操作系统读入对应部分
+        for start in range(0, len(data), block_size):
+            yield data[start:start + block_size]
+        return
+    # 不使用缓存（或缓存目录不可写）：直接按块解析文本
+    yield from iter_text_rows(path, block_size)
+
+
+def iter_text_rows(path, block_size):
+    """
+    直接解析文本文件，每次产出 block_size 行（最后一块可能较少）。
+
+    按第一行的长度估算每次读取的字节数，使每次解析的数据量与 block_size 相当，内存占用同样只与块大小有关。
+    """
+    with open(path, "rb") as f:
+        block_bytes = max(len(f.readline()), 1) * block_size
+        f.seek(0)
+        rest = None
+        for block in iter_text_blocks(f, block_bytes):
+            if rest is not None:
+                block = np.vstack([rest, block])
+            while len(block) >= block_size:
+                yield block[:block_size]
+                block = block[block_size:]
+            rest = block if len(block) else None
+        if rest is not None:
+            yield rest
+
+
+def fit_stream(path, k, block_size=DEFAULT_BLOCK_SIZE, batch_size=DEFAULT_BATCH_SIZE,
+               n_epochs=1, random_state=0, use_cache=True):
+    """
+    流式训练 KMeans：逐块读取文件，每块打乱后切成小批量，依次调用 partial_fit。
+
+    参数:
+        path: 数据文件路径（或数组）
+        k: 簇数量
+        block_size: 每块读取的行数
+        batch_size: 每次更新使用的样本数
+        n_epochs: 扫描文件的遍数；多扫几遍中心更稳定，耗时也成倍增加
+        random_state: 随机种子
+        use_cache: 是否使用/生成 .npy 缓存（见 iter_blocks）
+    返回:
+        训练好的 MiniBatchKMeans 模型（用法与 KMeans 相同：predict、cluster_centers_ 等）
+    """
+    km = MiniBatchKMeans(n_clusters=k, batch_size=batch_size, random_state=random_state)
+    rng = np.random.default_rng(random_state)
+    first = True
+    for _ in range(n_epochs):
+        for block in iter_blocks(path, block_size, use_cache):
+            block = block[rng.permutation(len(block))]  # 块内打乱，避免文件按簇排序时中心被带偏
+            if first:
+                # 第一次用整块数据初始化中心（k-means++），比只用一个小批量初始化更稳
+                km.partial_fit(block)
+                first = False
+                continue
+            for start in range(0, len(block), batch_size):
+                km.partial_fit(block[start:start + batch_size])
+    if first:
+        raise ValueError(f"数据文件为空: {path}")
+    return km
+
+
+def evaluate_stream(km, path, block_size=DEFAULT_BLOCK_SIZE, sample_size=DEFAULT_SAMPLE_SIZE, random_state=0,
+                    use_cache=True):
+    """
+    扫描一遍文件，计算模型在全部数据上的惯性，并随机抽取 sample_size 个点。
+
+    抽样方法：给每个点一个随机数，始终保留随机数最小的 sample_size 个点，
+    这样每个点被选中的概率相同，而且只需要保存 sample_size 个点。
+
+    参数:
+        km: 训练好的模型（KMeans 或 MiniBatchKMeans 均可）
+        path: 数据文件路径（或数组）
+        use_cache: 是否使用/生成 .npy 缓存（见 iter_blocks）
+    返回:
+        (惯性, 样本总数, 抽样点数组)
+    """
+    rng = np.random.default_rng(random_state)
+    inertia, n = 0.0, 0
+    sample = keys = None
+    for block in iter_blocks(path, block_size, use_cache):
+        inertia += -km.score(block)  # score 返回负的惯性，累加各块即为全体数据的惯性
+        n += len(block)
+        block_keys = rng.random(len(block))
+        if sample is None:
+            sample, keys = block, block_keys
+        else:
+            sample, keys = np.vstack([sample, block]), np.concatenate([keys, block_keys])
+        if len(sample) > sample_size:
+            keep = np.argpartition(keys, sample_size)[:sample_size]  # 保留随机数最小的 sample_size 个
+            sample, keys = sample[keep], keys[keep]
+    return inertia, n, sample
@@ -0,0 +1,189 @@
+# file: kmeans_sweep.py
+# 说明：
+# 本脚本帮助选择 KMeans 的簇数 k：对一组 k 值和多个随机种子分别训练，输出“肘部法则”和“轮廓系数”报告。
+# 1) 每个 (k, 种子) 组合是一次独立的训练，放进进程池并行执行，用时随 CPU 核数近似线性下降；
+# 2) 各进程用 np.load(mmap_mode="r") 打开同一个 .npy 文件（见 kmeans_io.py），不通过进程间传递数据，
+#    文件内容在操作系统的页缓存中只有一份。注意：默认模式下 KMeans.fit 会把数据复制一份再训练，
+#    每个进程仍各占一份数据大小的内存；加 --minibatch 时按块训练，每个进程只占一块的内存，数据很大时请使用；
+# 3) 轮廓系数（silhouette）需要计算两两距离，代价是 O(N²)，因此只在随机抽取的 --sample 个点上计算，
+#    所有组合使用同一批抽样点，结果可以直接比较；
+# 4) 输出每个 k 的惯性（inertia，越小越好，但 k 越大必然越小，要看“拐点”）与轮廓系数（越接近 1 越好），
+#    推荐轮廓系数平均值最高的 k，并画出 kmeans_sweep.png。
+#
+# 运行示例：
+#     python kmeans_sweep.py                                  # 使用 data/kmeans.txt 或 kmeans.txt，k = 2~10
+#     python kmeans_sweep.py --data 大数据文件.txt --k-min 2 --k-max 20 --seeds 3 --jobs 8 --minibatch
+# 选出 k 后，用 python kmeans_demo.py --k 选出的值 画图。
+
+import argparse  # 命令行参数
+import os  # 文件与路径操作
+import tempfile  # 数据不能缓存时，临时保存为 .npy
+import time  # 计时
+from concurrent.futures import ProcessPoolExecutor  # 进程池：每次训练在单独的进程里执行
+
+import numpy as np  # numpy: 数组与数值计算
+from sklearn.cluster import KMeans  # KMeans 聚类算法
+from sklearn.metrics import silhouette_score  # 轮廓系数
+
+from kmeans_io import open_cached  # 生成/打开 .npy 内存映射缓存
+from kmeans_stream import evaluate_stream, fit_stream  # 小批量 KMeans（数据很大时使用）
+
+DEFAULT_SAMPLE_SIZE = 2000  # 计算轮廓系数的抽样点数
+LARGE_DATA_ROWS = 1_000_000  # 超过这么多行且未用 --minibatch 时给出内存提示
+
+
+def fit_one(npy_path, k, seed, sample_idx, minibatch):
+    """
+    在子进程中完成一次训练并评估（必须是模块顶层函数，进程池才能调用）。
+
+    参数:
+        npy_path: 数据的 .npy 文件路径，在子进程里以内存映射方式打开
+        k: 簇数量
+        seed: 随机种子
+        sample_idx: 计算轮廓系数用的抽样点下标
+        minibatch: True 时用小批量 KMeans 分块训练，适合很大的数据
+    返回:
+        一个字典：k、seed、inertia、silhouette、用时（秒）
+    """
+    from threadpoolctl import threadpool_limits  # scikit-learn 自带的依赖
+    t0 = time.perf_counter()
+    X = np.load(npy_path, mmap_mode="r")
+    with threadpool_limits(1):  # 每个进程只用一个线程，避免多个进程抢占同一批 CPU 核
+        if minibatch:
+            km = fit_stream(X, k, random_state=seed)
+            inertia = evaluate_stream(km, X, sample_size=1)[0]
+        else:
+            km = KMeans(n_clusters=k, n_init=1, random_state=seed).fit(X)
+            inertia = km.inertia_
+        sample = np.asarray(X[sample_idx])
+        labels = km.predict(sample)
+        # 抽样点全部落在同一簇时轮廓系数没有定义
+        silhouette = silhouette_score(sample, labels) if len(set(labels)) > 1 else float("nan")
+    return {"k": k, "seed": seed, "inertia": float(inertia), "silhouette": float(silhouette),
+            "seconds": time.perf_counter() - t0}
+
+
+def sweep(data, k_values, seeds, jobs=None, sample_size=DEFAULT_SAMPLE_SIZE, minibatch=False):
+    """
+    对每个 (k, 种子) 组合并行训练，返回结果列表（按 k、种子排序）。
+
+    参数:
+        data: 数据数组；若是 np.load(mmap_mode="r") 得到的内存映射，子进程直接打开同一个文件，
+              否则先临时保存为 .npy 再共享
+        k_values: 要尝试的 k 值列表
+        seeds: 随机种子列表
+        jobs: 进程数，默认等于 CPU 核数
+        sample_size: 计算轮廓系数的抽样点数
+        minibatch: 是否用小批量 KMeans
+    """
+    rng = np.random.default_rng(0)
+    n = len(data)
+    sample_idx = np.sort(rng.choice(n, size=min(sample_size, n), replace=False))  # 排序后读取内存映射更连续
+    tasks = [(k, seed) for k in k_values for seed in seeds]
+    if not tasks:
+        raise ValueError("k_values 和 seeds 都不能为空")
+
+    tmp_dir = None
+    npy_path = getattr(data, "filename", None)
+    if npy_path is None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        npy_path = os.path.join(tmp_dir.name, "data.npy")
+        np.save(npy_path, data)
+    try:
+        with ProcessPoolExecutor(max_workers=jobs) as ex:
+            futures = [ex.submit(fit_one, npy_path, k, seed, sample_idx, minibatch) for k, seed in tasks]
+            return [f.result() for f in futures]
+    finally:
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+
+
+def summarize(results):
+    """按 k 汇总：惯性与轮廓系数在各种子间的平均值、轮廓系数的标准差、平均用时。"""
+    rows = []
+    for k in sorted({r["k"] for r in results}):
+        rs = [r for r in results if r["k"] == k]
+        sil = np.array([r["silhouette"] for r in rs])
+        rows.append({"k": k,
+                     "inertia": float(np.mean([r["inertia"] for r in rs])),
+                     "silhouette": float(np.nanmean(sil)) if not np.isnan(sil).all() else float("nan"),
+                     "silhouette_std": float(np.nanstd(sil)) if not np.isnan(sil).all() else float("nan"),
+                     "seconds": float(np.mean([r["seconds"] for r in rs]))})
+    return rows
+
+
+def plot_report(rows, path="kmeans_sweep.png"):
+    """画出肘部曲线（惯性-k）和轮廓系数曲线（轮廓系数-k）。"""
+    import matplotlib
+    matplotlib.use('Agg')  # 设置非交互式后端，用于保存图片
+    import matplotlib.pyplot as plt
+
+    ks = [r["k"] for r in rows]
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(10, 4))
+    ax1.plot(ks, [r["inertia"] for r in rows], "o-")
+    ax1.set_xlabel("k"); ax1.set_ylabel("inertia"); ax1.set_title("Elbow")
+    ax2.errorbar(ks, [r["silhouette"] for r in rows], yerr=[r["silhouette_std"] for r in rows], fmt="o-", capsize=3)
+    ax2.set_xlabel("k"); ax2.set_ylabel("silhouette (sample)"); ax2.set_title("Silhouette")
+    fig.tight_layout(); fig.savefig(path, dpi=150, bbox_inches='tight')
+    plt.close(fig)
+
+
+def default_data_path():
+    """与 kmeans_demo.py 相同的数据位置：优先 data/kmeans.txt，其次 kmeans.txt。"""
+    for path in ("data/kmeans.txt", "kmeans.txt"):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+if __name__ == "__main__":  # 进程池在 Windows/macOS 上会重新导入本文件，入口代码必须放在这里
+    parser = argparse.ArgumentParser(description="KMeans 选择簇数：并行的肘部法则/轮廓系数扫描")
+    parser.add_argument("--data", type=str, default=None, help="数据文件（默认 data/kmeans.txt 或 kmeans.txt）")
+    parser.add_argument("--k-min", type=int, default=2)
+    parser.add_argument("--k-max", type=int, default=10)
+    parser.add_argument("--seeds", type=int, default=3, help="每个 k 用几个不同的随机种子")
+    parser.add_argument("--jobs", type=int, default=None, help="并行进程数（默认等于 CPU 核数）")
+    parser.add_argument("--sample", type=int, default=DEFAULT_SAMPLE_SIZE, help="计算轮廓系数的抽样点数")
+    parser.add_argument("--minibatch", action="store_true", help="用小批量 KMeans 分块训练（数据很大时使用）")
+    parser.add_argument("--plot", type=str, default="kmeans_sweep.png", help="报告图的保存路径")
+    args = parser.parse_args()
+
+    path = args.data or default_data_path()
+    if path is None:
+        raise SystemExit("❌ 未找到数据文件，请先运行 python kmeans_demo.py 生成 data/kmeans.txt，或用 --data 指定")
+    data = open_cached(path)  # 共享的内存映射；缓存目录不可写时为 None
+    if data is None:
+        from kmeans_io import load_points
+        data = load_points(path, use_cache=False)
+    k_values = list(range(max(args.k_min, 2), min(args.k_max, len(data) - 1) + 1))  # 轮廓系数要求 2 ≤ k < 样本数
+    if not k_values:
+        raise SystemExit(f"❌ 没有可尝试的 k：要求 2 ≤ k ≤ 样本数-1（{len(data) - 1}），"
+                         f"且 --k-min（{args.k_min}）不大于 --k-max（{args.k_max}）")
+    if args.seeds < 1:
+        raise SystemExit("❌ --seeds 至少为 1")
+    if not args.minibatch and len(data) > LARGE_DATA_ROWS:
+        jobs = args.jobs or os.cpu_count()
+        print(f"⚠️ 数据有 {len(data)} 行：默认模式下每个进程都会复制一份数据（约 {data.nbytes / 2 ** 20:.0f}MB × {jobs} 个进程），"
+              "内存不足时请加 --minibatch")
+
+    t0 = time.perf_counter()
+    results = sweep(data, k_values, range(args.seeds), args.jobs, args.sample, args.minibatch)
+    wall = time.perf_counter() - t0
+    rows = summarize(results)
+
+    print(f"📁 数据 {path}：{len(data)} 个样本；k = {k_values[0]}~{k_values[-1]}，每个 k {args.seeds} 个种子，"
+          f"共 {len(results)} 次训练")
+    print(f"{'k':>4}{'inertia':>16}{'下降':>9}{'silhouette':>13}{'± std':>8}{'单次用时s':>11}")
+    prev = None
+    for r in rows:
+        drop = f"{1 - r['inertia'] / prev:>9.1%}" if prev else f"{'':>9}"  # 比上一个 k 减少的比例，看“拐点”
+        print(f"{r['k']:>4}{r['inertia']:>16.2f}{drop}{r['silhouette']:>13.4f}{r['silhouette_std']:>8.4f}"
+              f"{r['seconds']:>11.2f}")
+        prev = r["inertia"]
+    best = max((r for r in rows if not np.isnan(r["silhouette"])), key=lambda r: r["silhouette"], default=None)
+    serial = sum(r["seconds"] for r in results)
+    print(f"⏱ 总用时 {wall:.2f} 秒（逐个训练约需 {serial:.2f} 秒，加速 {serial / wall:.1f} 倍）")
+    if best is not None:
+        print(f"✅ 推荐 k = {best['k']}（轮廓系数最高 {best['silhouette']:.4f}）；可运行 python kmeans_demo.py --k {best['k']}")
+    plot_report(rows, args.plot)
+    print(f"✅ 肘部/轮廓系数图已保存为: {args.plot}")
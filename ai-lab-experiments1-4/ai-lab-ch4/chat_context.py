@@ -0,0 +1,108 @@
+# 聊天上下文窗口管理：控制每次请求发送的历史长度
+#
+# 问题：如果把每一轮对话都原样追加到 messages 里，会话越长，每次请求携带的 token 越多，
+#       延迟和费用随之增长，最终超出模型上下文长度而报错。
+# 做法：
+#   1) 系统提示词（如有）始终原样保留；
+#   2) 最近几轮对话原样保留（不超过 recent_budget 个 token）；
+#   3) 更早的对话在后台线程中逐批“折叠”进一段滚动摘要，摘要以一条 system 消息发送；
+#   4) 后台摘要尚未完成的旧对话暂时原样保留，但总量超出 token_budget 时从最旧的开始丢弃。
+# 这样无论会话多长，每次请求的大小都大致恒定。
+
+import os, sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from sflib.tokens import estimate_tokens
+
+DEFAULT_TOKEN_BUDGET = 3000   # 每次请求中历史消息的 token 上限
+DEFAULT_RECENT_BUDGET = 1500  # 原样保留的最近对话的 token 上限
+
+
+def message_tokens(msg):
+    """估算一条消息的 token 数（含少量角色/格式开销）。"""
+    return estimate_tokens(msg["content"]) + 4
+
+
+class ChatContext:
+    """
+    带 token 预算的对话上下文
+
+    参数:
+        summarize_fn: 摘要函数 summarize_fn(旧摘要, 待折叠的消息列表) -> 新摘要
+        system_prompt: 系统提示词，可为 None
+        token_budget: 每次请求中历史消息的 token 上限
+        recent_budget: 原样保留的最近对话的 token 上限
+    """
+
+    def __init__(self, summarize_fn, system_prompt=None,
+                 token_budget=DEFAULT_TOKEN_BUDGET, recent_budget=DEFAULT_RECENT_BUDGET):
+        self.summarize_fn = summarize_fn
+        self.system_prompt = system_prompt
+        self.token_budget = token_budget
+        self.recent_budget = recent_budget
+        self.summary = ""    # 滚动摘要
+        self.folding = []    # 已移出“最近对话”、正在后台折叠进摘要的消息
+        self.recent = []     # 原样保留的最近对话
+        self._lock = threading.Lock()
+        # 单线程执行器：各批折叠按提交顺序依次进行，每批都基于上一批的摘要增量更新
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def add(self, role, content):
+        """追加一条消息；最近对话超出预算时，把最旧的一问一答移交后台折叠。"""
+        with self._lock:
+            self.recent.append({"role": role, "content": content})
+            if role != "assistant":
+                return  # 等一问一答完整后再折叠，避免把问题和回答拆开
+            batch = []
+            while len(self.recent) > 2 and sum(map(message_tokens, self.recent)) > self.recent_budget:
+                batch.extend(self.recent[:2])
+                del self.recent[:2]
+            if batch:
+                self.folding.extend(batch)
+                self._executor.submit(self._fold, batch)
+
+    def discard_last(self):
+        """撤回最后一条消息（例如请求失败时撤回本轮用户消息）。"""
+        with self._lock:
+            if self.recent:
+                self.recent.pop()
+
+    def _fold(self, batch):
+        """后台任务：把一批旧消息合并进滚动摘要。"""
+        try:
+            new_summary = self.summarize_fn(self.summary, batch)
+        except Exception:
+            new_summary = None  # 摘要失败时保留原摘要，这批消息按预算裁剪后直接丢弃
+        with self._lock:
+            if new_summary:
+                self.summary = new_summary
+            # 折叠按提交顺序进行，本批消息一定位于 folding 的最前面
+            del self.folding[:len(batch)]
+
+    def build_messages(self):
+        """生成本次请求要发送的 messages，总 token 数不超过 token_budget（最近对话本身超长时除外）。"""
+        with self._lock:
+            head = []
+            if self.system_prompt:
+                head.append({"role": "system", "content": self.system_prompt})
+            if self.summary:
+                head.append({"role": "system", "content": f"以下是之前对话的摘要：\n{self.summary}"})
+            used = sum(map(message_tokens, head)) + sum(map(message_tokens, self.recent))
+            # 仍在折叠中的旧消息：从最新的往前放，放不下的丢弃
+            pending = []
+            for msg in reversed(self.folding):
+                t = message_tokens(msg)
+                if used + t > self.token_budget:
+                    break
+                pending.insert(0, msg)
+                used += t
+            return head + pending + list(self.recent)
+
+    def wait_idle(self):
+        """等待所有已提交的后台折叠完成（主要用于测试或退出前）。"""
+        self._executor.submit(lambda: None).result()
+
+    def close(self):
+        self._executor.shutdown(wait=False)
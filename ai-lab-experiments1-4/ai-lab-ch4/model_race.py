@@ -0,0 +1,179 @@
+# 多模型“赛跑”（对冲请求）：先请求首选模型，等待一小段时间仍未成功就追加请求下一个候选，
+# 谁先成功就用谁的结果，其余请求随即被叫停。
+#
+# 与“一个失败再试下一个”的顺序回退相比，最坏等待时间从 “模型数 × 超时” 缩短到约 “超时 + 对冲延迟 × 模型数”。
+# 同时记录每个模型的成功率和耗时，下次按表现自动调整尝试顺序。
+#
+# 比赛结束时会设置停止信号（stop）：落选的请求在收到响应后立即关闭连接、不再读取内容、不再打印，
+# 尚未启动的候选也不再启动。注意：已经发到服务端的请求无法撤回，对冲会多消耗一些额度，对冲延迟越短消耗越多。
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+DEFAULT_HEDGE_DELAY = 8.0  # 首选模型多少秒内未成功，就追加请求下一个候选（秒）
+
+
+class FatalRaceError(Exception):
+    """所有模型都会失败的错误（如API密钥无效），遇到后立即停止比赛。"""
+
+
+class RaceCancelled(Exception):
+    """比赛已结束，落选的请求被叫停；不计入该模型的成功/失败统计。"""
+
+
+class ModelStats:
+    """
+    记录每个模型的成功率与平均耗时，并据此给候选模型排序
+
+    参数:
+        path: 统计数据保存的JSON文件路径；为 None 时只在内存中保存
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self.data = {}  # model -> {"ok": 成功次数, "fail": 失败次数, "latency": 成功耗时的滑动平均}
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.data = json.load(f)
+            except (OSError, ValueError):
+                self.data = {}
+
+    def record(self, model, ok, latency):
+        with self._lock:
+            d = self.data.setdefault(model, {"ok": 0, "fail": 0, "latency": None})
+            if ok:
+                d["ok"] += 1
+                # 指数滑动平均：新数据占 30%，适应服务端负载变化
+                d["latency"] = latency if d["latency"] is None else 0.7 * d["latency"] + 0.3 * latency
+            else:
+                d["fail"] += 1
+
+    def score(self, model):
+        """期望耗时：平均耗时 ÷ 成功率；数值越小越优先。没有数据的模型返回 None。"""
+        d = self.data.get(model)
+        if not d:
+            return None
+        success_rate = (d["ok"] + 1) / (d["ok"] + d["fail"] + 2)  # 拉普拉斯平滑，避免少量样本下走极端
+        latency = d["latency"] if d["latency"] is not None else 60.0
+        return latency / success_rate
+
+    def rank(self, models):
+        """按期望耗时排序；没有统计数据的模型保持原有优先级。"""
+        scored = [(self.score(m), i, m) for i, m in enumerate(models)]
+        known = sorted((s, i, m) for s, i, m in scored if s is not None)
+        unknown = [(s, i, m) for s, i, m in scored if s is None]
+        # 新模型排在已知表现较好的模型之后、表现差（期望耗时超过60秒）的模型之前
+        good = [x for x in known if x[0] <= 60.0]
+        bad = [x for x in known if x[0] > 60.0]
+        return [m for _, _, m in good + unknown + bad]
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.path)
+
+    def summary(self):
+        lines = []
+        for model, d in self.data.items():
+            total = d["ok"] + d["fail"]
+            lat = f"{d['latency']:.1f}s" if d["latency"] is not None else "-"
+            lines.append(f"  {model}: 成功 {d['ok']}/{total}, 平均耗时 {lat}")
+        return "\n".join(lines)
+
+
+def race(models, request_fn, stats, hedge_delay=DEFAULT_HEDGE_DELAY, on_start=None):
+    """
+    让多个模型赛跑，返回第一个成功的结果
+
+    参数:
+        models: 候选模型列表（会先按历史表现重新排序）
+        request_fn: request_fn(model, stop) -> 结果；失败时抛出异常，抛出 FatalRaceError 会终止整场比赛。
+                    stop 是 threading.Event，比赛结束后被设置：此时应尽快关闭响应、不再打印，并抛出 RaceCancelled
+        stats: ModelStats 对象，记录每个模型的成功/失败与耗时
+        hedge_delay: 对冲延迟（秒）：当前请求在这段时间内未成功，就追加请求下一个模型
+        on_start: 可选回调 on_start(model)，每启动一个模型时调用（用于打印提示）
+
+    返回:
+        (model, result)：第一个成功的模型及其结果；全部失败时返回 (None, 最后一个异常)
+    """
+    order = stats.rank(models)
+    executor = ThreadPoolExecutor(max_workers=len(order))
+    stop = threading.Event()
+    running = {}
+    last_error = None
+    next_idx = 0
+
+    def launch():
+        nonlocal next_idx
+        model = order[next_idx]
+        next_idx += 1
+        if on_start:
+            on_start(model)
+        t0 = time.perf_counter()
+
+        def task():
+            try:
+                result = request_fn(model, stop)
+            except RaceCancelled:
+                raise
+            except Exception:
+                stats.record(model, False, time.perf_counter() - t0)
+                raise
+            stats.record(model, True, time.perf_counter() - t0)
+            return result
+
+        running[executor.submit(task)] = model
+
+    try:
+        launch()
+        while running:
+            # 还有候选未启动时，最多等待 hedge_delay 秒；否则一直等到有请求结束
+            timeout = hedge_delay if next_idx < len(order) else None
+            done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                launch()  # 对冲：当前请求太慢，追加下一个候选
+                continue
+            for fut in done:
+                model = running.pop(fut)
+                try:
+                    return model, fut.result()
+                except FatalRaceError as e:
+                    return None, e
+                except Exception as e:
+                    last_error = e
+                    # 有请求失败了：不必等对冲延迟，立即启动下一个候选
+                    if next_idx < len(order):
+                        launch()
+        return None, last_error
+    finally:
+        stop.set()  # 叫停落选的请求
+        executor.shutdown(wait=False)  # 不阻塞调用方
+        stats.save()
+        _save_when_done(list(running), stats)
+
+
+def _save_when_done(futures, stats):
+    """落选的请求全部结束后再保存一次统计，把它们在叫停前得出的结果也写入文件。"""
+    if not futures:
+        return
+    lock = threading.Lock()
+    remaining = [len(futures)]
+
+    def on_done(_):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            stats.save()
+
+    for fut in futures:
+        fut.add_done_callback(on_done)
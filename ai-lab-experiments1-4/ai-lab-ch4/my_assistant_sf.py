@@ -4,39 +4,70 @@
 import requests  # 用于发送HTTP请求
 import json      # 用于处理JSON数据
 import base64    # 用于base64编码（虽然当前代码中未使用）
+import os, sys   # 用于定位共享的 sflib 包
+import tempfile  # 下载图片时先写入临时文件
+import time      # 生成文件名中的时间戳
+from concurrent.futures import ThreadPoolExecutor  # 并发下载多张图片
+
+# 让脚本能导入上级目录中共享的 sflib 包（带连接池的HTTP客户端）
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from sflib import telemetry
+from sflib.aio_client import get_async_client
+from sflib.http_client import format_stats, get_client
+from sflib.response_cache import ResponseCache, format_cache_stats
+from sflib.sse import stream_chat
+from chat_context import ChatContext
+from model_race import DEFAULT_HEDGE_DELAY, FatalRaceError, ModelStats, RaceCancelled, race
 
 # 配置API相关参数
 API_KEY = ""  # 硅基流动API密钥
 API_URL = "https://api.siliconflow.cn/v1/chat/completions"  # 聊天对话API地址
 IMAGE_GENERATION_URL = "https://api.siliconflow.cn/v1/images/generations"  # 图片生成API地址
+STREAM_CHAT = True  # 聊天时是否使用流式输出（边生成边显示）
+HEDGE_DELAY = DEFAULT_HEDGE_DELAY  # 图片生成：首选模型多少秒未成功就同时尝试下一个模型
+# 各图片模型的成功率与耗时，用于调整尝试顺序；保存在脚本所在目录，与从哪个目录运行无关
+IMAGE_MODEL_STATS = ModelStats(os.path.join(os.path.dirname(os.path.abspath(__file__)), "image_model_stats.json"))
+EMOTION_CACHE = ResponseCache()  # 情感分析结果缓存：相同文本不重复调用API
 
-def call_ai_api(messages, model="Qwen/Qwen2.5-7B-Instruct"):
+def call_ai_api(messages, model="Qwen/Qwen2.5-7B-Instruct", cache=None):
     """
     调用AI聊天API进行对话
     
     参数:
         messages: 对话消息列表，格式为[{"role": "user", "content": "..."}]
         model: 使用的AI模型，默认为Qwen2.5-7B-Instruct
+        cache: 可选的响应缓存（ResponseCache）；传入时相同请求直接返回缓存结果
     
     返回:
         API响应的JSON数据
     """
-    # 设置请求头，包含API密钥和内容类型
-    headers = {
-        "Authorization": f"Bearer {API_KEY}",
-        "Content-Type": "application/json"
-    }
+    # 通过共享客户端发送请求：复用连接池中的连接，遇到 429/5xx 自动退避重试，
+    # 仍失败时抛出 requests 异常（如 HTTPError）；传入 cache 时相同请求直接返回缓存结果
+    return get_client().chat(messages, model, API_KEY, url=API_URL, cache=cache)
+
+async def call_ai_api_async(messages, model="Qwen/Qwen2.5-7B-Instruct", cache=None):
+    """
+    call_ai_api 的异步版本（需在 asyncio 事件循环中 await）
     
-    # 构建请求数据
-    data = {
-        "model": model,        # 指定使用的AI模型
-        "messages": messages,  # 对话历史
-        "stream": False       # 不使用流式输出
-    }
+    参数与返回值同 call_ai_api；请求走共享的 aiohttp 连接池，
+    与同步版本共用限流、重试与熔断，失败时同样抛出 requests 异常
+    """
+    return await get_async_client().chat(messages, model, API_KEY, url=API_URL, cache=cache)
+
+def call_ai_api_stream(messages, model="Qwen/Qwen2.5-7B-Instruct"):
+    """
+    以流式方式调用AI聊天API：收到一段文字就立即打印一段
+    
+    参数:
+        messages: 对话消息列表
+        model: 使用的AI模型
     
-    # 发送POST请求到API
-    response = requests.post(API_URL, headers=headers, json=data)
-    return response.json()  # 返回JSON格式的响应
+    返回:
+        StreamResult对象：text 为完整回复，另含首字延迟(ttft)与生成速度(tokens_per_s)
+    """
+    # 每收到一段增量文本就打印出来，flush=True 保证立即显示在终端上
+    return stream_chat(messages, model, API_KEY, url=API_URL,
+                       on_delta=lambda piece: print(piece, end="", flush=True))
 
 def generate_image_function():
     """
@@ -61,13 +92,11 @@ def generate_image_function():
     }
     size = size_options.get(size_choice, "1024x1024")  # 默认使用1024x1024
     
-    # 设置请求头
-    headers = {
-        "Authorization": f"Bearer {API_KEY}",
-        "Content-Type": "application/json"
-    }
+    # 让用户选择生成数量
+    count_choice = input("生成几张图片？(1-4, 默认1): ").strip()
+    n = int(count_choice) if count_choice in ("1", "2", "3", "4") else 1
     
-    # 尝试不同的图片生成模型（按优先级排序）
+    # 候选的图片生成模型（默认优先级，实际顺序会根据历史成功率和耗时自动调整）
     models_to_try = [
         "stabilityai/stable-diffusion-xl-base-1.0",  # Stable Diffusion XL
         "runwayml/stable-diffusion-v1-5",            # Stable Diffusion v1.5
@@ -75,104 +104,186 @@ def generate_image_function():
         "black-forest-labs/FLUX.1-dev"               # FLUX开发模型
     ]
     
-    # 依次尝试每个模型
-    for model in models_to_try:
-        print(f"\n尝试使用模型: {model}")
-        
+    def request_image(model, stop):
+        """向单个模型发起图片生成请求，成功返回图片URL列表，失败抛出异常；stop 被设置表示比赛已结束"""
+        def say(msg):
+            if not stop.is_set():  # 比赛结束后落选的请求不再打印，以免打断用户输入
+                print(msg)
+
         # 构建图片生成请求数据
         data = {
             "model": model,           # 指定图片生成模型
             "prompt": prompt,         # 图片描述
             "size": size,            # 图片尺寸
-            "n": 1,                  # 生成图片数量
+            "n": n,                  # 生成图片数量
             "response_format": "url"  # 返回格式为URL
         }
-        
-        print("正在生成图片，请稍候...")
         try:
-            # 发送图片生成请求，设置60秒超时
-            response = requests.post(IMAGE_GENERATION_URL, headers=headers, json=data, timeout=60)
-            
+            # 发送图片生成请求，设置60秒超时；stream=True 表示先只接收响应头，正文按需再读
+            response = get_client().post(IMAGE_GENERATION_URL, API_KEY, data, timeout=60, stream=True)
+        except requests.exceptions.Timeout:
+            say(f"模型 {model} 请求超时")
+            raise
+        except Exception as e:
+            say(f"模型 {model} 出错: {e}")
+            raise
+        
+        with response:
+            if stop.is_set():
+                # 比赛已结束：不读取正文，直接关闭连接
+                raise RaceCancelled(model)
             # 检查响应状态
             if response.status_code == 200:
                 result = response.json()
                 # 检查返回数据是否有效
                 if "data" in result and len(result["data"]) > 0:
-                    image_url = result["data"][0]["url"]
-                    print(f"\n🎨 图片生成成功！")
-                    print(f"🔗 图片URL: {image_url}")
-                    
-                    # 询问是否要下载图片
-                    download = input("是否下载图片？(y/n, 默认n): ").strip().lower()
-                    if download == 'y' or download == 'yes':
-                        download_image(image_url, prompt)
-                    return  # 成功生成，退出函数
-            else:
-                print(f"模型 {model} 失败: {response.status_code}")
-                # 如果不是400错误，直接退出（可能是认证问题）
-                if response.status_code != 400:
-                    break
-                    
-        except requests.exceptions.Timeout:
-            print(f"模型 {model} 请求超时")
-            continue  # 尝试下一个模型
-        except Exception as e:
-            print(f"模型 {model} 出错: {e}")
-            continue  # 尝试下一个模型
+                    return [item["url"] for item in result["data"]]
+                say(f"模型 {model} 返回数据为空")
+                raise ValueError("empty image data")
+        say(f"模型 {model} 失败: {response.status_code}")
+        # 如果是认证/权限错误，换模型也不会成功，直接结束比赛
+        if response.status_code in (401, 403):
+            raise FatalRaceError(f"HTTP {response.status_code}")
+        raise ValueError(f"HTTP {response.status_code}")
+    
+    # 多个模型赛跑：先请求表现最好的模型，超过 HEDGE_DELAY 秒仍未成功就追加下一个，谁先成功用谁
+    print("正在生成图片，请稍候...")
+    model, image_urls = race(models_to_try, request_image, IMAGE_MODEL_STATS,
+                            hedge_delay=HEDGE_DELAY,
+                            on_start=lambda m: print(f"尝试使用模型: {m}"))
+    if model is not None:
+        print(f"\n🎨 图片生成成功！（模型: {model}）")
+        for image_url in image_urls:
+            print(f"🔗 图片URL: {image_url}")
+        
+        # 询问是否要下载图片（多张图片会并发下载）
+        download = input("是否下载图片？(y/n, 默认n): ").strip().lower()
+        if download == 'y' or download == 'yes':
+            download_images(image_urls, prompt)
+        return  # 成功生成，退出函数
     
     print("\n❌ 所有模型尝试失败，请检查API密钥或网络连接")
 
-def download_image(image_url, prompt):
+def sniff_image_ext(head):
     """
-    下载生成的图片到本地
+    根据文件开头的几个字节（“魔数”）判断图片格式
+    
+    参数:
+        head: 图片数据的前若干字节（至少12字节即可判断）
+    
+    返回:
+        文件扩展名，如 '.jpg'；无法识别时默认 '.png'
+    """
+    if head.startswith(b'\xff\xd8'):
+        return '.jpg'
+    elif head.startswith(b'\x89PNG'):
+        return '.png'
+    elif head.startswith(b'GIF87a') or head.startswith(b'GIF89a'):
+        return '.gif'
+    elif head.startswith(b'RIFF') and b'WEBP' in head[:12]:
+        return '.webp'
+    return '.png'  # 默认使用png
+
+def download_image(image_url, prompt, index=None):
+    """
+    下载生成的图片到本地（流式下载，边收边写盘）
     
     参数:
         image_url: 图片的URL地址
         prompt: 图片描述，用于生成文件名
+        index: 同一批多张图片时的序号，会加在文件名中避免重名
+    
+    返回:
+        保存的文件名；失败时返回 None
+    
+    说明:
+        数据按 64KB 分块读取，先写入临时文件（.part），下载完整后再原子地重命名为正式文件名，
+        因此内存占用与图片大小无关，中途失败也不会留下半张图片。
     """
+    tmp_name = None
     try:
-        # 下载图片
-        response = requests.get(image_url, timeout=30)
-        if response.status_code == 200:
-            # 检测图片格式
-            content = response.content
-            if content.startswith(b'\xff\xd8'):
-                ext = '.jpg'
-            elif content.startswith(b'\x89PNG'):
-                ext = '.png'
-            elif content.startswith(b'GIF87a') or content.startswith(b'GIF89a'):
-                ext = '.gif'
-            elif content.startswith(b'RIFF') and b'WEBP' in content[:12]:
-                ext = '.webp'
-            else:
-                ext = '.png'  # 默认使用png
+        # 以流式方式下载图片：此时只收到响应头，正文尚未读取
+        response = get_client().get(image_url, timeout=30, stream=True)
+        with response:
+            if response.status_code != 200:
+                print(f"❌ 下载图片失败: {response.status_code}")
+                return None
             
             # 生成安全的文件名：使用时间戳 + 描述前10个字符
-            import time
             timestamp = int(time.time())
             # 处理中文和特殊字符，保留字母数字和中文字符
             safe_prompt = "".join(c for c in prompt[:10] if c.isalnum() or '\u4e00' <= c <= '\u9fff')
             if not safe_prompt:  # 如果没有有效字符，使用默认名称
                 safe_prompt = "generated_image"
+            if index is not None:
+                safe_prompt = f"{safe_prompt}_{index}"
             
-            filename = f"{safe_prompt}_{timestamp}{ext}"
+            # 先写入同目录下的临时文件，格式要等读到开头几个字节后才能确定
+            fd, tmp_name = tempfile.mkstemp(prefix=f".{safe_prompt}_", suffix=".part", dir=".")
+            head = b""
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    if len(head) < 12:
+                        head += chunk[:12 - len(head)]  # 只保留开头12字节用于判断格式
+                    f.write(chunk)
             
-            # 以二进制写入模式保存图片
-            with open(filename, 'wb') as f:
-                f.write(content)
-            print(f"✅ 图片已保存为: {filename}")
-        else:
-            print(f"❌ 下载图片失败: {response.status_code}")
+            # 下载完整后，根据开头字节确定扩展名，并原子地重命名为正式文件名
+            filename = f"{safe_prompt}_{timestamp}{sniff_image_ext(head)}"
+            os.chmod(tmp_name, 0o644)  # 临时文件默认仅本人可读，改回普通文件权限
+            os.replace(tmp_name, filename)
+            tmp_name = None
+        print(f"✅ 图片已保存为: {filename}")
+        return filename
     except Exception as e:
         print(f"❌ 保存图片时出错: {e}")
+        return None
+    finally:
+        if tmp_name and os.path.exists(tmp_name):
+            os.remove(tmp_name)  # 清理未下载完整的临时文件
+
+def download_images(image_urls, prompt, max_workers=4):
+    """
+    并发下载多张图片
+    
+    参数:
+        image_urls: 图片URL列表
+        prompt: 图片描述，用于生成文件名
+        max_workers: 同时下载的最大数量
+    
+    返回:
+        成功保存的文件名列表（与 image_urls 顺序一致，失败的为 None）
+    """
+    if len(image_urls) == 1:
+        return [download_image(image_urls[0], prompt)]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(download_image, url, prompt, i + 1) for i, url in enumerate(image_urls)]
+        return [f.result() for f in futures]
+
+def summarize_history(old_summary, turns):
+    """
+    把若干轮旧对话增量合并进已有摘要（由聊天上下文管理器在后台调用）
+    
+    参数:
+        old_summary: 之前的摘要（可能为空字符串）
+        turns: 待合并的消息列表
+    
+    返回:
+        新的摘要文本
+    """
+    dialog = "\n".join(f"{'用户' if m['role'] == 'user' else 'AI'}: {m['content']}" for m in turns)
+    prompt = (f"已有对话摘要：\n{old_summary or '（无）'}\n\n新增对话：\n{dialog}\n\n"
+              "请把新增对话的要点合并进已有摘要，保留用户的偏好、事实和未完成的问题，不超过200字，只输出摘要。")
+    result = call_ai_api([{"role": "user", "content": prompt}])
+    return result["choices"][0]["message"]["content"].strip()
 
 def chat_function():
     """
     智能聊天功能
     与AI进行连续对话，支持上下文记忆
+    较早的对话会在后台折叠成摘要，每次请求携带的历史长度保持在预算以内
     """
     print("\n💬 聊天模式（输入'返回'退出聊天）")
-    messages = []  # 存储对话历史
+    context = ChatContext(summarize_history)  # 管理对话历史（最近几轮原样保留 + 旧对话摘要）
     
     while True:
         # 获取用户输入
@@ -180,18 +291,60 @@ def chat_function():
         if user_input == '返回':
             break  # 退出聊天模式
         
-        # 将用户消息添加到对话历史
-        messages.append({"role": "user", "content": user_input})
+        # 将用户消息添加到对话历史，并取出本次要发送的消息（受 token 预算约束）
+        context.add("user", user_input)
+        messages = context.build_messages()
         
-        # 调用AI API获取回复
-        result = call_ai_api(messages)
-        reply = result["choices"][0]["message"]["content"]
-        
-        # 显示AI回复
-        print(f"AI: {reply}")
+        try:
+            if STREAM_CHAT:
+                # 流式模式：回复边生成边显示，结束后显示首字延迟和生成速度
+                print("AI: ", end="", flush=True)
+                result = call_ai_api_stream(messages)
+                reply = result.text
+                print(f"\n   ({result.summary()})")
+            else:
+                # 调用AI API获取回复
+                result = call_ai_api(messages)
+                reply = result["choices"][0]["message"]["content"]
+                
+                # 显示AI回复
+                print(f"AI: {reply}")
+        except (requests.exceptions.RequestException, ValueError, KeyError, IndexError) as e:
+            # 重试后仍失败（如限流、服务端错误、网络问题），或返回的数据格式不对（如流式 data: 不是合法 JSON）：
+            # 提示用户，本轮不计入对话历史
+            print(f"\n❌ 请求失败: {e}")
+            context.discard_last()  # 撤回本轮用户消息
+            continue
         
         # 将AI回复添加到对话历史，保持上下文
-        messages.append({"role": "assistant", "content": reply})
+        context.add("assistant", reply)
+    
+    context.close()
+
+def emotion_messages(text):
+    """构建情感分析请求"""
+    return [{"role": "user", "content": f"分析这段话的情感: {text}"}]
+
+async def analyze_emotion_async(text):
+    """
+    情感分析的异步版本
+    
+    参数:
+        text: 要分析的文本
+    
+    返回:
+        情感分析结果文本
+    """
+    result = await call_ai_api_async(emotion_messages(text), cache=EMOTION_CACHE)
+    return result["choices"][0]["message"]["content"]
+
+async def chat_async(messages, model="Qwen/Qwen2.5-7B-Instruct"):
+    """
+    单轮聊天的异步版本：传入完整的对话消息，返回助理回复文本
+    （对话历史由调用方维护，例如使用 ChatContext.build_messages()）
+    """
+    result = await call_ai_api_async(messages, model)
+    return result["choices"][0]["message"]["content"]
 
 def analyze_emotion_function():
     """
@@ -202,10 +355,14 @@ def analyze_emotion_function():
     text = input("请输入要分析情感的文本: ")
     
     # 构建情感分析请求
-    messages = [{"role": "user", "content": f"分析这段话的情感: {text}"}]
+    messages = emotion_messages(text)
     
-    # 调用AI API进行情感分析
-    result = call_ai_api(messages)
+    # 调用AI API进行情感分析（相同文本命中缓存，不再重复请求）
+    try:
+        result = call_ai_api(messages, cache=EMOTION_CACHE)
+    except requests.exceptions.RequestException as e:
+        print(f"❌ 请求失败: {e}")
+        return
     analysis = result["choices"][0]["message"]["content"]
     
     # 显示分析结果
@@ -213,6 +370,9 @@ def analyze_emotion_function():
 
 # 主程序入口
 if __name__ == "__main__":
+    # 运行时加 --stats 参数（python my_assistant_sf.py --stats），退出时显示每类请求的耗时与token用量
+    request_stats = telemetry.setup(stats="--stats" in sys.argv[1:])
+    
     # 显示程序标题
     print("🤖 我的AI个人助理")
     print("=" * 40)
@@ -238,6 +398,10 @@ if __name__ == "__main__":
             analyze_emotion_function()  # 情感分析
         elif choice == '4':
             print("再见！感谢使用AI助理！")
+            print(format_stats(get_client().stats()))  # 显示本次会话的连接复用情况
+            print(format_cache_stats(EMOTION_CACHE.stats()))  # 显示情感分析缓存命中情况
+            if request_stats is not None:
+                print(request_stats.summary())  # 显示请求耗时、最慢的请求与token最多的提示词
             break  # 退出程序
         else:
             print("输入错误，请重新选择！")  # 无效输入提示
\ No newline at end of file
@@ -7,14 +7,32 @@
 功能：
 - 中英互译：--direction zh2en / en2zh
 - 语气风格：--tone formal|informal|friendly|academic
-- 自动分段：对较长文本做简单分段，逐段翻译后合并
+- 自动分段：按句子边界和 token 预算分段，并发翻译后按原顺序合并（--concurrency）
+- 文件/管道：--input/--output 指定文件或 "-"（标准输入输出），边读边译边写，内存占用与文件大小无关
 
 与实验四不同：本工具专注“翻译+语气控制”，而非综合助理。
 """
 
 import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Iterable, Iterator, List, Optional, Union
+
 import requests
-from typing import List
+
+from translation_memory import (DEFAULT_MAX_BYTES, DEFAULT_MAX_ENTRIES, DEFAULT_TM_PATH, TranslationMemory,
+                                format_tm_stats)
+
+# 让脚本能导入仓库根目录下共享的 sflib 包
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from sflib import telemetry  # noqa: E402
+from sflib.aio_client import get_async_client  # noqa: E402
+from sflib.chunker import chunk_list, iter_chunks  # noqa: E402
+from sflib.http_client import format_stats, get_client  # noqa: E402
+from sflib.parallel import DEFAULT_CONCURRENCY, ordered_imap, ordered_map_async  # noqa: E402
+from sflib.streams import STDIO, open_input, open_output  # noqa: E402
 
 
 API_URL = "https://api.siliconflow.cn/v1/chat/completions"
@@ -22,6 +40,10 @@ API_URL = "https://api.siliconflow.cn/v1/chat/completions"
 API_KEY = ""
 # 默认聊天模型，可在命令行参数里覆盖
 DEFAULT_MODEL = "Qwen/Qwen2.5-7B-Instruct"
+# 单个分段失败时的重试次数（只重试该段，不影响其它段）
+DEFAULT_RETRIES = 2
+# 每个分段的 token 预算
+CHUNK_TOKENS = 600
 
 
 TONE_SYSTEM_PROMPTS = {
@@ -46,63 +68,162 @@ def call_chat_api(messages, model: str = DEFAULT_MODEL):
     返回：
         模型生成的文本内容（字符串）
     """
-    headers = {
-        "Authorization": f"Bearer {API_KEY}",
-        "Content-Type": "application/json",
-    }
-    data = {
-        "model": model,
-        "messages": messages,
-        "stream": False,
-    }
-    resp = requests.post(API_URL, headers=headers, json=data, timeout=60)
-    resp.raise_for_status()
-    j = resp.json()
+    # 通过共享连接池发送请求，复用已建立的 TCP+TLS 连接
+    j = get_client().chat(messages, model=model, api_key=API_KEY, url=API_URL)
+    return j["choices"][0]["message"]["content"].strip()
+
+
+async def call_chat_api_async(messages, model: str = DEFAULT_MODEL):
+    """call_chat_api 的协程版本，走共享的 aiohttp 连接池。"""
+    j = await get_async_client().chat(messages, model=model, api_key=API_KEY, url=API_URL)
     return j["choices"][0]["message"]["content"].strip()
 
 
-def chunk_text(text: str, max_len: int = 600) -> List[str]:
-    """将较长文本按长度粗略切片，避免超长上下文。
+def chunk_text(text: str, max_tokens: int = CHUNK_TOKENS) -> List[str]:
+    """将较长文本切分为不超过 max_tokens 的分段，避免超长上下文。
 
     说明：
-    - 为简化演示，按固定长度切；实际可按句号/段落更智能地切分。
+    - 使用共享分段器，只在句子/段落边界（含中文。！？）处断开；
+    - 按 token 而非字符计量，中英文都能尽量填满每段。
     """
-    chunks: List[str] = []
-    start = 0
-    while start < len(text):
-        end = min(start + max_len, len(text))
-        chunks.append(text[start:end])
-        start = end
-    return chunks
+    return chunk_list(text, max_tokens)
+
+
+def build_user_prompt(part: str, direction: str) -> str:
+    """根据翻译方向构造单个分段的用户提示词。"""
+    if direction == "zh2en":
+        return f"Translate the following Chinese into English with the specified tone. Text:\n{part}"
+    if direction == "en2zh":
+        return f"请将以下英文翻译成中文，并遵循指定语气风格。文本：\n{part}"
+    raise ValueError("direction must be zh2en or en2zh")
+
+
+def build_messages(part: str, system_prompt: str, direction: str):
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": build_user_prompt(part, direction)},
+    ]
+
+
+def translate_part(part: str, system_prompt: str, direction: str,
+                   retries: int = DEFAULT_RETRIES, model: str = DEFAULT_MODEL) -> str:
+    """翻译单个分段；网络错误或响应格式异常时只重试这一段。"""
+    messages = build_messages(part, system_prompt, direction)
+    for attempt in range(retries + 1):
+        try:
+            return call_chat_api(messages, model=model)
+        except (requests.RequestException, KeyError, IndexError, ValueError):
+            if attempt == retries:
+                raise
+            time.sleep(0.5 * (2 ** attempt))  # 简单指数退避：0.5s、1s、2s……
+
+
+async def translate_part_async(part: str, system_prompt: str, direction: str,
+                               retries: int = DEFAULT_RETRIES, model: str = DEFAULT_MODEL) -> str:
+    """translate_part 的协程版本。"""
+    messages = build_messages(part, system_prompt, direction)
+    for attempt in range(retries + 1):
+        try:
+            return await call_chat_api_async(messages, model=model)
+        except (requests.RequestException, KeyError, IndexError, ValueError):
+            if attempt == retries:
+                raise
+            await asyncio.sleep(0.5 * (2 ** attempt))
+
+
+def split_whitespace(part: str):
+    """把分段拆成 (开头空白, 正文, 结尾空白)。
+
+    分段器在句子/段落边界断开，段尾带着原文的空格或空行；模型的回复会被 strip，
+    所以只把正文交给模型，译完再把两端空白原样拼回，整篇译文的分段、换行才与原文一致。
+    """
+    body = part.strip()
+    if not body:
+        return part, "", ""
+    lead = part[:len(part) - len(part.lstrip())]
+    return lead, body, part[len(lead) + len(body):]
+
+
+def resolve_tone(tone: str, direction: str):
+    """返回 (实际使用的语气, system 提示)；未知语气回退为 formal。"""
+    if tone not in TONE_SYSTEM_PROMPTS:
+        tone = "formal"
+    build_user_prompt("", direction)  # 提前校验 direction，避免发出请求后才报错
+    return tone, TONE_SYSTEM_PROMPTS[tone]
 
 
-def translate(text: str, direction: str, tone: str) -> str:
+def translate(text: str, direction: str, tone: str,
+              concurrency: int = DEFAULT_CONCURRENCY,
+              retries: int = DEFAULT_RETRIES,
+              model: str = DEFAULT_MODEL,
+              memory: Optional[TranslationMemory] = None) -> str:
     """执行翻译并控制语气风格。
 
     - 根据 direction 决定中英方向；
     - 使用 system 提示控制整体语气风格；
-    - 对长文本分段翻译后拼接。
+    - 对长文本分段后最多 concurrency 段并发翻译，按原顺序拼接；
+    - 某段失败时单独重试最多 retries 次，不必整篇重来；
+    - 传入 memory（翻译记忆库）时，命中的分段直接复用译文，不再调用API。
     """
-    if tone not in TONE_SYSTEM_PROMPTS:
-        tone = "formal"
-    system_prompt = TONE_SYSTEM_PROMPTS[tone]
+    return "".join(translate_iter(text, direction, tone, concurrency, retries, model, memory))
 
-    if direction == "zh2en":
-        user_prompt = f"Translate the following Chinese into English with the specified tone. Text:\n{text}"
-    elif direction == "en2zh":
-        user_prompt = f"请将以下英文翻译成中文，并遵循指定语气风格。文本：\n{text}"
-    else:
-        raise ValueError("direction must be zh2en or en2zh")
-
-    # 长文本分段，逐段翻译再合并，降低超长导致的失败概率
-    parts = chunk_text(text)
-    outputs: List[str] = []
-    for part in parts:
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt.replace(text, part)},
-        ]
-        outputs.append(call_chat_api(messages))
+
+def translate_iter(source: Union[str, Iterable[str]], direction: str, tone: str,
+                   concurrency: int = DEFAULT_CONCURRENCY,
+                   retries: int = DEFAULT_RETRIES,
+                   model: str = DEFAULT_MODEL,
+                   memory: Optional[TranslationMemory] = None) -> Iterator[str]:
+    """translate 的流式版本：source 可以是字符串或文件对象，按原顺序逐段产出译文。
+
+    分段边读边切、边切边提交，同时在途的分段最多 2×concurrency 个，
+    前面的分段一译完就能写出，处理大文件时内存占用与文件大小无关。
+    """
+    tone, system_prompt = resolve_tone(tone, direction)
+
+    def run(part: str) -> str:
+        lead, body, tail = split_whitespace(part)
+        if not body:
+            return part  # 只有空白（如文件开头的空行），原样输出
+        if memory is not None:
+            cached = memory.get(body, direction, tone, model)
+            if cached is not None:
+                return lead + cached + tail
+        out = translate_part(body, system_prompt, direction, retries, model)
+        if memory is not None:
+            memory.put(body, direction, tone, model, out)
+        return lead + out + tail
+
+    # 长文本分段，并发翻译再按顺序产出，降低超长导致的失败概率
+    return ordered_imap(run, iter_chunks(source, CHUNK_TOKENS), concurrency)
+
+
+async def translate_async(text: str, direction: str, tone: str,
+                          concurrency: int = DEFAULT_CONCURRENCY,
+                          retries: int = DEFAULT_RETRIES,
+                          model: str = DEFAULT_MODEL,
+                          memory: Optional[TranslationMemory] = None) -> str:
+    """translate 的协程版本，供 asyncio 服务调用；分段在同一事件循环内并发，不占用线程。
+
+    翻译记忆库是阻塞的 SQLite 读写，放到默认线程池里执行，一次较慢的提交不会卡住同一事件循环里的其它协程。
+    """
+    tone, system_prompt = resolve_tone(tone, direction)
+    parts = chunk_text(text, CHUNK_TOKENS)
+    loop = asyncio.get_running_loop()
+
+    async def run(part: str) -> str:
+        lead, body, tail = split_whitespace(part)
+        if not body:
+            return part
+        if memory is not None:
+            cached = await loop.run_in_executor(None, memory.get, body, direction, tone, model)
+            if cached is not None:
+                return lead + cached + tail
+        out = await translate_part_async(body, system_prompt, direction, retries, model)
+        if memory is not None:
+            await loop.run_in_executor(None, memory.put, body, direction, tone, model, out)
+        return lead + out + tail
+
+    outputs = await ordered_map_async(run, parts, concurrency)
     return "".join(outputs)
 
 
@@ -112,22 +233,63 @@ def main():
     parser.add_argument("--direction", type=str, choices=["zh2en", "en2zh"], default="zh2en")
     parser.add_argument("--tone", type=str, choices=list(TONE_SYSTEM_PROMPTS.keys()), default="formal")
     parser.add_argument("--model", type=str, default=DEFAULT_MODEL)
+    parser.add_argument("--input", type=str, default=None, help="从文件翻译（\"-\" 表示标准输入），译完即退出")
+    parser.add_argument("--output", type=str, default=STDIO, help="配合 --input：译文写入该文件（默认标准输出）")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="分段并发翻译数，1 表示逐段顺序翻译")
+    parser.add_argument("--tm-path", type=str, default=DEFAULT_TM_PATH, help="翻译记忆库（SQLite）文件路径")
+    parser.add_argument("--no-tm", action="store_true", help="不使用翻译记忆库")
+    parser.add_argument("--tm-max-entries", type=int, default=DEFAULT_MAX_ENTRIES, help="翻译记忆库最多保留的条目数")
+    parser.add_argument("--tm-max-bytes", type=int, default=DEFAULT_MAX_BYTES,
+                        help="翻译记忆库最多保留的原文+译文总字节数")
+    parser.add_argument("--tm-ttl-days", type=float, default=30, help="翻译记忆条目的有效天数")
+    parser.add_argument("--pool-stats", action="store_true", help="退出时打印连接池复用与等待统计")
+    parser.add_argument("--stats", action="store_true", help="退出时打印逐请求的耗时/字节/token 汇总，以及最慢的请求")
+    parser.add_argument("--telemetry-jsonl", type=str, default=None, help="把每个请求的耗时与用量追加写入该 JSONL 文件")
+    parser.add_argument("--telemetry-prom", type=str, default=None, help="退出时把统计以 Prometheus 文本格式写入该文件")
     args = parser.parse_args()
 
     if not API_KEY:
         print("❌ 请先设置环境变量 SILICONFLOW_API_KEY 或在代码中填写 API_KEY")
         return
 
-    result = translate(args.text, args.direction, args.tone)
-    print(result)
+    hist = telemetry.setup(args.stats, args.telemetry_jsonl, args.telemetry_prom)
+    memory = None
+    if not args.no_tm:
+        memory = TranslationMemory(args.tm_path, max_entries=args.tm_max_entries, max_bytes=args.tm_max_bytes,
+                                   ttl_seconds=args.tm_ttl_days * 24 * 3600)
+
+    # 文件模式下统计信息写到标准错误，避免混进通过管道输出的译文
+    log = sys.stderr if args.input else sys.stdout
+    if args.input:
+        # 文件/管道模式：逐段读取、翻译，译好一段立即写出
+        with open_input(args.input) as src, open_output(args.output) as out:
+            for piece in translate_iter(src, args.direction, args.tone, args.concurrency,
+                                        model=args.model, memory=memory):
+                out.write(piece)
+                out.flush()
+    else:
+        result = translate(args.text, args.direction, args.tone, args.concurrency,
+                           model=args.model, memory=memory)
+        print(result)
+
+        # 交互模式：持续读取用户输入并翻译
+        print("\n进入交互模式(输入 exit 退出)：")
+        while True:
+            line = input("> ").strip()
+            if not line or line.lower() == "exit":
+                break
+            print(translate(line, args.direction, args.tone, args.concurrency,
+                            model=args.model, memory=memory))
+
+    if memory is not None:
+        print(format_tm_stats(memory.stats()), file=log)
+        memory.close()
 
-    # 交互模式：持续读取用户输入并翻译
-    print("\n进入交互模式(输入 exit 退出)：")
-    while True:
-        line = input("> ").strip()
-        if not line or line.lower() == "exit":
-            break
-        print(translate(line, args.direction, args.tone))
+    if args.pool_stats:
+        print(format_stats(get_client().stats()), file=log)
+    if hist is not None:
+        print(hist.summary(), file=log)
+    telemetry.shutdown()
 
 
 if __name__ == "__main__":
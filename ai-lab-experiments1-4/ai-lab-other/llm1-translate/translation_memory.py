@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+翻译记忆库（Translation Memory）：把已翻译过的分段存到本地 SQLite，命中时直接复用译文。
+
+- 键：规范化后的原文分段 + 翻译方向 + 语气 + 模型，取 SHA-256；
+- 淘汰：超过 TTL 的条目失效；条目数或总字节数超限时按最近使用时间（LRU）删除最旧的；
+  条目数与总字节数在打开时统计一次，之后随插入/删除增减，每次写入不必扫描全表；
+- 统计：命中/未命中次数、命中率，以及因命中而省下的请求+响应字节数。
+
+与 translate_tone.py 配合使用，见其 --tm-path / --no-tm 参数。
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, Optional
+
+
+DEFAULT_TM_PATH = "translation_memory.db"
+DEFAULT_MAX_ENTRIES = 100_000
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024   # 256 MB
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600    # 30 天
+
+
+def normalize_segment(text: str) -> str:
+    """规范化分段：统一全/半角形式、去掉首尾空白、把连续空白折叠为一个空格。"""
+    text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.split())
+
+
+def make_key(segment: str, direction: str, tone: str, model: str) -> str:
+    raw = "\x1f".join([normalize_segment(segment), direction, tone, model])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TranslationMemory:
+    """基于 SQLite 的翻译记忆库，线程安全（内部加锁），可在并发翻译中共用。"""
+
+    def __init__(self, path: str = DEFAULT_TM_PATH,
+                 max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tm ("
+            " key TEXT PRIMARY KEY,"
+            " target TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tm_last_used ON tm(last_used)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tm_created ON tm(created)")
+        self._conn.commit()
+        # 当前条目数与总字节数（只在打开时扫描一次）
+        self._count, self._bytes = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM tm").fetchone()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def get(self, segment: str, direction: str, tone: str, model: str) -> Optional[str]:
+        """查找译文；命中时刷新最近使用时间，过期条目视为未命中并删除。"""
+        key = make_key(segment, direction, tone, model)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT target, size, created FROM tm WHERE key=?", (key,)).fetchone()
+            if row is not None and now - row[2] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM tm WHERE key=?", (key,))
+                self._conn.commit()
+                self._count -= 1
+                self._bytes -= row[1]
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE tm SET last_used=? WHERE key=?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            self.bytes_saved += row[1]
+            return row[0]
+
+    def put(self, segment: str, direction: str, tone: str, model: str, target: str):
+        """写入一条译文，并在超出容量时淘汰最久未使用的条目。"""
+        key = make_key(segment, direction, tone, model)
+        now = time.time()
+        # 记录“命中一次能省下的字节数”：原文（请求体）+ 译文（响应体）
+        size = len(segment.encode("utf-8")) + len(target.encode("utf-8"))
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM tm WHERE key=?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tm(key, target, size, created, last_used) VALUES (?,?,?,?,?)",
+                (key, target, size, now, now),
+            )
+            if old is None:
+                self._count += 1
+            self._bytes += size - (old[0] if old else 0)
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        # 过期条目：created 上有索引，只读取过期的那部分
+        cutoff = now - self.ttl_seconds
+        n, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM tm WHERE created < ?",
+                                     (cutoff,)).fetchone()
+        if n:
+            self._conn.execute("DELETE FROM tm WHERE created < ?", (cutoff,))
+            self._count -= n
+            self._bytes -= size
+        count, total = self._count, self._bytes
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # 按最近使用时间从旧到新删除，直到条目数和字节数都回到上限以内
+        cursor = self._conn.execute("SELECT key, size FROM tm ORDER BY last_used ASC")
+        doomed = []
+        for key, size in cursor:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            count -= 1
+            total -= size
+        self._conn.executemany("DELETE FROM tm WHERE key=?", doomed)
+        self._count, self._bytes = count, total
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        with self._lock:
+            entries = self._count
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "entries": entries,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def format_tm_stats(stats: Dict[str, float]) -> str:
+    return (f"翻译记忆: 命中 {stats['hits']} / 查询 {stats['hits'] + stats['misses']} "
+            f"(命中率 {stats['hit_rate']:.0%}), 节省 {stats['bytes_saved']} 字节, 库中 {stats['entries']} 条")
@@ -9,94 +9,452 @@
 - detailed: 详细
 - bullet: 要点列表
 
+文件/管道：--input/--output 指定文件或 "-"（标准输入输出），边读边总结，
+逐层合并的小结只保留未满一组的部分，内存占用与文件大小无关。
+
 与实验四不同：专注摘要流程，不提供多功能菜单。
 """
 
 import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+import zlib
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
 import requests
-from typing import List
+
+# 让脚本能导入仓库根目录下共享的 sflib 包
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from sflib import telemetry  # noqa: E402
+from sflib.aio_client import get_async_client  # noqa: E402
+from sflib.chunker import chunk_list, iter_anchored_chunks, iter_chunks  # noqa: E402
+from sflib.http_client import format_stats, get_client  # noqa: E402
+from sflib.parallel import DEFAULT_CONCURRENCY, ordered_imap, ordered_map, ordered_map_async  # noqa: E402
+from sflib.streams import STDIO, open_input, open_output  # noqa: E402
+from sflib.response_cache import ResponseCache, format_cache_stats  # noqa: E402
+from sflib.tokens import estimate_tokens  # noqa: E402
 
 
 API_URL = "https://api.siliconflow.cn/v1/chat/completions"
 # 直接在代码中设置API Key（示例：sk-xxxx）
 API_KEY = "sk-请在此处填写你的密钥"
 DEFAULT_MODEL = "Qwen/Qwen2.5-7B-Instruct"
+# 树形合并：每次合并最多多少份小结，以及单次合并提示词的 token 预算
+DEFAULT_FAN_IN = 8
+DEFAULT_REDUCE_BUDGET = 3000
+CHUNK_TOKENS = 800
+# 单段小结或单次合并失败时的重试次数（只重试这一次请求，不影响其它段）
+DEFAULT_RETRIES = 2
+# 可选的响应缓存：命令行加 --cache 时启用，相同段落的小结/合并请求直接复用结果
+RESPONSE_CACHE = None
 
 
 def call_chat(messages, model: str = DEFAULT_MODEL) -> str:
     """调用模型获取回复文本。"""
-    headers = {"Authorization": f"Bearer {API_KEY}", "Content-Type": "application/json"}
-    data = {"model": model, "messages": messages, "stream": False}
-    r = requests.post(API_URL, headers=headers, json=data, timeout=60)
-    r.raise_for_status()
-    j = r.json()
+    j = get_client().chat(messages, model=model, api_key=API_KEY, url=API_URL, cache=RESPONSE_CACHE)
     return j["choices"][0]["message"]["content"].strip()
 
 
-def split_text(text: str, max_len: int = 800) -> List[str]:
-    """粗略分段：按固定长度切片，避免上下文过长。"""
-    parts: List[str] = []
-    start = 0
-    while start < len(text):
-        end = min(start + max_len, len(text))
-        parts.append(text[start:end])
-        start = end
-    return parts
+async def call_chat_async(messages, model: str = DEFAULT_MODEL) -> str:
+    """call_chat 的协程版本，走共享的 aiohttp 连接池（同样使用 RESPONSE_CACHE）。"""
+    j = await get_async_client().chat(messages, model=model, api_key=API_KEY, url=API_URL, cache=RESPONSE_CACHE)
+    return j["choices"][0]["message"]["content"].strip()
 
 
-def summarize_chunk(chunk: str, style: str) -> str:
-    """对单段文本生成小结，样式由 style 控制。"""
+def call_chat_retry(messages, retries: int = DEFAULT_RETRIES, model: str = DEFAULT_MODEL) -> str:
+    """调用 call_chat；网络错误或响应格式异常时只重试这一次请求，一段失败不会让整篇摘要前功尽弃。"""
+    for attempt in range(retries + 1):
+        try:
+            return call_chat(messages, model=model)
+        except (requests.RequestException, KeyError, IndexError, ValueError):
+            if attempt == retries:
+                raise
+            time.sleep(0.5 * (2 ** attempt))  # 简单指数退避：0.5s、1s、2s……
+
+
+async def call_chat_retry_async(messages, retries: int = DEFAULT_RETRIES, model: str = DEFAULT_MODEL) -> str:
+    """call_chat_retry 的协程版本。"""
+    for attempt in range(retries + 1):
+        try:
+            return await call_chat_async(messages, model=model)
+        except (requests.RequestException, KeyError, IndexError, ValueError):
+            if attempt == retries:
+                raise
+            await asyncio.sleep(0.5 * (2 ** attempt))
+
+
+def split_text(text: str, max_tokens: int = CHUNK_TOKENS) -> List[str]:
+    """分段：在句子/段落边界处切分，每段不超过 max_tokens，避免上下文过长。"""
+    return chunk_list(text, max_tokens)
+
+
+def chunk_messages(chunk: str, style: str):
+    """构造单段小结的请求消息，样式由 style 控制。"""
     style_hint = {
         "concise": "Provide a concise summary in 2-3 sentences.",
         "detailed": "Provide a detailed summary in 5-7 sentences.",
         "bullet": "Provide bullet-point key takeaways.",
     }.get(style, "Provide a concise summary in 2-3 sentences.")
 
-    msgs = [
+    return [
         {"role": "system", "content": "You are a helpful summarization assistant."},
         {"role": "user", "content": f"{style_hint}\nText:\n{chunk}"},
     ]
-    return call_chat(msgs)
 
 
-def summarize_document(text: str, style: str) -> str:
-    """分段-合并策略的整体摘要：
-    1) 拆分文本；2) 每段小结；3) 合并小结得到最终摘要。
-    """
-    chunks = split_text(text)
-    partials = [summarize_chunk(c, style) for c in chunks]
-    joiner = "\n\n".join(partials)
+def summarize_chunk(chunk: str, style: str) -> str:
+    """对单段文本生成小结；失败时只重试这一段。"""
+    return call_chat_retry(chunk_messages(chunk, style))
 
-    # 合并阶段
-    style_hint = {
-        "concise": "Combine the following partial summaries into a concise final summary.",
-        "detailed": "Combine and elaborate into a detailed final summary.",
-        "bullet": "Merge into a clean bullet list of key points.",
-    }.get(style, "Combine into a concise final summary.")
 
-    msgs = [
+def merge_messages(partials: List[str], style: str, final: bool):
+    """构造合并若干份小结的请求消息。
+
+    - final=True：最终合并，按 style 输出；
+    - final=False：中间层合并，只要求保留要点，供上一层继续合并。
+    """
+    if final:
+        style_hint = {
+            "concise": "Combine the following partial summaries into a concise final summary.",
+            "detailed": "Combine and elaborate into a detailed final summary.",
+            "bullet": "Merge into a clean bullet list of key points.",
+        }.get(style, "Combine into a concise final summary.")
+    else:
+        style_hint = "Merge the following partial summaries into one shorter partial summary, keeping every key point."
+
+    joiner = "\n\n".join(partials)
+    return [
         {"role": "system", "content": "You are a helpful summarization assistant."},
         {"role": "user", "content": f"{style_hint}\nPartial summaries:\n{joiner}"},
     ]
-    return call_chat(msgs)
+
+
+def merge_summaries(partials: List[str], style: str, final: bool) -> str:
+    """把若干份小结合并为一份；失败时只重试这一次合并。"""
+    return call_chat_retry(merge_messages(partials, style, final))
+
+
+def group_for_reduce(partials: List[str], fan_in: int, token_budget: int) -> List[List[str]]:
+    """把相邻的小结分组：每组不超过 fan_in 份，且总 token 不超过 token_budget。
+
+    每组至少放两份小结（只剩一份时除外），保证每一层都能减少节点数。
+    """
+    groups: List[List[str]] = []
+    cur: List[str] = []
+    cur_tokens = 0
+    for p in partials:
+        t = estimate_tokens(p)
+        if len(cur) >= 2 and (len(cur) >= fan_in or cur_tokens + t > token_budget):
+            groups.append(cur)
+            cur, cur_tokens = [], 0
+        cur.append(p)
+        cur_tokens += t
+    if cur:
+        groups.append(cur)
+    return groups
+
+
+def needs_reduce(level: List[str], fan_in: int, token_budget: int) -> bool:
+    """当前这层小结是否还放不进一次最终合并。"""
+    return len(level) > fan_in or (len(level) > 1 and sum(estimate_tokens(p) for p in level) > token_budget)
+
+
+def tree_reduce(partials: List[str], style: str,
+                fan_in: int = DEFAULT_FAN_IN,
+                token_budget: int = DEFAULT_REDUCE_BUDGET,
+                concurrency: int = DEFAULT_CONCURRENCY) -> str:
+    """多层树形合并：逐层分组合并，直到剩余小结能放进一次最终合并。
+
+    层数由 token 预算自动决定：小结总量在预算与 fan_in 之内时只需一次合并；
+    否则每层把节点数缩小约 fan_in 倍，同一层的各组合并并发执行。
+    """
+    fan_in = max(fan_in, 2)
+    level = list(partials)
+    while needs_reduce(level, fan_in, token_budget):
+        groups = group_for_reduce(level, fan_in, token_budget)
+        level = ordered_map(
+            lambda g: g[0] if len(g) == 1 else merge_summaries(g, style, final=False),
+            groups, concurrency,
+        )
+    return merge_summaries(level, style, final=True)
+
+
+def summarize_document(text: str, style: str,
+                       concurrency: int = DEFAULT_CONCURRENCY,
+                       fan_in: int = DEFAULT_FAN_IN,
+                       reduce_budget: int = DEFAULT_REDUCE_BUDGET) -> str:
+    """分段-合并策略的整体摘要：
+    1) 拆分文本；2) 每段小结（最多 concurrency 段并发）；3) 树形合并小结得到最终摘要。
+
+    各段小结互不依赖，并发发出后按原段落顺序收集；最后一段返回即进入合并阶段。
+    合并阶段每次请求最多包含 fan_in 份、约 reduce_budget 个 token 的小结，
+    因此无论原文多长，单次请求的大小都有上限。
+    """
+    chunks = split_text(text)
+    partials = ordered_map(lambda c: summarize_chunk(c, style), chunks, concurrency)
+    return tree_reduce(partials, style, fan_in, reduce_budget, concurrency)
+
+
+def summarize_stream(source: Union[str, Iterable[str]], style: str,
+                     concurrency: int = DEFAULT_CONCURRENCY,
+                     fan_in: int = DEFAULT_FAN_IN,
+                     reduce_budget: int = DEFAULT_REDUCE_BUDGET) -> str:
+    """summarize_document 的流式版本：source 可以是文件对象，边读取边小结边合并。
+
+    小结按层暂存，分组规则与 group_for_reduce 相同：新的一份小结放不进当前组（已满 fan_in 份或会超出 token 预算）时，
+    才把当前组合并成上一层的一份，新的这份作为下一组的开头。因此任何时刻只保留每层未合并的一组小结，
+    内存占用约为 fan_in × 层数，与文件大小无关；而且只有确定后面还有内容时才合并，
+    小结恰好 fan_in 份时与 summarize_document 一样只做一次最终合并。
+    读完后把各层剩余的小结按原文顺序（高层在前）交给 tree_reduce 得到最终摘要。
+    """
+    fan_in = max(fan_in, 2)
+    levels: List[List[str]] = []
+
+    def push(partial: str, height: int):
+        if height == len(levels):
+            levels.append([])
+        level = levels[height]
+        if len(level) >= 2 and (len(level) >= fan_in or
+                                sum(estimate_tokens(p) for p in level) + estimate_tokens(partial) > reduce_budget):
+            levels[height] = [partial]
+            push(merge_summaries(level, style, final=False), height + 1)
+        else:
+            level.append(partial)
+
+    chunks = iter_chunks(source, CHUNK_TOKENS)
+    for partial in ordered_imap(lambda c: summarize_chunk(c, style), chunks, concurrency):
+        push(partial, 0)
+    remaining = [p for level in reversed(levels) for p in level]
+    return tree_reduce(remaining, style, fan_in, reduce_budget, concurrency)
+
+
+async def tree_reduce_async(partials: List[str], style: str,
+                            fan_in: int = DEFAULT_FAN_IN,
+                            token_budget: int = DEFAULT_REDUCE_BUDGET,
+                            concurrency: int = DEFAULT_CONCURRENCY) -> str:
+    """tree_reduce 的协程版本。"""
+    fan_in = max(fan_in, 2)
+    level = list(partials)
+
+    async def merge(group: List[str]) -> str:
+        if len(group) == 1:
+            return group[0]
+        return await call_chat_retry_async(merge_messages(group, style, final=False))
+
+    while needs_reduce(level, fan_in, token_budget):
+        level = await ordered_map_async(merge, group_for_reduce(level, fan_in, token_budget), concurrency)
+    return await call_chat_retry_async(merge_messages(level, style, final=True))
+
+
+async def summarize_document_async(text: str, style: str,
+                                   concurrency: int = DEFAULT_CONCURRENCY,
+                                   fan_in: int = DEFAULT_FAN_IN,
+                                   reduce_budget: int = DEFAULT_REDUCE_BUDGET) -> str:
+    """summarize_document 的协程版本，供 asyncio 服务调用；流程与同步版本完全相同。"""
+    chunks = split_text(text)
+    partials = await ordered_map_async(lambda c: call_chat_retry_async(chunk_messages(c, style)), chunks, concurrency)
+    return await tree_reduce_async(partials, style, fan_in, reduce_budget, concurrency)
+
+
+def content_key(*parts: str) -> str:
+    """对若干段文本取 SHA-256，作为增量摘要中分段小结/合并结果的记忆键。"""
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(p.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def group_anchored(partials: List[str], fan_in: int, token_budget: int) -> List[List[str]]:
+    """按内容锚定的分组：与 group_for_reduce 的限制相同，另外在 CRC32 满足条件的小结之后断开。
+
+    分组边界只取决于小结本身，某个小结变化后，其后的分组很快与旧版本重新对齐，
+    未变化的分组（及其上层的合并结果）都可以复用。
+    """
+    anchor_every = max(fan_in // 2, 1)
+    groups: List[List[str]] = []
+    cur: List[str] = []
+    cur_tokens = 0
+    for p in partials:
+        t = estimate_tokens(p)
+        if len(cur) >= 2 and (len(cur) >= fan_in or cur_tokens + t > token_budget):
+            groups.append(cur)
+            cur, cur_tokens = [], 0
+        cur.append(p)
+        cur_tokens += t
+        if len(cur) >= 2 and zlib.crc32(p.encode("utf-8")) % anchor_every == 0:
+            groups.append(cur)
+            cur, cur_tokens = [], 0
+    if cur:
+        groups.append(cur)
+    return groups
+
+
+class IncrementalSummarizer:
+    """增量摘要：记住上一版文档的分段小结与各合并节点，新版本只重算变化的部分。
+
+    - 分段用 iter_anchored_chunks，边界由句子内容决定，追加或修改一段文字只影响附近的分段；
+    - 小结按 (风格, 分段原文) 记忆，合并节点按 (风格, 层级类型, 各输入小结) 记忆，
+      分组同样按内容锚定，因此未变化的子树整棵复用，只有变化分段到根的路径需要重算；
+    - 每次运行后只保留本版本用到的条目，记忆大小与当前文档成正比；
+    - 指定 state_path 时记忆保存在 JSON 文件中，下次运行（如日志又增长了）可继续复用。
+    """
+
+    def __init__(self, style: str,
+                 concurrency: int = DEFAULT_CONCURRENCY,
+                 fan_in: int = DEFAULT_FAN_IN,
+                 reduce_budget: int = DEFAULT_REDUCE_BUDGET,
+                 state_path: Optional[str] = None):
+        self.style = style
+        self.concurrency = concurrency
+        self.fan_in = max(fan_in, 2)
+        self.reduce_budget = reduce_budget
+        self.state_path = state_path
+        self._memo: Dict[str, str] = {}
+        self._seen: Dict[str, str] = {}
+        self.last_run = {"chunks": 0, "chunk_calls": 0, "merges": 0, "merge_calls": 0}
+        if state_path and os.path.exists(state_path):
+            try:
+                with open(state_path, encoding="utf-8") as f:
+                    memo = json.load(f)["memo"]
+                if not isinstance(memo, dict):
+                    raise TypeError("memo 不是 JSON 对象")
+                self._memo = memo
+            except (ValueError, KeyError, TypeError, OSError) as e:
+                # 状态文件损坏或不可读（如被截断）：只是丢掉记忆，本次从头重建，不影响生成摘要
+                print(f"⚠️ 增量摘要状态文件 {state_path} 无法读取（{type(e).__name__}: {e}），将从头重建",
+                      file=sys.stderr)
+
+    def _reuse_or_compute(self, keys: List[str], items: list, fn: Callable, counter: str) -> List[str]:
+        """keys 已记忆的直接取用，其余（同键只算一次）并发计算；返回与 keys 对应的结果。"""
+        todo: Dict[str, object] = {}
+        for key, item in zip(keys, items):
+            if key in self._seen or key in todo:
+                continue
+            if key in self._memo:
+                self._seen[key] = self._memo[key]
+            else:
+                todo[key] = item
+        results = ordered_map(fn, list(todo.values()), self.concurrency)
+        self._seen.update(zip(todo, results))
+        self.last_run[counter] += len(todo)
+        return [self._seen[key] for key in keys]
+
+    def summarize(self, source: Union[str, Iterable[str]]) -> str:
+        """摘要新版本的文档（字符串或文件对象）。
+
+        流程与 summarize_document 同构（分段小结 -> 分组合并 -> 最终合并），但分段用 iter_anchored_chunks、
+        分组用 group_anchored（按内容锚点切分，编辑只影响附近的分段和分组），
+        因此分段与分组方式不同，结果不会与 summarize_document 逐字相同。
+        """
+        self._seen = {}
+        self.last_run = dict.fromkeys(self.last_run, 0)
+
+        # 只保留需要重新小结的分段原文，已记忆的分段只留哈希
+        keys: List[str] = []
+        chunks: List[Optional[str]] = []
+        for c in iter_anchored_chunks(source, CHUNK_TOKENS):
+            key = content_key(self.style, "chunk", c)
+            keys.append(key)
+            chunks.append(None if key in self._memo else c)
+        self.last_run["chunks"] = len(keys)
+        level = self._reuse_or_compute(keys, chunks, lambda c: summarize_chunk(c, self.style), "chunk_calls")
+
+        while needs_reduce(level, self.fan_in, self.reduce_budget):
+            groups = group_anchored(level, self.fan_in, self.reduce_budget)
+            merged = [g for g in groups if len(g) > 1]
+            self.last_run["merges"] += len(merged)
+            results = iter(self._reuse_or_compute([content_key(self.style, "partial", *g) for g in merged], merged,
+                                                  lambda g: merge_summaries(g, self.style, final=False),
+                                                  "merge_calls"))
+            level = [g[0] if len(g) == 1 else next(results) for g in groups]
+
+        self.last_run["merges"] += 1
+        final = self._reuse_or_compute([content_key(self.style, "final", *level)], [level],
+                                       lambda lv: merge_summaries(lv, self.style, final=True), "merge_calls")[0]
+        self._memo = self._seen
+        if self.state_path:
+            self.save()
+        return final
+
+    def save(self):
+        # 先写临时文件再原子替换，避免中途退出留下半个状态文件
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"memo": self._memo}, f, ensure_ascii=False)
+        os.replace(tmp, self.state_path)
+
+
+def format_incremental_stats(run: Dict[str, int]) -> str:
+    return (f"增量摘要: 分段 {run['chunks']} 个（重新小结 {run['chunk_calls']}），"
+            f"合并 {run['merges']} 次（重新合并 {run['merge_calls']}）")
 
 
 def main():
     parser = argparse.ArgumentParser(description="文档摘要器（分段+合并）")
     parser.add_argument("--text", type=str, default="人工智能正在改变世界。许多行业借助AI提高效率...（此处省略长文示例）")
+    parser.add_argument("--input", type=str, default=None, help="总结文件内容（\"-\" 表示标准输入），完成即退出")
+    parser.add_argument("--output", type=str, default=STDIO, help="配合 --input：摘要写入该文件（默认标准输出）")
     parser.add_argument("--style", type=str, choices=["concise", "detailed", "bullet"], default="bullet")
     parser.add_argument("--model", type=str, default=DEFAULT_MODEL)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="分段小结的最大并发数")
+    parser.add_argument("--fan-in", type=int, default=DEFAULT_FAN_IN, help="树形合并时每次最多合并的小结数")
+    parser.add_argument("--reduce-budget", type=int, default=DEFAULT_REDUCE_BUDGET, help="单次合并请求的 token 预算")
+    parser.add_argument("--incremental", action="store_true",
+                        help="增量模式：交互输入追加到文档末尾，只重算变化的分段与其上层合并")
+    parser.add_argument("--state", type=str, default=None, help="增量模式的状态文件（JSON），跨次运行复用小结；隐含 --incremental")
+    parser.add_argument("--cache", action="store_true", help="启用响应缓存（相同请求只调用一次API）")
+    parser.add_argument("--cache-db", type=str, default=None, help="响应缓存的磁盘文件（SQLite），需配合 --cache")
+    parser.add_argument("--pool-stats", action="store_true", help="退出时打印连接池复用与等待统计")
+    parser.add_argument("--stats", action="store_true", help="退出时打印逐请求的耗时/字节/token 汇总，以及最慢的请求")
+    parser.add_argument("--telemetry-jsonl", type=str, default=None, help="把每个请求的耗时与用量追加写入该 JSONL 文件")
+    parser.add_argument("--telemetry-prom", type=str, default=None, help="退出时把统计以 Prometheus 文本格式写入该文件")
     args = parser.parse_args()
 
     if not API_KEY:
         print("❌ 请先设置环境变量 SILICONFLOW_API_KEY 或在代码中填写 API_KEY")
         return
 
-    result = summarize_document(args.text, args.style)
-    print(result)
+    global RESPONSE_CACHE
+    hist = telemetry.setup(args.stats, args.telemetry_jsonl, args.telemetry_prom)
+    if args.cache:
+        RESPONSE_CACHE = ResponseCache(disk_path=args.cache_db)
+
+    if args.input:
+        # 文件/管道模式：统计信息写到标准错误，避免混进通过管道输出的摘要
+        with open_input(args.input) as src:
+            if args.incremental or args.state:
+                incremental = IncrementalSummarizer(args.style, args.concurrency, args.fan_in, args.reduce_budget,
+                                                    state_path=args.state)
+                result = incremental.summarize(src)
+                print(format_incremental_stats(incremental.last_run), file=sys.stderr)
+            else:
+                result = summarize_stream(src, args.style, args.concurrency, args.fan_in, args.reduce_budget)
+        with open_output(args.output) as out:
+            out.write(result + "\n")
+        print_report(args, hist, sys.stderr)
+        return
+
+    incremental = None
+    if args.incremental or args.state:
+        incremental = IncrementalSummarizer(args.style, args.concurrency, args.fan_in, args.reduce_budget,
+                                            state_path=args.state)
+        document = args.text
+        print(incremental.summarize(document))
+        print(format_incremental_stats(incremental.last_run))
+    else:
+        result = summarize_document(args.text, args.style, args.concurrency, args.fan_in, args.reduce_budget)
+        print(result)
 
     # 交互模式：空行触发一次摘要生成，便于粘贴多段长文本
-    print("\n进入交互模式，粘贴长文本(输入 exit 退出)：")
+    if incremental is not None:
+        print("\n进入交互模式，粘贴的文本会追加到文档末尾(输入 exit 退出)：")
+    else:
+        print("\n进入交互模式，粘贴长文本(输入 exit 退出)：")
     buf: List[str] = []
     while True:
         try:
@@ -110,11 +468,29 @@ def main():
             buf.clear()
             if not long_text.strip():
                 continue
-            print(summarize_document(long_text, args.style))
+            if incremental is not None:
+                document += "\n" + long_text
+                print(incremental.summarize(document))
+                print(format_incremental_stats(incremental.last_run))
+            else:
+                print(summarize_document(long_text, args.style, args.concurrency, args.fan_in, args.reduce_budget))
             print("\n(继续输入或 exit 退出)")
         else:
             buf.append(line)
 
+    print_report(args, hist, sys.stdout)
+
+
+def print_report(args, hist, log):
+    """退出前打印缓存、连接池与逐请求统计（按命令行参数开启）。"""
+    if RESPONSE_CACHE is not None:
+        print(format_cache_stats(RESPONSE_CACHE.stats()), file=log)
+    if args.pool_stats:
+        print(format_stats(get_client().stats()), file=log)
+    if hist is not None:
+        print(hist.summary(), file=log)
+    telemetry.shutdown()
+
 
 if __name__ == "__main__":
     main()
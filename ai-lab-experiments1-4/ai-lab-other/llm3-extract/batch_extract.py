@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+批量信息抽取：流式读取 JSONL/CSV，有界并发调用抽取函数，结果边完成边写入 JSONL。
+
+设计要点：
+- 流式：逐条读取输入，同时在途的记录最多 2×concurrency 条，内存占用与文件大小无关；
+- 乱序写出：哪条先完成先写哪条，每行带 "_line"（输入中的序号，从0开始）便于对齐；
+- 打包（可选）：传入 pack_fn 且 pack_size > 1 时，把相邻的短记录（不超过 pack_max_tokens）
+  每 pack_size 条合成一次调用，请求数约减少为 1/pack_size；长记录仍单条调用；
+- 断点续跑：定期把“已完成进度”写入检查点文件（默认 输出路径 + ".ckpt"）：
+    watermark   —— 序号 <= watermark 的记录全部完成
+    done        —— watermark 之后零散完成的序号（最多一个并发窗口那么多）
+    output_size —— 检查点时刻输出文件的字节数
+  续跑时先把输出文件截断到 output_size，再跳过已完成的记录，保证每条记录恰好输出一次。
+
+由 json_extractor.py 的 --input/--output 参数调用，也可单独 import run_batch 使用。
+"""
+
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+# 让脚本能导入仓库根目录下共享的 sflib 包
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from sflib.tokens import estimate_tokens  # noqa: E402
+
+
+DEFAULT_BATCH_CONCURRENCY = 8
+DEFAULT_CHECKPOINT_EVERY = 200  # 每完成多少条写一次检查点
+DEFAULT_PACK_MAX_TOKENS = 200  # 打包模式下，超过该 token 数的记录单独调用
+
+
+def iter_records(path: str, text_field: str = "text",
+                 id_field: str = "id") -> Iterator[Tuple[int, object, Union[str, Exception]]]:
+    """逐条产出 (序号, 记录id, 文本)。
+
+    - .csv：按表头读取 text_field / id_field 两列；
+    - 其他（JSONL）：每行一个JSON对象，取 text_field / id_field；若整行是JSON字符串则直接作为文本。
+      无法解析或不是对象/字符串的行照常占一个序号，文本位置换成 ValueError，由调用方记为失败。
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, encoding="utf-8", newline="") as f:
+            for idx, row in enumerate(csv.DictReader(f)):
+                yield idx, row.get(id_field), row.get(text_field) or ""
+        return
+
+    with open(path, encoding="utf-8") as f:
+        idx = 0
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except ValueError as e:
+                yield idx, None, ValueError(f"第 {idx + 1} 条记录不是合法的JSON: {e}")
+            else:
+                if isinstance(rec, str):
+                    yield idx, None, rec
+                elif isinstance(rec, dict):
+                    yield idx, rec.get(id_field), rec.get(text_field) or ""
+                else:
+                    yield idx, None, ValueError(f"第 {idx + 1} 条记录不是JSON对象或字符串")
+            idx += 1
+
+
+class Checkpoint:
+    """批处理进度：低水位线 + 水位线之后零散完成的序号 + 输出文件长度。"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.watermark = -1
+        self.done: Set[int] = set()
+        self.output_size = 0
+
+    def load(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, encoding="utf-8") as f:
+            d = json.load(f)
+        self.watermark = d["watermark"]
+        self.done = set(d["done"])
+        self.output_size = d["output_size"]
+        return True
+
+    def save(self):
+        # 先写临时文件再原子替换，进程在写检查点时被杀也不会留下半个文件
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"watermark": self.watermark, "done": sorted(self.done),
+                       "output_size": self.output_size}, f)
+        os.replace(tmp, self.path)
+
+    def is_done(self, idx: int) -> bool:
+        return idx <= self.watermark or idx in self.done
+
+    def mark(self, idx: int):
+        self.done.add(idx)
+        while self.watermark + 1 in self.done:
+            self.watermark += 1
+            self.done.discard(self.watermark)
+
+
+def run_batch(extract_fn: Callable[[str], Dict[str, object]],
+              input_path: str,
+              output_path: str,
+              concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+              text_field: str = "text",
+              id_field: str = "id",
+              checkpoint_path: Optional[str] = None,
+              checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY,
+              progress: bool = True,
+              pack_fn: Optional[Callable[[List[str]], List[object]]] = None,
+              pack_size: int = 1,
+              pack_max_tokens: int = DEFAULT_PACK_MAX_TOKENS) -> Dict[str, float]:
+    """批量抽取 input_path 中的记录，结果写入 output_path（JSONL），返回统计信息。
+
+    每行输出形如：
+        {"_line": 12, "id": "...", "result": {...}}
+        {"_line": 13, "id": "...", "error": "..."}
+
+    pack_fn 接收一组文本，返回等长列表（每项为结果字典或该条的异常）；
+    pack_fn 整体抛出异常时，这一组的记录全部记为失败；输入中无法解析的行同样记为失败，不中断批次。
+    """
+    checkpoint_path = checkpoint_path or output_path + ".ckpt"
+    ck = Checkpoint(checkpoint_path)
+    resumed = ck.load()
+    if resumed and os.path.exists(output_path):
+        # 丢弃上次检查点之后写出的行：这些记录会被重新处理
+        with open(output_path, "r+b") as f:
+            f.truncate(ck.output_size)
+    stats = {"ok": 0, "failed": 0, "skipped": 0, "elapsed_s": 0.0}
+    t0 = time.perf_counter()
+    since_ck = 0
+
+    with ThreadPoolExecutor(max_workers=concurrency) as ex, \
+            open(output_path, "a" if resumed else "w", encoding="utf-8") as out:
+        pending = {}  # future -> [(序号, 记录id), ...]；单条调用的 future 只对应一条
+        group: List[Tuple[int, object, str]] = []
+        packing = pack_fn is not None and pack_size > 1
+
+        def save_checkpoint():
+            out.flush()
+            os.fsync(out.fileno())
+            ck.output_size = out.tell()
+            ck.save()
+
+        def write_row(idx: int, rid: object, result: object):
+            nonlocal since_ck
+            row = {"_line": idx, "id": rid}
+            if isinstance(result, Exception):
+                row["error"] = f"{type(result).__name__}: {result}"
+                stats["failed"] += 1
+            else:
+                row["result"] = result
+                stats["ok"] += 1
+            out.write(json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n")
+            ck.mark(idx)
+            since_ck += 1
+
+        def drain(block_all: bool):
+            nonlocal since_ck
+            while pending:
+                finished, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    entries = pending.pop(fut)
+                    try:
+                        results = fut.result()
+                        if len(entries) == 1 and not isinstance(results, list):
+                            results = [results]
+                    except Exception as e:  # 单条（或单组）失败只记录错误，不中断整个批次
+                        results = [e] * len(entries)
+                    for (idx, rid), result in zip(entries, results):
+                        write_row(idx, rid, result)
+                if since_ck >= checkpoint_every:
+                    save_checkpoint()
+                    since_ck = 0
+                    if progress:
+                        rate = (stats["ok"] + stats["failed"]) / (time.perf_counter() - t0)
+                        print(f"  进度: 成功 {stats['ok']} 条, 失败 {stats['failed']} 条, {rate:.1f} 条/秒")
+                if not block_all and len(pending) < concurrency * 2:
+                    return
+
+        def submit(fn, arg, entries):
+            if len(pending) >= concurrency * 2:
+                drain(block_all=False)
+            pending[ex.submit(fn, arg)] = entries
+
+        def flush_group():
+            if group:
+                submit(pack_fn, [t for _, _, t in group], [(i, r) for i, r, _ in group])
+                group.clear()
+
+        for idx, rid, text in iter_records(input_path, text_field, id_field):
+            if ck.is_done(idx):
+                stats["skipped"] += 1
+                continue
+            if isinstance(text, Exception):
+                write_row(idx, rid, text)  # 输入行本身有问题：直接记为失败，不调用API
+                continue
+            if packing and estimate_tokens(text) <= pack_max_tokens:
+                group.append((idx, rid, text))
+                if len(group) >= pack_size:
+                    flush_group()
+                continue
+            submit(extract_fn, text, [(idx, rid)])
+        flush_group()
+        drain(block_all=True)
+        save_checkpoint()
+
+    stats["elapsed_s"] = round(time.perf_counter() - t0, 3)
+    return stats
+
+
+def format_batch_stats(stats: Dict[str, float]) -> str:
+    return (f"批量抽取完成: 成功 {stats['ok']} 条, 失败 {stats['failed']} 条, "
+            f"续跑跳过 {stats['skipped']} 条, 用时 {stats['elapsed_s']} 秒")
@@ -8,15 +8,29 @@
 """
 
 import json
-import requests
 import argparse
-from typing import Dict
+import os
+import sys
+from typing import Dict, List
+
+# 让脚本能导入仓库根目录下共享的 sflib 包
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from sflib import telemetry  # noqa: E402
+from sflib.aio_client import get_async_client  # noqa: E402
+from sflib.http_client import format_stats, get_client  # noqa: E402
+from sflib.response_cache import ResponseCache, format_cache_stats  # noqa: E402
+
+from batch_extract import (DEFAULT_BATCH_CONCURRENCY, DEFAULT_PACK_MAX_TOKENS,  # noqa: E402
+                           format_batch_stats, run_batch)
+from json_repair import count, format_repair_stats, parse_direct, repair, repair_slots  # noqa: E402
 
 
 API_URL = "https://api.siliconflow.cn/v1/chat/completions"
 # 直接在代码中设置API Key（示例：sk-xxxx）
 API_KEY = "sk-请在此处填写你的密钥"
 DEFAULT_MODEL = "Qwen/Qwen2.5-7B-Instruct"
+# 可选的响应缓存：命令行加 --cache 时启用，重复文本的抽取请求直接复用结果
+RESPONSE_CACHE = None
 
 
 SYSTEM_PROMPT = (
@@ -26,46 +40,174 @@ SYSTEM_PROMPT = (
     "Return ONLY valid compact JSON without extra text."
 )
 
+PACK_SYSTEM_PROMPT = (
+    # 打包模式：一次请求里有多条编号文本，要求按编号返回JSON数组
+    "You are an information extraction assistant. The user gives several texts numbered [1], [2], ... "
+    "Extract fields from EACH text independently and return a JSON array with exactly one object per text. "
+    "Each object has keys: slot (the text number), person (string or null), company (string or null), "
+    "date (string or null), location (string or null). "
+    "Return ONLY the valid compact JSON array without extra text."
+)
+# 打包请求的输出上限：每条结果约 60 个 token，再留一些余量
+PACK_TOKENS_PER_SLOT = 64
+
 
-def call_chat(messages) -> str:
-    """调用聊天接口，返回文本结果。"""
-    headers = {"Authorization": f"Bearer {API_KEY}", "Content-Type": "application/json"}
-    data = {"model": DEFAULT_MODEL, "messages": messages, "stream": False}
-    r = requests.post(API_URL, headers=headers, json=data, timeout=60)
-    r.raise_for_status()
-    j = r.json()
+def call_chat(messages, **params) -> str:
+    """调用聊天接口，返回文本结果；params 为额外的请求参数（如 max_tokens）。"""
+    j = get_client().chat(messages, model=DEFAULT_MODEL, api_key=API_KEY, url=API_URL, cache=RESPONSE_CACHE,
+                          **params)
     return j["choices"][0]["message"]["content"].strip()
 
 
-def extract_to_json(text: str) -> Dict[str, object]:
-    """将输入文本抽取为JSON对象：包含 person/company/date/location 四个键。
+async def call_chat_async(messages) -> str:
+    """call_chat 的协程版本，走共享的 aiohttp 连接池。"""
+    j = await get_async_client().chat(messages, model=DEFAULT_MODEL, api_key=API_KEY, url=API_URL,
+                                      cache=RESPONSE_CACHE)
+    return j["choices"][0]["message"]["content"].strip()
 
-    简单稳健性：若首次解析失败，会在原对话上追加约束并重试一次。
-    """
-    messages = [
+
+def initial_messages(text: str):
+    return [
         {"role": "system", "content": SYSTEM_PROMPT},
         {"role": "user", "content": f"Text:\n{text}"},
     ]
-    out = call_chat(messages)
+
+
+def parse_or_repair(out: str):
+    """直接解析或本地修复模型回复，都失败时返回 None。"""
     try:
-        return json.loads(out)
-    except json.JSONDecodeError:
-        # 简单重试一次，提醒只输出JSON
-        messages.append({"role": "assistant", "content": out})
-        messages.append({"role": "user", "content": "Return ONLY valid JSON per schema."})
-        out2 = call_chat(messages)
-        return json.loads(out2)
+        result = parse_direct(out)
+        count("direct")
+        return result
+    except ValueError:
+        pass
+    fixed = repair(out)
+    if fixed is not None:
+        count("repaired")
+    return fixed
+
+
+def retry_messages(messages, out: str):
+    """在原对话上追加约束，请模型重新只输出JSON。"""
+    return messages + [
+        {"role": "assistant", "content": out},
+        {"role": "user", "content": "Return ONLY valid JSON per schema."},
+    ]
+
+
+def finish_retry(out2: str) -> Dict[str, object]:
+    fixed = repair(out2)
+    if fixed is None:
+        count("failed")
+        return parse_direct(out2)  # 抛出带原始错误信息的异常
+    count("model_retry")
+    return fixed
+
+
+def extract_to_json(text: str) -> Dict[str, object]:
+    """将输入文本抽取为JSON对象：包含 person/company/date/location 四个键。
+
+    稳健性处理（按代价从低到高）：
+    1) 直接解析模型回复；
+    2) 本地修复（去代码围栏、截取 {...}、修正多余逗号/引号等）；
+    3) 仍失败时才在原对话上追加约束，请模型重试一次。
+    每条路径的使用次数见 json_repair.REPAIR_COUNTERS。
+    """
+    messages = initial_messages(text)
+    out = call_chat(messages)
+    result = parse_or_repair(out)
+    if result is not None:
+        return result
+    # 本地修复失败，再重试一次，提醒只输出JSON
+    return finish_retry(call_chat(retry_messages(messages, out)))
+
+
+async def extract_to_json_async(text: str) -> Dict[str, object]:
+    """extract_to_json 的协程版本，修复与重试策略相同。"""
+    messages = initial_messages(text)
+    out = await call_chat_async(messages)
+    result = parse_or_repair(out)
+    if result is not None:
+        return result
+    return finish_retry(await call_chat_async(retry_messages(messages, out)))
+
+
+def pack_messages(texts: List[str]):
+    """把多条文本按 [1]、[2]… 编号放进同一个提示词。"""
+    numbered = "\n".join(f"[{i}] {t}" for i, t in enumerate(texts, 1))
+    return [
+        {"role": "system", "content": PACK_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Texts:\n{numbered}"},
+    ]
+
+
+def extract_many(texts: List[str]) -> List[object]:
+    """一次请求抽取多条文本，返回与 texts 等长的列表：每项是结果字典，或该条的异常。
+
+    模型回复按 "slot" 编号（缺失时按顺序）对应回输入；整批解析失败或条数对不上时，
+    把这一批拆成两半分别重试，直到单条时退回 extract_to_json（含本地修复与模型重试）。
+    网络错误（重试用尽）不拆分，直接抛给调用方，整批记为失败。
+    """
+    if len(texts) == 1:
+        try:
+            return [extract_to_json(texts[0])]
+        except ValueError as e:
+            return [e]
+
+    out = call_chat(pack_messages(texts), max_tokens=PACK_TOKENS_PER_SLOT * len(texts) + 64)
+    results = repair_slots(out, len(texts))
+    if results is not None:
+        count("pack_ok")
+        return results
+    count("pack_split")
+    mid = len(texts) // 2
+    return extract_many(texts[:mid]) + extract_many(texts[mid:])
 
 
 def main():
     parser = argparse.ArgumentParser(description="结构化信息抽取为JSON")
     parser.add_argument("--text", type=str, default="2025年10月，小王加入了示例科技，入职地点在上海。负责人是李雷。")
+    parser.add_argument("--input", type=str, default=None, help="批量模式：输入 JSONL/CSV 文件路径")
+    parser.add_argument("--output", type=str, default="extracted.jsonl", help="批量模式：输出 JSONL 文件路径")
+    parser.add_argument("--text-field", type=str, default="text", help="批量模式：文本所在字段/列名")
+    parser.add_argument("--id-field", type=str, default="id", help="批量模式：记录ID所在字段/列名")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_BATCH_CONCURRENCY, help="批量模式：并发请求数")
+    parser.add_argument("--pack", type=int, default=1, help="批量模式：每次请求最多打包多少条短记录（1 表示不打包）")
+    parser.add_argument("--pack-max-tokens", type=int, default=DEFAULT_PACK_MAX_TOKENS,
+                        help="批量模式：不超过该 token 数的记录才参与打包")
+    parser.add_argument("--cache", action="store_true", help="启用响应缓存（相同请求只调用一次API）")
+    parser.add_argument("--cache-db", type=str, default=None, help="响应缓存的磁盘文件（SQLite），需配合 --cache")
+    parser.add_argument("--pool-stats", action="store_true", help="退出时打印连接池复用与等待统计")
+    parser.add_argument("--stats", action="store_true", help="退出时打印逐请求的耗时/字节/token 汇总，以及最慢的请求")
+    parser.add_argument("--telemetry-jsonl", type=str, default=None, help="把每个请求的耗时与用量追加写入该 JSONL 文件")
+    parser.add_argument("--telemetry-prom", type=str, default=None, help="退出时把统计以 Prometheus 文本格式写入该文件")
     args = parser.parse_args()
 
     if not API_KEY:
         print("❌ 请先设置环境变量 SILICONFLOW_API_KEY 或在代码中填写 API_KEY")
         return
 
+    global RESPONSE_CACHE
+    hist = telemetry.setup(args.stats, args.telemetry_jsonl, args.telemetry_prom)
+    if args.cache:
+        RESPONSE_CACHE = ResponseCache(disk_path=args.cache_db)
+
+    if args.input:
+        # 批量模式：流式处理整个文件，支持中断后续跑，处理完直接退出
+        stats = run_batch(extract_to_json, args.input, args.output, args.concurrency,
+                          text_field=args.text_field, id_field=args.id_field,
+                          pack_fn=extract_many, pack_size=args.pack, pack_max_tokens=args.pack_max_tokens)
+        print(format_batch_stats(stats))
+        print(format_repair_stats())
+        if RESPONSE_CACHE is not None:
+            print(format_cache_stats(RESPONSE_CACHE.stats()))
+        if args.pool_stats:
+            print(format_stats(get_client().stats()))
+        if hist is not None:
+            print(hist.summary())
+        telemetry.shutdown()
+        return
+
     data = extract_to_json(args.text)
     print(json.dumps(data, ensure_ascii=False, separators=(",", ":")))
 
@@ -78,6 +220,16 @@ def main():
         obj = extract_to_json(line)
         print(json.dumps(obj, ensure_ascii=False, separators=(",", ":")))
 
+    print(format_repair_stats())
+    if RESPONSE_CACHE is not None:
+        print(format_cache_stats(RESPONSE_CACHE.stats()))
+
+    if args.pool_stats:
+        print(format_stats(get_client().stats()))
+    if hist is not None:
+        print(hist.summary())
+    telemetry.shutdown()
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+本地JSON修复：模型回复不是合法JSON时，先在本地尝试修复，修不好再让模型重试。
+
+修复步骤（依次尝试）：
+1) 去掉 ```json ... ``` 代码围栏；
+2) 截取第一个括号配对完整的 {...}（忽略字符串内部的括号）；
+3) 替换中文引号、Python 字面量（None/True/False），删除 } 或 ] 前多余的逗号；
+4) 仍失败时把单引号字符串改为双引号。
+解析成功后按 person/company/date/location 模式校验并规范化。
+
+计数器 REPAIR_COUNTERS 记录每条路径被走到的次数：
+- direct:      模型原样输出即合法
+- repaired:    经本地修复后合法
+- model_retry: 本地修复失败，向模型重试后成功
+- failed:      重试后仍失败
+打包模式（一次请求抽取多条）另有：
+- pack_ok:     整批回复解析成功并与输入一一对应
+- pack_split:  整批解析失败，拆成两半重试
+"""
+
+import json
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+
+SCHEMA_KEYS = ("person", "company", "date", "location")
+
+_FENCE_RE = re.compile(r"```(?:json|JSON)?\s*(.*?)```", re.S)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_PY_LITERALS = ((re.compile(r"\bNone\b"), "null"),
+                (re.compile(r"\bTrue\b"), "true"),
+                (re.compile(r"\bFalse\b"), "false"))
+_SINGLE_QUOTED_RE = re.compile(r"'((?:[^'\\]|\\.)*)'")
+
+_lock = threading.Lock()
+REPAIR_COUNTERS: Counter = Counter()
+
+
+def count(path: str):
+    """线程安全地给某条路径计数（批量模式下会被多个线程同时调用）。"""
+    with _lock:
+        REPAIR_COUNTERS[path] += 1
+
+
+class SchemaError(ValueError):
+    """解析成功但不符合抽取模式。"""
+
+
+def validate(obj: object) -> Dict[str, Optional[str]]:
+    """按 person/company/date/location 模式校验并规范化。
+
+    - 必须是JSON对象；
+    - 缺失的键补 null，多余的键丢弃；
+    - 值只能是字符串或 null（数字会转为字符串，空字符串视为 null）。
+    """
+    if not isinstance(obj, dict):
+        raise SchemaError(f"expected a JSON object, got {type(obj).__name__}")
+    result: Dict[str, Optional[str]] = {}
+    for key in SCHEMA_KEYS:
+        value = obj.get(key)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)
+        if value is not None and not isinstance(value, str):
+            raise SchemaError(f"field {key!r} must be a string or null")
+        result[key] = value if value else None
+    return result
+
+
+def extract_braced(text: str, open_ch: str = "{", close_ch: str = "}") -> Optional[str]:
+    """返回第一个括号配对完整的 {...}（或 [...]）子串；字符串内部的括号不计入。"""
+    start = text.find(open_ch)
+    while start != -1:
+        depth = 0
+        quote = None
+        escaped = False
+        for i in range(start, len(text)):
+            ch = text[i]
+            if quote:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == quote:
+                    quote = None
+            elif ch in "\"'":
+                quote = ch
+            elif ch == open_ch:
+                depth += 1
+            elif ch == close_ch:
+                depth -= 1
+                if depth == 0:
+                    return text[start:i + 1]
+        start = text.find(open_ch, start + 1)
+    return None
+
+
+def _candidates(raw: str, open_ch: str = "{", close_ch: str = "}"):
+    """由浅入深地产出候选JSON文本。"""
+    text = raw.strip()
+    m = _FENCE_RE.search(text)
+    if m:
+        text = m.group(1).strip()
+    yield text
+
+    braced = extract_braced(text, open_ch, close_ch)
+    if braced:
+        text = braced
+        yield text
+
+    text = text.replace("“", '"').replace("”", '"')
+    for pattern, repl in _PY_LITERALS:
+        text = pattern.sub(repl, text)
+    text = _TRAILING_COMMA_RE.sub(r"\1", text)
+    yield text
+
+    yield _SINGLE_QUOTED_RE.sub(lambda m: json.dumps(m.group(1)), text)
+
+
+def parse_direct(raw: str) -> Dict[str, Optional[str]]:
+    """不做任何修复，直接解析并校验；失败时抛出 ValueError（含 JSONDecodeError）。"""
+    return validate(json.loads(raw))
+
+
+def repair(raw: str) -> Optional[Dict[str, Optional[str]]]:
+    """尝试在本地修复模型回复；成功返回规范化后的对象，失败返回 None。"""
+    for candidate in _candidates(raw):
+        try:
+            return validate(json.loads(candidate))
+        except ValueError:
+            continue
+    return None
+
+
+def map_slots(items: object, n: int) -> List[Dict[str, Optional[str]]]:
+    """把打包请求返回的数组对应回 n 个输入。
+
+    对象带 "slot"（1..n）时按编号对应，否则要求数组长度恰好为 n、按顺序对应；
+    对应不上（缺项、重复、多余）时抛出 SchemaError，由调用方拆分重试。
+    """
+    if not isinstance(items, list):
+        raise SchemaError(f"expected a JSON array, got {type(items).__name__}")
+    slots = [it.get("slot") if isinstance(it, dict) else None for it in items]
+    try:
+        numbered = sorted(int(x) for x in slots) == list(range(1, n + 1))
+    except (TypeError, ValueError):
+        numbered = False
+    if numbered:
+        ordered = [None] * n
+        for it, slot in zip(items, slots):
+            ordered[int(slot) - 1] = it
+        return [validate(it) for it in ordered]
+    if len(items) != n:
+        raise SchemaError(f"expected {n} results, got {len(items)}")
+    return [validate(it) for it in items]
+
+
+def repair_slots(raw: str, n: int) -> Optional[List[Dict[str, Optional[str]]]]:
+    """解析（必要时本地修复）打包请求的回复；无法得到 n 个合法结果时返回 None。"""
+    for candidate in _candidates(raw, "[", "]"):
+        try:
+            return map_slots(json.loads(candidate), n)
+        except ValueError:
+            continue
+    return None
+
+
+def format_repair_stats() -> str:
+    with _lock:
+        c = dict(REPAIR_COUNTERS)
+    pack = c.pop("pack_ok", 0), c.pop("pack_split", 0)
+    total = sum(c.values())
+    line = (f"JSON解析路径: 直接成功 {c.get('direct', 0)}, 本地修复 {c.get('repaired', 0)}, "
+            f"模型重试 {c.get('model_retry', 0)}, 失败 {c.get('failed', 0)} (共 {total})")
+    if any(pack):
+        line += f"; 打包请求: 整批成功 {pack[0]}, 拆分重试 {pack[1]}"
+    return line
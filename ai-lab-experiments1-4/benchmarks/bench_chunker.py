@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+分段器基准：对比旧的固定字符切片（翻译器600字/摘要器800字）与 sflib.chunker。
+
+对比指标：
+- 分段数（约等于API调用次数）
+- 切分耗时
+- 被拦腰截断的句子数（切点不在句子边界上）
+- 平均每段 token 数（越接近预算，上下文利用越充分）
+
+另外用“原样返回”的假翻译函数跑一遍 translate_tone 的同步、流式和协程三种翻译，校验分段译完再拼接后与原文完全一致
+（段与段之间的空格、空行不能丢）。
+
+用法：
+    python bench_chunker.py                  # 使用内置的中英混合样例文本
+    python bench_chunker.py --file book.txt  # 使用自己的文本文件
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import sys
+import time
+from typing import Callable, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "ai-lab-other", "llm1-translate")))
+import translate_tone  # noqa: E402
+from sflib.chunker import iter_chunks  # noqa: E402
+from sflib.tokens import estimate_tokens  # noqa: E402
+
+
+SAMPLE_ZH = "人工智能正在改变许多行业的工作方式。企业借助大模型提高效率，同时也面临数据安全的挑战！我们应该如何平衡？\n"
+SAMPLE_EN = "Large language models are transforming how teams work. They also raise new questions about privacy and cost! What should we do next?\n"
+
+
+def fixed_split(text: str, max_len: int) -> List[str]:
+    """旧实现：按固定字符数切片。"""
+    return [text[i:i + max_len] for i in range(0, len(text), max_len)]
+
+
+def broken_sentences(chunks: List[str]) -> int:
+    """统计切点不在句子边界上的分段数。"""
+    enders = set("。！？!?；;.\n ")
+    return sum(1 for c in chunks[:-1] if c and c[-1] not in enders)
+
+
+def run(name: str, fn: Callable[[], List[str]], repeat: int):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        chunks = fn()
+    elapsed = (time.perf_counter() - t0) / repeat
+    avg_tokens = sum(estimate_tokens(c) for c in chunks) / max(len(chunks), 1)
+    print(f"{name:<28} 分段数 {len(chunks):>6}  截断句 {broken_sentences(chunks):>6}  "
+          f"平均 {avg_tokens:>6.0f} tokens/段  耗时 {elapsed * 1000:>8.2f} ms")
+
+
+def echo_chat_api(messages, model: str = translate_tone.DEFAULT_MODEL) -> str:
+    """假的 call_chat_api：把用户提示里的原文原样返回（与真实接口一样去掉两端空白）。"""
+    return messages[-1]["content"].split("\n", 1)[1].strip()
+
+
+async def echo_chat_api_async(messages, model: str = translate_tone.DEFAULT_MODEL) -> str:
+    return echo_chat_api(messages, model)
+
+
+def check_roundtrip(text: str, max_tokens: int = 40):
+    """用原样返回的假翻译函数翻译 text，断言拼接结果与原文完全一致；max_tokens 取小值，让分段边界足够多。"""
+    saved = translate_tone.call_chat_api, translate_tone.call_chat_api_async, translate_tone.CHUNK_TOKENS
+    translate_tone.call_chat_api, translate_tone.call_chat_api_async = echo_chat_api, echo_chat_api_async
+    translate_tone.CHUNK_TOKENS = max_tokens
+    try:
+        assert translate_tone.translate(text, "en2zh", "formal", memory=None) == text, "translate 拼接后与原文不一致"
+        streamed = "".join(translate_tone.translate_iter(io.StringIO(text), "en2zh", "formal", memory=None))
+        assert streamed == text, "translate_iter 拼接后与原文不一致"
+        translated = asyncio.run(translate_tone.translate_async(text, "en2zh", "formal", memory=None))
+        assert translated == text, "translate_async 拼接后与原文不一致"
+    finally:
+        translate_tone.call_chat_api, translate_tone.call_chat_api_async, translate_tone.CHUNK_TOKENS = saved
+    print("✅ 假翻译往返校验通过：译文的空格、换行、空行与原文一致")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分段器基准测试")
+    parser.add_argument("--file", type=str, default=None, help="待切分的文本文件（UTF-8）")
+    parser.add_argument("--repeat-sample", type=int, default=2000, help="内置样例重复次数")
+    parser.add_argument("--repeat", type=int, default=3, help="每种切分方式重复测量次数")
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            text = f.read()
+    else:
+        text = (SAMPLE_ZH + SAMPLE_EN) * args.repeat_sample
+    print(f"文本长度 {len(text)} 字符，约 {estimate_tokens(text)} tokens\n")
+
+    run("旧：固定600字（翻译器）", lambda: fixed_split(text, 600), args.repeat)
+    run("新：600 tokens 句子边界", lambda: list(iter_chunks(text, 600)), args.repeat)
+    run("旧：固定800字（摘要器）", lambda: fixed_split(text, 800), args.repeat)
+    run("新：800 tokens 句子边界", lambda: list(iter_chunks(text, 800)), args.repeat)
+    print()
+    check_roundtrip("\n" + (SAMPLE_EN + "\n") * 5 + "  " + SAMPLE_ZH * 3 + "\n\n" + SAMPLE_EN * 3 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+KMeans 基准：对比全量 KMeans（整个文件读入内存）与流式小批量 KMeans（ai-lab-ch2/kmeans_stream.py）。
+
+对每个数据规模 N 生成一份 make_blobs 数据文件（格式同 kmeans.txt），分别测量：
+- 用时：读取 + 训练（流式另含扫描次数 epochs）
+- 惯性 inertia：两者都按块扫描全部数据计算，可直接比较；“差距”为流式相对全量的增幅
+- 峰值内存：tracemalloc 统计的 Python/NumPy 分配峰值（单独再跑一遍测量，tracemalloc 会拖慢解析，不计入用时）
+- 流式的用时包含首次读取时生成 .npy 缓存
+
+另外对比数据读取方式（ai-lab-ch2/kmeans_io.py）：np.genfromtxt、分块文本解析、
+首次读取并生成 .npy 缓存、命中缓存后的内存映射读取。
+
+用法：
+    python bench_kmeans.py                                  # N = 1万 / 10万 / 100万
+    python bench_kmeans.py --sizes 100000 1000000 3000000 --block-size 200000 --epochs 2
+    python bench_kmeans.py --only-load                      # 只对比读取方式
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from sklearn.cluster import KMeans
+from sklearn.datasets import make_blobs
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "ai-lab-ch2")))
+from kmeans_io import cache_paths, load_points  # noqa: E402
+from kmeans_stream import DEFAULT_BLOCK_SIZE, evaluate_stream, fit_stream  # noqa: E402
+
+
+def make_file(path: str, n: int, k: int, seed: int):
+    """分块生成数据并追加写入文件，生成大文件时也不占太多内存。"""
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(-10, 10, size=(k, 2))
+    with open(path, "w") as f:
+        for start in range(0, n, 1_000_000):
+            X, _ = make_blobs(n_samples=min(1_000_000, n - start), centers=centers,
+                              cluster_std=0.6, random_state=seed + start)
+            np.savetxt(f, X, fmt="%.4f")
+
+
+def measure(fn, path: str, memory: bool):
+    """返回 (结果, 用时秒, 峰值内存MB)；每次运行前删除缓存，保证都是冷启动。"""
+    remove_cache(path)
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    peak_mb = float("nan")
+    if memory:
+        remove_cache(path)
+        tracemalloc.start()
+        fn()
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    return result, elapsed, peak_mb
+
+
+def remove_cache(path: str):
+    """删除数据文件对应的 .npy 缓存。"""
+    for p in cache_paths(path):
+        if os.path.exists(p):
+            os.remove(p)
+
+
+def bench_loading(path: str, n: int):
+    """对比各读取方式的用时（不开 tracemalloc，它会大幅拖慢逐行解析）；读完后校验结果一致。"""
+    remove_cache(path)
+    rows = []
+    ref = None
+    for name, fn in (("genfromtxt", lambda: np.genfromtxt(path, delimiter=" ")),
+                     ("分块解析", lambda: load_points(path, use_cache=False)),
+                     ("生成缓存", lambda: load_points(path)),
+                     ("内存映射", lambda: load_points(path))):
+        t0 = time.perf_counter()
+        data = fn()
+        rows.append((name, time.perf_counter() - t0))
+        if ref is None:
+            ref = data
+        assert np.array_equal(np.asarray(data), ref), name
+    remove_cache(path)
+    print(f"{n:>10}  " + "  ".join(f"{name} {t * 1000:>9.1f} ms" for name, t in rows))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="全量 KMeans vs 流式小批量 KMeans")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 100_000, 1_000_000], help="数据规模 N")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--n-init", type=int, default=1, help="全量 KMeans 的重启次数")
+    parser.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE)
+    parser.add_argument("--epochs", type=int, default=1, help="流式模式扫描文件的遍数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only-load", action="store_true", help="只对比数据读取方式，不训练")
+    parser.add_argument("--no-memory", action="store_true", help="不测峰值内存（省去每种方式的第二遍运行）")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {}
+        print("数据读取：")
+        for n in args.sizes:
+            paths[n] = os.path.join(tmp, f"points_{n}.txt")
+            make_file(paths[n], n, args.k, args.seed)
+            bench_loading(paths[n], n)
+        if args.only_load:
+            return
+
+        print(f"\n{'N':>10}  {'方式':<8}{'用时s':>8}{'峰值MB':>9}{'inertia':>16}{'差距':>8}")
+        for n, path in paths.items():
+            def full():
+                data = load_points(path, use_cache=False)
+                return KMeans(n_clusters=args.k, n_init=args.n_init, random_state=args.seed).fit(data)
+
+            def stream():
+                return fit_stream(path, args.k, block_size=args.block_size, n_epochs=args.epochs,
+                                  random_state=args.seed)
+
+            km_full, t_full, mem_full = measure(full, path, not args.no_memory)
+            km_stream, t_stream, mem_stream = measure(stream, path, not args.no_memory)
+            inertia_full = evaluate_stream(km_full, path, args.block_size)[0]
+            inertia_stream = evaluate_stream(km_stream, path, args.block_size)[0]
+            print(f"{n:>10}  {'全量':<8}{t_full:>8.2f}{mem_full:>9.1f}{inertia_full:>16.1f}{'':>8}")
+            print(f"{n:>10}  {'流式':<8}{t_stream:>8.2f}{mem_stream:>9.1f}{inertia_stream:>16.1f}"
+                  f"{inertia_stream / inertia_full - 1:>8.2%}")
+            remove_cache(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+压测基准：在本地模拟服务（sflib.mock_server）上运行翻译器、摘要器、抽取器和助理，
+比较不同并发数下的吞吐、延迟分位数与错误处理情况。
+
+每个场景调用的都是工具本身的函数（translate / summarize_document / run_batch + extract_to_json /
+流式聊天与图片生成），只是把 API_URL 指向本地模拟服务，因此测到的是真实的分段、并发、
+重试与修复逻辑，不消耗API额度。
+
+输出指标：
+- 请求/秒：每秒完成的模型调用数（含重试后成功的）
+- p50 / p99：单次模型调用的延迟（含客户端限流等待与重试）
+- 失败：重试用尽后仍失败的调用数；429 / 5xx：客户端看到并重试的次数
+- 场景附加信息：抽取器的 JSON 修复路径、助理的首字延迟 p50；
+  某个错误没有被工具兜住、导致整个任务失败时，显示“任务中止”及异常
+
+用法：
+    python bench_load.py                                   # 默认：4个场景 × 并发 1/4/16
+    python bench_load.py --scenarios extractor --concurrency 8 32 --items 400
+    python bench_load.py --latency-ms 300 --rate-429 0.05 --rate-5xx 0.02 --bad-json-rate 0.1
+    python bench_load.py --rps-limit 30                    # 模拟服务商的每秒请求上限
+    python bench_load.py --scenarios extractor --pack 8    # 抽取器每次请求打包 8 条记录
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+for sub in ("ai-lab-other/llm1-translate", "ai-lab-other/llm2-summarize",
+            "ai-lab-other/llm3-extract", "ai-lab-ch4"):
+    sys.path.insert(0, os.path.join(ROOT, sub))
+
+import batch_extract  # noqa: E402
+import doc_summarizer  # noqa: E402
+import json_extractor  # noqa: E402
+import json_repair  # noqa: E402
+import my_assistant_sf  # noqa: E402
+import translate_tone  # noqa: E402
+from sflib.http_client import configure, get_client  # noqa: E402
+from sflib.mock_server import CHAT_PATH, IMAGES_PATH, MockConfig, MockServer  # noqa: E402
+from sflib.parallel import ordered_map  # noqa: E402
+from sflib.sse import stream_chat  # noqa: E402
+
+
+SAMPLE_ZH = "人工智能正在改变许多行业的工作方式。企业借助大模型提高效率，同时也面临数据安全的挑战！我们应该如何平衡？\n"
+SAMPLE_EXTRACT = "2025年10月，小王加入了示例科技，入职地点在上海。负责人是李雷。"
+
+
+class Recorder:
+    """记录每次模型调用的耗时与失败数。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: List[float] = []
+        self.ttfts: List[float] = []
+        self.failures = 0
+
+    def wrap(self, fn: Callable) -> Callable:
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception:
+                with self._lock:
+                    self.failures += 1
+                raise
+            with self._lock:
+                self.latencies.append(time.perf_counter() - t0)
+            return result
+        return timed
+
+    def add_ttft(self, seconds: float):
+        with self._lock:
+            self.ttfts.append(seconds)
+
+
+def percentile(values: List[float], q: float) -> float:
+    """最近秩法求分位数，values 无需预先排序。"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100.0 * len(ordered)) - 1)]
+
+
+def run_translator(rec: Recorder, items: int, concurrency: int) -> str:
+    # 约 items 个分段：每段 600 tokens，一行样例约 50 tokens
+    text = SAMPLE_ZH * (items * 12)
+    original = translate_tone.call_chat_api
+    translate_tone.call_chat_api = rec.wrap(original)
+    try:
+        translate_tone.translate(text, "zh2en", "formal", concurrency=concurrency, memory=None)
+    finally:
+        translate_tone.call_chat_api = original
+    return ""
+
+
+def run_summarizer(rec: Recorder, items: int, concurrency: int) -> str:
+    text = SAMPLE_ZH * (items * 16)
+    original = doc_summarizer.call_chat
+    doc_summarizer.call_chat = rec.wrap(original)
+    try:
+        doc_summarizer.summarize_document(text, "bullet", concurrency=concurrency)
+    finally:
+        doc_summarizer.call_chat = original
+    return ""
+
+
+def run_extractor(rec: Recorder, items: int, concurrency: int, pack: int = 1) -> str:
+    json_repair.REPAIR_COUNTERS.clear()
+    original = json_extractor.call_chat
+    json_extractor.call_chat = rec.wrap(original)
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "records.jsonl")
+        with open(src, "w", encoding="utf-8") as f:
+            for i in range(items):
+                f.write(json.dumps({"id": i, "text": f"{SAMPLE_EXTRACT}（第{i}条）"}, ensure_ascii=False) + "\n")
+        try:
+            stats = batch_extract.run_batch(json_extractor.extract_to_json, src, os.path.join(tmp, "out.jsonl"),
+                                            concurrency, progress=False,
+                                            pack_fn=json_extractor.extract_many, pack_size=pack)
+        finally:
+            json_extractor.call_chat = original
+    c = json_repair.REPAIR_COUNTERS
+    extra = f"；打包 整批 {c['pack_ok']} / 拆分 {c['pack_split']}" if pack > 1 else ""
+    return (f"记录失败 {stats['failed']}；JSON 直接 {c['direct']} / 修复 {c['repaired']} / "
+            f"模型重试 {c['model_retry']} / 失败 {c['failed']}{extra}")
+
+
+def run_assistant(rec: Recorder, items: int, concurrency: int) -> str:
+    """每个条目：一轮流式聊天 + 一次情感分析；每 4 个条目再生成并下载一张图片。"""
+    url = my_assistant_sf.API_URL
+
+    def stream_turn(i: int):
+        result = stream_chat([{"role": "user", "content": f"你好，第{i}轮"}],
+                             "Qwen/Qwen2.5-7B-Instruct", my_assistant_sf.API_KEY, url=url)
+        rec.add_ttft(result.ttft or 0.0)
+
+    def image(i: int):
+        resp = get_client().post_with_retry(my_assistant_sf.IMAGE_GENERATION_URL, my_assistant_sf.API_KEY,
+                                            {"model": "black-forest-labs/FLUX.1-schnell", "prompt": f"猫{i}", "n": 1})
+        resp.raise_for_status()
+        get_client().get(resp.json()["data"][0]["url"]).content
+
+    chat = rec.wrap(stream_turn)
+    emotion = rec.wrap(my_assistant_sf.call_ai_api)
+    gen = rec.wrap(image)
+
+    def one(i: int):
+        chat(i)
+        emotion([{"role": "user", "content": f"分析这段话的情感: 今天很开心（{i}）"}])
+        if i % 4 == 0:
+            gen(i)
+
+    ordered_map(lambda i: _swallow(one, i), range(items), concurrency)
+    return f"首字延迟 p50 {percentile(rec.ttfts, 50) * 1000:.0f} ms"
+
+
+def _swallow(fn: Callable, *args):
+    """单个条目失败已由 Recorder 计数，不中断整个场景。"""
+    try:
+        fn(*args)
+    except Exception:
+        pass
+
+
+SCENARIOS: Dict[str, Callable[[Recorder, int, int], str]] = {
+    "translator": run_translator,
+    "summarizer": run_summarizer,
+    "extractor": run_extractor,
+    "assistant": run_assistant,
+}
+
+
+def point_tools_at(base_url: str):
+    chat_url = base_url + CHAT_PATH
+    for mod in (translate_tone, doc_summarizer, json_extractor, my_assistant_sf):
+        mod.API_URL = chat_url
+        mod.API_KEY = "sk-mock"
+    my_assistant_sf.IMAGE_GENERATION_URL = base_url + IMAGES_PATH
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM 工具压测（本地模拟服务）")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16], help="要测试的并发数")
+    parser.add_argument("--items", type=int, default=40, help="每个场景的工作量（分段数/记录数/对话轮数）")
+    parser.add_argument("--client-rps", type=float, default=200.0, help="客户端限流的每秒请求数")
+    parser.add_argument("--latency", type=str, choices=["fixed", "uniform", "exp", "lognormal"], default="lognormal")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="模拟服务的首字节延迟（中位数/均值）")
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--tokens-per-s", type=float, default=2000.0, help="模拟的生成速度")
+    parser.add_argument("--rps-limit", type=float, default=None, help="模拟服务的每秒请求上限")
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-5xx", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--bad-json-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pack", type=int, default=1, help="抽取器场景每次请求打包的记录数")
+    args = parser.parse_args()
+
+    config = MockConfig(args.latency, args.latency_ms, args.latency_sigma, args.tokens_per_s,
+                        rps_limit=args.rps_limit, rate_429=args.rate_429, rate_5xx=args.rate_5xx,
+                        malformed_rate=args.malformed_rate, bad_json_rate=args.bad_json_rate,
+                        image_latency_ms=args.latency_ms * 4, seed=args.seed)
+    with MockServer(config) as server:
+        point_tools_at(server.url)
+        print(f"模拟服务 {server.url}：延迟 {args.latency} {args.latency_ms:.0f} ms，"
+              f"429 {args.rate_429:.0%}，5xx {args.rate_5xx:.0%}，"
+              f"坏响应 {args.malformed_rate:.0%}，坏JSON {args.bad_json_rate:.0%}\n")
+        print(f"{'场景':<12}{'并发':>4}{'调用':>7}{'用时s':>8}{'请求/秒':>9}{'p50 ms':>9}{'p99 ms':>9}"
+              f"{'失败':>6}{'429':>6}{'5xx':>6}  附加")
+        for name in args.scenarios:
+            for c in args.concurrency:
+                # 每轮重建共享客户端：连接池按并发数设置，统计从零开始
+                configure(pool_maxsize=max(c, 4), requests_per_s=args.client_rps)
+                rec = Recorder()
+                t0 = time.perf_counter()
+                try:
+                    if name == "extractor":
+                        extra = run_extractor(rec, args.items, c, args.pack)
+                    else:
+                        extra = SCENARIOS[name](rec, args.items, c)
+                except Exception as e:  # 工具本身没有兜住的错误：整个任务中止
+                    extra = f"任务中止: {type(e).__name__}: {str(e)[:60]}"
+                elapsed = time.perf_counter() - t0
+                stats = get_client().stats()
+                calls = len(rec.latencies)
+                print(f"{name:<12}{c:>4}{calls:>7}{elapsed:>8.2f}{calls / elapsed:>9.1f}"
+                      f"{percentile(rec.latencies, 50) * 1000:>9.0f}{percentile(rec.latencies, 99) * 1000:>9.0f}"
+                      f"{rec.failures:>6}{stats['throttled']:>6}{stats['server_errors']:>6}  {extra}")
+        print(f"\n模拟服务计数: {server.stats()}")
+
+
+if __name__ == "__main__":
+    main()
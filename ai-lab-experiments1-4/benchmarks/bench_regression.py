@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+平均分回归基准：对比 LinearRegression（整表读入内存）与流式闭式解（ai-lab-ch2/avgscore_stream.py）。
+
+对每个数据规模 N 生成一份成绩表 CSV（三科成绩 + 带噪声的“平均分”列，噪声使结果不是完美拟合，
+比较更有意义），两种方式使用同一个按哈希划分的训练/测试集，比较：
+- 用时：全量方式含 pd.read_csv；流式方式分别用 1 个进程和 --jobs 个进程，含训练与评估两遍扫描
+- 权重、截距、MAE、R² 与 LinearRegression 的最大差异（应在 1e-9 量级以内）
+- 安装了 pyarrow 时，同时测试 Parquet 输入
+
+用法：
+    python bench_regression.py                               # N = 10万 / 100万
+    python bench_regression.py --sizes 1000000 10000000 --jobs 4 --chunk-mb 16
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import mean_absolute_error, r2_score
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "ai-lab-ch2")))
+from avgscore_stream import (DEFAULT_CHUNK_BYTES, DEFAULT_FEATURES, DEFAULT_TARGET,  # noqa: E402
+                             eval_mask, fit_stream)
+
+
+def make_file(path: str, n: int, seed: int, noise: float, block_rows: int = 1_000_000):
+    """分块生成成绩表：平均分 = 三科均值 + 正态噪声。"""
+    rng = np.random.default_rng(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(",".join(DEFAULT_FEATURES + [DEFAULT_TARGET]) + "\n")
+        for start in range(0, n, block_rows):
+            X = rng.integers(50, 101, size=(min(block_rows, n - start), 3))
+            y = X.mean(axis=1) + rng.normal(0, noise, size=len(X))
+            pd.DataFrame({**dict(zip(DEFAULT_FEATURES, X.T)), DEFAULT_TARGET: np.round(y, 4)}).to_csv(
+                f, header=False, index=False)
+
+
+def fit_in_memory(path: str):
+    """整表读入内存，用与流式相同的划分训练 LinearRegression，返回 (权重, 截距, MAE, R²)。"""
+    df = pd.read_csv(path)
+    test = eval_mask(df[DEFAULT_FEATURES + [DEFAULT_TARGET]])
+    X, y = df[DEFAULT_FEATURES].to_numpy(dtype=float), df[DEFAULT_TARGET].to_numpy(dtype=float)
+    lr = LinearRegression().fit(X[~test], y[~test])
+    y_pred = lr.predict(X[test])
+    return lr.coef_, lr.intercept_, mean_absolute_error(y[test], y_pred), r2_score(y[test], y_pred)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LinearRegression vs 流式闭式解")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[100_000, 1_000_000], help="数据规模 N")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="并行进程数")
+    parser.add_argument("--chunk-mb", type=int, default=DEFAULT_CHUNK_BYTES // 2 ** 20, help="CSV 每块的大小（MB）")
+    parser.add_argument("--noise", type=float, default=2.0, help="平均分列的噪声标准差")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    try:
+        import pyarrow  # noqa: F401
+        formats = ["csv", "parquet"]
+    except ImportError:
+        formats = ["csv"]
+
+    print(f"{'N':>10}  {'方式':<16}{'用时s':>8}{'权重差':>10}{'截距差':>10}{'MAE差':>10}{'R²差':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            path = os.path.join(tmp, f"scores_{n}.csv")
+            make_file(path, n, args.seed, args.noise)
+            t0 = time.perf_counter()
+            ref = fit_in_memory(path)
+            print(f"{n:>10}  {'LinearRegression':<16}{time.perf_counter() - t0:>8.2f}")
+
+            runs = [("csv", path)]
+            if "parquet" in formats:
+                pq_path = os.path.join(tmp, f"scores_{n}.parquet")
+                pd.read_csv(path).to_parquet(pq_path, row_group_size=max(n // 8, 1))
+                runs.append(("parquet", pq_path))
+            for fmt, p in runs:
+                for jobs in sorted({1, args.jobs}):
+                    t0 = time.perf_counter()
+                    lr, report = fit_stream(p, jobs=jobs, chunk_bytes=args.chunk_mb * 2 ** 20)
+                    elapsed = time.perf_counter() - t0
+                    diffs = (np.abs(lr.coef_ - ref[0]).max(), abs(lr.intercept_ - ref[1]),
+                             abs(report["mae"] - ref[2]), abs(report["r2"] - ref[3]))
+                    print(f"{n:>10}  {f'流式 {fmt} ×{jobs}':<16}{elapsed:>8.2f}" + "".join(f"{d:>10.1e}" for d in diffs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+决策区域渲染基准：对比原来的“固定步长 0.02 网格 + km.predict”与 ai-lab-ch2/kmeans_render.py。
+
+把同一份聚类数据放大到不同的范围（坐标乘以 scale），分别测量：
+- 网格点数：旧方法随数据范围平方增长，新方法固定为像素上限
+- 计算距离的点数：新方法只在簇边界附近逐像素计算
+- 用时；旧方法网格超过 --max-old-cells 时跳过（会耗尽内存）
+- 不一致像素：新方法与对同一像素网格逐点 predict 的结果相比
+
+用法：
+    python bench_render.py
+    python bench_render.py --scales 1 10 100 10000 --max-pixels 1000000 --block 16
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.cluster import KMeans
+from sklearn.datasets import make_blobs
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "ai-lab-ch2")))
+from kmeans_render import DEFAULT_BLOCK, DEFAULT_MAX_PIXELS, decision_regions  # noqa: E402
+
+
+def old_render(km, x_min, x_max, y_min, y_max):
+    """原 kmeans_demo.py 的做法。"""
+    xx, yy = np.meshgrid(np.arange(x_min, x_max, 0.02), np.arange(y_min, y_max, 0.02))
+    return km.predict(np.c_[xx.ravel(), yy.ravel()]).reshape(xx.shape)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KMeans 决策区域渲染基准")
+    parser.add_argument("--scales", nargs="+", type=float, default=[1, 10, 100, 1e4])
+    parser.add_argument("--max-pixels", type=int, default=DEFAULT_MAX_PIXELS)
+    parser.add_argument("--block", type=int, default=DEFAULT_BLOCK)
+    parser.add_argument("--max-old-cells", type=float, default=2e7, help="旧方法最多允许的网格点数")
+    args = parser.parse_args()
+
+    X, _ = make_blobs(n_samples=2000, centers=4, n_features=2, cluster_std=0.6, random_state=13)
+    print(f"{'scale':>8}  {'旧网格点数':>12}{'旧用时ms':>10}  {'新像素':>10}{'计算点数':>10}{'新用时ms':>10}{'不一致':>8}")
+    for scale in args.scales:
+        data = X * scale
+        km = KMeans(n_clusters=4, n_init=10, random_state=0).fit(data)
+        x_min, x_max = data[:, 0].min() - 1, data[:, 0].max() + 1
+        y_min, y_max = data[:, 1].min() - 1, data[:, 1].max() + 1
+
+        old_cells = np.ceil((x_max - x_min) / 0.02) * np.ceil((y_max - y_min) / 0.02)
+        if old_cells <= args.max_old_cells:
+            t0 = time.perf_counter()
+            old_render(km, x_min, x_max, y_min, y_max)
+            old_ms = f"{(time.perf_counter() - t0) * 1000:>10.1f}"
+        else:
+            old_ms = f"{'跳过':>8}"
+
+        t0 = time.perf_counter()
+        Z, n_evaluated = decision_regions(km.cluster_centers_, x_min, x_max, y_min, y_max,
+                                          args.max_pixels, args.block)
+        new_ms = (time.perf_counter() - t0) * 1000
+
+        # 校验：对同一像素网格逐点 predict
+        ny, nx = Z.shape
+        gx, gy = np.meshgrid(np.linspace(x_min, x_max, nx), np.linspace(y_min, y_max, ny))
+        mismatch = int((km.predict(np.c_[gx.ravel(), gy.ravel()]).reshape(Z.shape) != Z).sum())
+        print(f"{scale:>8g}  {old_cells:>12.3g}{old_ms}  {Z.size:>10}{n_evaluated:>10}{new_ms:>10.1f}{mismatch:>8}")
+
+
+if __name__ == "__main__":
+    main()
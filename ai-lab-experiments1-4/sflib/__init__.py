@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+
+"""
+sflib：实验四与 ai-lab-other 各工具共用的硅基流动调用库。
+
+各脚本通过把本目录的上级加入 sys.path 后导入，例如：
+    from sflib.http_client import get_client
+"""
+
+from .http_client import (
+    API_URL,
+    IMAGE_GENERATION_URL,
+    PooledClient,
+    configure,
+    format_stats,
+    get_client,
+)
+
+__all__ = [
+    "API_URL",
+    "IMAGE_GENERATION_URL",
+    "PooledClient",
+    "configure",
+    "format_stats",
+    "get_client",
+]
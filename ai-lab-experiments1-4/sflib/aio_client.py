@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+
+"""
+异步（asyncio）版硅基流动客户端，基于 aiohttp 的共享连接池。
+
+同步客户端每个并发请求占用一个线程；在 asyncio 服务中使用本客户端，
+成千上万个在途请求可以共用一个事件循环，连接池上限由 limit / limit_per_host 控制。
+
+与同步客户端共用同一套限流器、熔断器和统计（默认取自 get_client()），
+因此同一进程里线程与协程发出的请求一起受 RPS/TPM 限制。
+
+依赖：pip install aiohttp（仅使用异步接口时需要）。
+"""
+
+import asyncio
+import json
+import time
+from typing import Optional
+
+import requests
+
+try:
+    import aiohttp
+except ImportError:  # 异步接口是可选功能，未安装 aiohttp 时同步工具照常可用
+    aiohttp = None
+
+from . import telemetry
+from .http_client import API_URL, DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT, get_client
+from .resilience import RETRYABLE_STATUS, parse_retry_after
+from .response_cache import make_key
+from .tokens import estimate_tokens
+
+
+DEFAULT_LIMIT = 100           # 连接池总连接数上限
+DEFAULT_LIMIT_PER_HOST = 64   # 单个主机的连接数上限
+
+
+class AsyncHTTPError(requests.HTTPError):
+    """重试后仍返回错误状态码。
+
+    继承 requests.HTTPError，调用方捕获 requests.RequestException 的代码对同步、异步两套接口通用。
+    """
+
+    def __init__(self, status: int, body: str):
+        super().__init__(f"HTTP {status}: {body[:200]}")
+        self.status = status
+        self.body = body
+
+
+def _trace_config() -> "aiohttp.TraceConfig":
+    """把 aiohttp 的连接池排队、DNS 解析与建立连接耗时写入本次请求的 RequestRecord。"""
+    tc = aiohttp.TraceConfig()
+
+    async def queued_start(session, ctx, params):
+        ctx.queued_t0 = time.perf_counter()
+
+    async def queued_end(session, ctx, params):
+        if ctx.trace_request_ctx is not None:
+            ctx.trace_request_ctx.pool_wait_s = time.perf_counter() - ctx.queued_t0
+
+    async def dns_start(session, ctx, params):
+        ctx.dns_t0 = time.perf_counter()
+
+    async def dns_end(session, ctx, params):
+        if ctx.trace_request_ctx is not None:
+            ctx.trace_request_ctx.dns_s = time.perf_counter() - ctx.dns_t0
+
+    async def connect_start(session, ctx, params):
+        ctx.connect_t0 = time.perf_counter()
+
+    async def connect_end(session, ctx, params):
+        record = ctx.trace_request_ctx
+        if record is not None:
+            # 建立连接的耗时包含 DNS 解析，这里扣除，只保留 TCP+TLS
+            record.connect_s = max(time.perf_counter() - ctx.connect_t0 - record.dns_s, 0.0)
+
+    tc.on_connection_queued_start.append(queued_start)
+    tc.on_connection_queued_end.append(queued_end)
+    tc.on_dns_resolvehost_start.append(dns_start)
+    tc.on_dns_resolvehost_end.append(dns_end)
+    tc.on_connection_create_start.append(connect_start)
+    tc.on_connection_create_end.append(connect_end)
+    return tc
+
+
+class AsyncClient:
+    """异步聊天补全客户端。需在事件循环中使用，用完调用 await close()。"""
+
+    def __init__(self,
+                 limit: int = DEFAULT_LIMIT,
+                 limit_per_host: int = DEFAULT_LIMIT_PER_HOST,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout: float = DEFAULT_READ_TIMEOUT,
+                 sync_client=None):
+        if aiohttp is None:
+            raise RuntimeError("异步接口需要 aiohttp，请先执行: pip install aiohttp")
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        # 与同步客户端共用限流器、重试策略、熔断器与统计
+        shared = sync_client or get_client()
+        self.limiter = shared.limiter
+        self.retry = shared.retry
+        self.breaker = shared.breaker
+        self.resilience = shared.resilience
+        self._session: Optional["aiohttp.ClientSession"] = None
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host,
+                                             keepalive_timeout=30)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout,
+                                                  trace_configs=[_trace_config()])
+        return self._session
+
+    async def _send(self, session, url: str, headers: dict, data: dict, attempt: int):
+        """发送一次请求，返回 (状态码, 响应头, 响应体)；开启 telemetry 时同时生成一条记录。"""
+        if not telemetry.enabled():
+            async with session.post(url, headers=headers, json=data) as resp:
+                return resp.status, resp.headers, await resp.read()
+
+        kind, model, preview = telemetry.describe_request(url, data)
+        record = telemetry.RequestRecord(kind, model, attempt, request_bytes=len(json.dumps(data).encode("utf-8")),
+                                         prompt_preview=preview)
+        t0 = time.perf_counter()
+        try:
+            async with session.post(url, headers=headers, json=data, trace_request_ctx=record) as resp:
+                record.ttfb_s = time.perf_counter() - t0
+                record.status = resp.status
+                body = await resp.read()
+        except BaseException as e:
+            record.total_s = time.perf_counter() - t0
+            record.error = type(e).__name__
+            telemetry.emit(record)
+            raise
+        record.total_s = time.perf_counter() - t0
+        record.response_bytes = len(body)
+        if kind == "chat" and resp.status < 400:
+            try:
+                record.set_usage(json.loads(body).get("usage"))
+            except (ValueError, AttributeError):
+                pass
+        telemetry.emit(record)
+        return resp.status, resp.headers, body
+
+    async def post_json(self, url: str, api_key: str, data: dict) -> dict:
+        """带限流、重试与熔断的 POST，返回解析后的 JSON。
+
+        重试用尽仍失败时抛出 AsyncHTTPError（状态码错误）或 requests.ConnectionError（网络错误）。
+        """
+        headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+        est_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in data.get("messages", []))
+        est_tokens += int(data.get("max_tokens") or 256)
+        session = self._get_session()
+        attempt = 0
+        while True:
+            probe = self.breaker.before_request()
+            retry_after = None
+            try:
+                if self.limiter is not None:
+                    await self.limiter.acquire_async(est_tokens)
+                status, resp_headers, body = await self._send(session, url, headers, data, attempt)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                self.breaker.record_failure()
+                self.resilience.add("network_errors")
+                if attempt >= self.retry.max_retries:
+                    # 与同步客户端保持一致的异常类型
+                    raise requests.ConnectionError(f"{type(e).__name__}: {e}") from e
+            except Exception:
+                self.breaker.record_failure()  # 其他异常（如 aiohttp.ClientPayloadError）同样算一次失败
+                raise
+            except BaseException:
+                if probe:
+                    self.breaker.release_probe()  # 被取消：不下结论，但不能让熔断器卡在探测中
+                raise
+            else:
+                text = body.decode("utf-8", errors="replace")
+                if status not in RETRYABLE_STATUS:
+                    self.breaker.record_success()
+                    if self.limiter is not None:
+                        self.limiter.on_success()
+                    if status >= 400:
+                        raise AsyncHTTPError(status, text)
+                    return json.loads(text)
+                if status == 429:
+                    self.resilience.add("throttled")
+                    if probe:
+                        self.breaker.release_probe()
+                    if self.limiter is not None:
+                        self.limiter.on_throttled()
+                else:
+                    self.breaker.record_failure()
+                    self.resilience.add("server_errors")
+                if attempt >= self.retry.max_retries:
+                    raise AsyncHTTPError(status, text)
+                retry_after = parse_retry_after(resp_headers.get("Retry-After"))
+            self.resilience.add("retries")
+            await asyncio.sleep(self.retry.backoff(attempt, retry_after))
+            attempt += 1
+
+    async def chat(self, messages, model: str, api_key: str, url: str = API_URL,
+                   cache=None, **params) -> dict:
+        """异步调用聊天补全接口，返回 JSON；cache 用法同 PooledClient.chat。"""
+        data = {"model": model, "messages": messages, "stream": False}
+        data.update(params)
+        if cache is None:
+            return await self.post_json(url, api_key, data)
+        return await cache.get_or_call_async(make_key(model, messages, dict(params, url=url)),
+                                             lambda: self.post_json(url, api_key, data))
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+_async_clients = {}
+
+
+def get_async_client() -> AsyncClient:
+    """获取当前事件循环对应的共享异步客户端（aiohttp 会话不能跨事件循环使用）。"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        # 清理已关闭事件循环遗留的客户端
+        for old_loop in [lp for lp in _async_clients if lp.is_closed()]:
+            del _async_clients[old_loop]
+        client = _async_clients[loop] = AsyncClient()
+    return client
+
+
+async def close_async_client():
+    """关闭当前事件循环的共享异步客户端（通常在服务退出前调用）。"""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
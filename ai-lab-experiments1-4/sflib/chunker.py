@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+"""
+按 token 预算、在句子/段落边界处切分文本的流式分段器（翻译器与摘要器共用）。
+
+与按固定字符数切片相比：
+- 不会把一句话拆成两半，模型看到的每段都是完整语义；
+- 用 token 而非字符计量，中文与英文都能把上下文填满，段数更少；
+- 以生成器方式工作，输入可以是字符串，也可以是按块读取的文件对象，
+  大文件无需一次性读入内存。
+
+句子边界：中文 。！？ 以及 ! ? ；英文句点后需跟空白；换行也视为边界。
+未开启重叠时，所有分段按顺序拼接后与原文完全一致。
+
+iter_anchored_chunks 是供增量处理使用的变体：分段边界由句子内容决定而不是由前面累计的长度决定，
+文档中间插入或修改一段文字后，之后的分段会很快与旧版本重新对齐。
+"""
+
+import re
+import zlib
+from typing import Iterable, Iterator, List, Union
+
+from .tokens import estimate_tokens, is_cjk
+
+# 句末标点（可带收尾引号/括号）、英文句点+空白、换行，之后的空白一并归入当前句
+_BOUNDARY = re.compile(r"(?:[。！？!?；;]+[”’\"'」』）)\]]*|\.(?=\s)|\n)\s*")
+
+# 迟迟找不到句子边界时，缓冲区超过该字符数就强制切出，防止无标点的超长输入撑爆内存
+_MAX_PENDING_CHARS = 1 << 16
+
+
+def _pieces(source: Union[str, Iterable[str]], block_size: int = 1 << 16) -> Iterator[str]:
+    """把输入统一成若干文本块：字符串按块切开，文件对象按固定大小读取，其余视为可迭代的文本块。
+
+    文件按块而不是按行读取，即使整个文件没有换行也不会一次读入内存。
+    """
+    if isinstance(source, str):
+        for i in range(0, len(source), block_size):
+            yield source[i:i + block_size]
+    elif hasattr(source, "read"):
+        for piece in iter(lambda: source.read(block_size), ""):
+            yield piece
+    else:
+        for piece in source:
+            yield piece
+
+
+def iter_sentences(source: Union[str, Iterable[str]]) -> Iterator[str]:
+    """流式产出句子（含句末标点和其后的空白）。"""
+    buf = ""
+    for piece in _pieces(source):
+        buf += piece
+        last = 0
+        for m in _BOUNDARY.finditer(buf):
+            # 落在缓冲区末尾的匹配可能还没读完（后面可能还有空白），留到下一块再判断
+            if m.end() == len(buf):
+                break
+            yield buf[last:m.end()]
+            last = m.end()
+        buf = buf[last:]
+        if len(buf) > _MAX_PENDING_CHARS:
+            yield buf
+            buf = ""
+    if buf:
+        yield buf
+
+
+def _split_oversized(sentence: str, max_tokens: int) -> Iterator[str]:
+    """单句就超过预算时，退化为按 token 估算硬切。"""
+    start = 0
+    tokens = 0.0
+    for i, ch in enumerate(sentence):
+        t = 1.0 if is_cjk(ch) else 0.25  # 与 estimate_tokens 的经验比例一致
+        if tokens + t > max_tokens and i > start:
+            yield sentence[start:i]
+            start, tokens = i, 0.0
+        tokens += t
+    if start < len(sentence):
+        yield sentence[start:]
+
+
+def iter_chunks(source: Union[str, Iterable[str]],
+                max_tokens: int = 600,
+                overlap_tokens: int = 0) -> Iterator[str]:
+    """把输入打包成不超过 max_tokens 的分段，只在句子/段落边界处断开。
+
+    参数：
+        source:         字符串，或逐块产出文本的可迭代对象（如 open(path) 得到的文件）
+        max_tokens:     每段的 token 预算
+        overlap_tokens: 相邻分段的重叠量（以整句为单位回带），0 表示不重叠
+    """
+    cur: List[str] = []
+    cur_tokens = 0
+    for sentence in iter_sentences(source):
+        t = estimate_tokens(sentence)
+        parts = [sentence] if t <= max_tokens else list(_split_oversized(sentence, max_tokens))
+        for part in parts:
+            pt = t if len(parts) == 1 else estimate_tokens(part)
+            if cur and cur_tokens + pt > max_tokens:
+                yield "".join(cur)
+                # 回带末尾若干整句作为下一段的开头，提供上下文衔接
+                carry: List[str] = []
+                carry_tokens = 0
+                if overlap_tokens > 0:
+                    for prev in reversed(cur):
+                        prev_t = estimate_tokens(prev)
+                        if carry_tokens + prev_t > overlap_tokens or carry_tokens + prev_t + pt > max_tokens:
+                            break
+                        carry.insert(0, prev)
+                        carry_tokens += prev_t
+                cur, cur_tokens = carry, carry_tokens
+            cur.append(part)
+            cur_tokens += pt
+    if cur:
+        yield "".join(cur)
+
+
+def iter_anchored_chunks(source: Union[str, Iterable[str]],
+                         max_tokens: int = 600,
+                         min_tokens: int = 0,
+                         anchor_every: int = 8) -> Iterator[str]:
+    """按内容锚定边界的分段：同样不超过 max_tokens、只在句子边界断开。
+
+    当前段已有 min_tokens（默认 max_tokens 的一半）以上时，若某句内容的 CRC32
+    能被 anchor_every 整除，就在该句之后断开。边界只取决于句子本身，
+    所以某处改动只影响附近一两段，其余分段与旧版本逐字相同，可复用之前的处理结果。
+    """
+    min_tokens = min_tokens or max_tokens // 2
+    cur: List[str] = []
+    cur_tokens = 0
+    for sentence in iter_sentences(source):
+        t = estimate_tokens(sentence)
+        parts = [sentence] if t <= max_tokens else list(_split_oversized(sentence, max_tokens))
+        for part in parts:
+            pt = t if len(parts) == 1 else estimate_tokens(part)
+            if cur and cur_tokens + pt > max_tokens:
+                yield "".join(cur)
+                cur, cur_tokens = [], 0
+            cur.append(part)
+            cur_tokens += pt
+        # 去掉首尾空白再取哈希：在文末追加内容时，原来的最后一句多出的换行不影响锚点
+        if cur_tokens >= min_tokens and zlib.crc32(sentence.strip().encode("utf-8")) % anchor_every == 0:
+            yield "".join(cur)
+            cur, cur_tokens = [], 0
+    if cur:
+        yield "".join(cur)
+
+
+def chunk_list(text: str, max_tokens: int = 600, overlap_tokens: int = 0) -> List[str]:
+    """iter_chunks 的列表版本，便于对已在内存中的短文本直接使用。"""
+    return list(iter_chunks(text, max_tokens, overlap_tokens))
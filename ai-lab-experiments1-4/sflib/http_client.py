@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+共享的硅基流动HTTP客户端：带连接池、长连接（keep-alive）的 requests.Session。
+
+为什么需要：
+- 直接调用 requests.post 时，每次请求都会新建 TCP+TLS 连接；
+- 对于较短的补全请求，握手耗时甚至超过模型生成本身；
+- 所有工具共用一个 Session 后，同一主机的连接会被复用。
+
+可配置项：
+- pool_connections: 缓存多少个主机的连接池
+- pool_maxsize:     每个主机最多保持多少条连接（即单主机并发上限）
+- pool_block:       连接用满时是否排队等待（True）还是临时新建（False）
+- connect_timeout / read_timeout: 连接超时与读取超时（秒）
+
+统计信息（stats()）：
+- requests:        通过连接池发出的请求数
+- new_connections: 实际新建的连接数
+- reused:          复用已有连接的次数
+- wait_total_s / wait_max_s: 从连接池取连接时的等待时间
+- retries / throttled / server_errors / network_errors / breaker_trips: 重试、限流与熔断计数
+
+chat() 与 post_with_retry() 会经过客户端限流、429/5xx 重试与熔断（见 resilience.py）；
+post() 则原样发出请求，由调用方自行处理状态码。
+
+注册了 telemetry 输出端时，每个请求（含每次重试）还会生成一条耗时与用量记录（见 telemetry.py）。
+"""
+
+import socket
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+from . import telemetry
+
+from .resilience import (
+    DEFAULT_FAILURE_THRESHOLD,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_RESET_TIMEOUT,
+    DEFAULT_RPS,
+    DEFAULT_TPM,
+    RETRYABLE_STATUS,
+    CircuitBreaker,
+    RateLimiter,
+    ResilienceStats,
+    RetryPolicy,
+    parse_retry_after,
+)
+from .response_cache import make_key
+from .tokens import estimate_tokens
+
+
+API_URL = "https://api.siliconflow.cn/v1/chat/completions"
+IMAGE_GENERATION_URL = "https://api.siliconflow.cn/v1/images/generations"
+
+DEFAULT_POOL_CONNECTIONS = 4   # 缓存的主机连接池数量
+DEFAULT_POOL_MAXSIZE = 16      # 每个主机的最大连接数
+DEFAULT_CONNECT_TIMEOUT = 5    # 建立连接超时（秒）
+DEFAULT_READ_TIMEOUT = 60      # 等待响应超时（秒）
+
+
+class PoolStats:
+    """线程安全的连接池计数器。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_checkout(self, waited: float):
+        with self._lock:
+            self.requests += 1
+            self.wait_total += waited
+            if waited > self.wait_max:
+                self.wait_max = waited
+
+    def record_new_connection(self):
+        with self._lock:
+            self.new_connections += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            reused = max(self.requests - self.new_connections, 0)
+            return {
+                "requests": self.requests,
+                "new_connections": self.new_connections,
+                "reused": reused,
+                "reuse_rate": reused / self.requests if self.requests else 0.0,
+                "wait_total_s": round(self.wait_total, 6),
+                "wait_max_s": round(self.wait_max, 6),
+                "wait_avg_s": round(self.wait_total / self.requests, 6) if self.requests else 0.0,
+            }
+
+
+# 当前线程正在发送的请求的各阶段耗时（连接池与连接对象在发送请求的线程中被调用）
+_phase = threading.local()
+
+
+def _reset_phase():
+    _phase.pool_wait = 0.0
+    _phase.dns = 0.0
+    _phase.connect = 0.0
+
+
+def _timed_connection(base_cls):
+    """生成一个分别记录 DNS 解析与建立连接耗时的连接类（仅在开启 telemetry 时拆分计时）。"""
+
+    class _Conn(base_cls):
+        def _new_conn(self):
+            if not telemetry.enabled():
+                return super()._new_conn()
+            host = self._dns_host
+            t0 = time.perf_counter()
+            try:
+                infos = socket.getaddrinfo(host, self.port, 0, socket.SOCK_STREAM)
+            except OSError:
+                return super()._new_conn()  # 解析失败时交给 urllib3 抛出标准异常
+            _phase.dns = time.perf_counter() - t0
+            # 用解析好的地址逐个尝试连接，避免重复解析；TLS 证书校验仍使用原主机名
+            addresses = list(dict.fromkeys(info[4][0] for info in infos))
+            error = None
+            for address in addresses:
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except (NewConnectionError, ConnectTimeoutError) as e:
+                    error = e
+                finally:
+                    self._dns_host = host
+            raise error
+
+        def connect(self):
+            t0 = time.perf_counter()
+            super().connect()
+            _phase.connect = max(time.perf_counter() - t0 - getattr(_phase, "dns", 0.0), 0.0)
+
+    _Conn.__name__ = "Timed" + base_cls.__name__
+    return _Conn
+
+
+def _instrumented_pool(base_cls, stats: PoolStats):
+    """生成一个会记录取连接等待时间和新建连接数的连接池类。"""
+
+    class _Pool(base_cls):
+        ConnectionCls = _timed_connection(base_cls.ConnectionCls)
+
+        def _get_conn(self, timeout=None):
+            t0 = time.perf_counter()
+            conn = super()._get_conn(timeout=timeout)
+            waited = time.perf_counter() - t0
+            stats.record_checkout(waited)
+            _phase.pool_wait = waited
+            return conn
+
+        def _new_conn(self):
+            stats.record_new_connection()
+            return super()._new_conn()
+
+    _Pool.__name__ = "Instrumented" + base_cls.__name__
+    return _Pool
+
+
+class _PooledAdapter(HTTPAdapter):
+    """把 urllib3 的连接池替换为带统计的版本。"""
+
+    def __init__(self, stats: PoolStats, **kwargs):
+        self._stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _instrumented_pool(HTTPConnectionPool, self._stats),
+            "https": _instrumented_pool(HTTPSConnectionPool, self._stats),
+        }
+
+
+class PooledClient:
+    """所有硅基流动调用共用的客户端，内部维护一个带连接池的 Session。"""
+
+    def __init__(self,
+                 pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+                 pool_block: bool = True,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout: float = DEFAULT_READ_TIMEOUT,
+                 requests_per_s: Optional[float] = DEFAULT_RPS,
+                 tokens_per_min: Optional[float] = DEFAULT_TPM,
+                 max_retries: int = DEFAULT_MAX_RETRIES,
+                 failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout: float = DEFAULT_RESET_TIMEOUT):
+        self.pool_stats = PoolStats()
+        # requests_per_s 为 None/0 时不做客户端限流
+        self.limiter = RateLimiter(requests_per_s, tokens_per_min) if requests_per_s else None
+        self.retry = RetryPolicy(max_retries)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.resilience = ResilienceStats()
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        adapter = _PooledAdapter(
+            self.pool_stats,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _timeout(self, timeout):
+        # 允许调用方只传一个数字：视为读取超时，连接超时沿用默认值
+        if timeout is None:
+            return self.timeout
+        if isinstance(timeout, (int, float)):
+            return (self.timeout[0], timeout)
+        return timeout
+
+    def post(self, url: str, api_key: str, json: dict, timeout=None, stream: bool = False,
+             attempt: int = 0) -> requests.Response:
+        """发送带鉴权头的 JSON POST 请求，返回原始 Response。"""
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        }
+        if telemetry.enabled():
+            return self._traced("POST", url, json, stream, attempt, headers=headers, json=json,
+                                timeout=self._timeout(timeout))
+        return self.session.post(url, headers=headers, json=json,
+                                 timeout=self._timeout(timeout), stream=stream)
+
+    def _traced(self, method: str, url: str, body: Optional[dict], stream: bool, attempt: int,
+                **kwargs) -> requests.Response:
+        """发送请求并生成 telemetry 记录。
+
+        非流式请求在读完响应体后立即记录；流式请求在调用方 close() 响应时记录，
+        调用方可在此之前通过 resp.telemetry 补充 usage。
+        """
+        kind, model, preview = telemetry.describe_request(url, body)
+        if method == "GET":
+            kind = "download"
+        record = telemetry.RequestRecord(kind, model, attempt, prompt_preview=preview)
+        _reset_phase()
+        t0 = time.perf_counter()
+
+        def fill_phases():
+            record.pool_wait_s = _phase.pool_wait
+            record.dns_s = _phase.dns
+            record.connect_s = _phase.connect
+
+        try:
+            # 总是以 stream=True 发出，才能在收到响应头时记下首字节时间
+            resp = self.session.request(method, url, stream=True, **kwargs)
+        except Exception as e:
+            fill_phases()
+            record.total_s = time.perf_counter() - t0
+            record.error = type(e).__name__
+            telemetry.emit(record)
+            raise
+        record.ttfb_s = time.perf_counter() - t0
+        fill_phases()
+        record.status = resp.status_code
+        record.request_bytes = len(resp.request.body or b"")
+
+        if stream:
+            close = resp.close
+            done = []
+
+            def close_and_record():
+                if not done:
+                    done.append(True)
+                    record.total_s = time.perf_counter() - t0
+                    record.response_bytes = resp.raw.tell() if resp.raw is not None else 0
+                    telemetry.emit(record)
+                close()
+
+            resp.close = close_and_record
+            resp.telemetry = record
+            return resp
+
+        try:
+            content = resp.content
+        except Exception as e:
+            record.total_s = time.perf_counter() - t0
+            record.error = type(e).__name__
+            telemetry.emit(record)
+            raise
+        record.total_s = time.perf_counter() - t0
+        record.response_bytes = len(content)
+        if kind == "chat" and resp.ok:
+            try:
+                record.set_usage(resp.json().get("usage"))
+            except (ValueError, AttributeError):
+                pass
+        telemetry.emit(record)
+        return resp
+
+    def post_with_retry(self, url: str, api_key: str, json: dict, timeout=None, stream: bool = False) -> requests.Response:
+        """带限流、重试与熔断的 POST。
+
+        - 发送前按 RPS/TPM 限流（token 数按提示词长度 + max_tokens 估算）；
+        - 429/5xx 与网络错误按指数退避 + 抖动重试，服务端给出 Retry-After 时以其为准；
+        - 连续失败过多时熔断，直接抛出 CircuitOpenError。
+        重试次数用尽后返回最后一次的响应（或抛出最后一次的网络异常），由调用方 raise_for_status。
+        """
+        est_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in json.get("messages", []))
+        est_tokens += int(json.get("max_tokens") or 256)
+        attempt = 0
+        while True:
+            probe = self.breaker.before_request()
+            try:
+                if self.limiter is not None:
+                    self.limiter.acquire(est_tokens)
+                resp = self.post(url, api_key, json, timeout=timeout, stream=stream, attempt=attempt)
+            except (requests.ConnectionError, requests.Timeout):
+                self.breaker.record_failure()
+                self.resilience.add("network_errors")
+                if attempt >= self.retry.max_retries:
+                    raise
+                delay = self.retry.backoff(attempt)
+            except Exception:
+                self.breaker.record_failure()  # 其他异常（如 ChunkedEncodingError）同样算一次失败
+                raise
+            except BaseException:
+                if probe:
+                    self.breaker.release_probe()  # 被中断（Ctrl+C 等）：不下结论，但不能让熔断器卡在探测中
+                raise
+            else:
+                if resp.status_code not in RETRYABLE_STATUS:
+                    self.breaker.record_success()
+                    if self.limiter is not None:
+                        self.limiter.on_success()
+                    return resp
+                if resp.status_code == 429:
+                    # 限流不代表服务故障，不计入熔断；降低本地发送速率
+                    self.resilience.add("throttled")
+                    if probe:
+                        self.breaker.release_probe()
+                    if self.limiter is not None:
+                        self.limiter.on_throttled()
+                else:
+                    self.breaker.record_failure()
+                    self.resilience.add("server_errors")
+                if attempt >= self.retry.max_retries:
+                    return resp
+                delay = self.retry.backoff(attempt, parse_retry_after(resp.headers.get("Retry-After")))
+                resp.close()
+            self.resilience.add("retries")
+            attempt += 1
+            time.sleep(delay)
+
+    def get(self, url: str, timeout=None, stream: bool = False) -> requests.Response:
+        """发送 GET 请求（如下载生成的图片），同样走连接池。"""
+        if telemetry.enabled():
+            return self._traced("GET", url, None, stream, 0, timeout=self._timeout(timeout))
+        return self.session.get(url, timeout=self._timeout(timeout), stream=stream)
+
+    def chat(self, messages, model: str, api_key: str, url: str = API_URL, timeout=None,
+             cache=None, **params) -> dict:
+        """调用聊天补全接口，检查状态码后返回 JSON。
+
+        cache: 可选的 ResponseCache；传入时相同的 (model, messages, params) 直接复用缓存，
+               并发的相同请求只会真正发出一次。
+        """
+        data = {"model": model, "messages": messages, "stream": False}
+        data.update(params)
+
+        def send() -> dict:
+            resp = self.post_with_retry(url, api_key, data, timeout=timeout)
+            resp.raise_for_status()
+            return resp.json()
+
+        if cache is None:
+            return send()
+        return cache.get_or_call(make_key(model, messages, dict(params, url=url)), send)
+
+    def stats(self) -> Dict[str, float]:
+        """返回连接池复用与等待时间统计，以及重试/限流/熔断计数。"""
+        stats = self.pool_stats.snapshot()
+        stats.update(self.resilience.snapshot())
+        stats["breaker_trips"] = self.breaker.trips
+        stats["current_rps"] = self.limiter.current_rps if self.limiter is not None else None
+        return stats
+
+    def close(self):
+        self.session.close()
+
+
+_client: Optional[PooledClient] = None
+_client_lock = threading.Lock()
+
+
+def configure(**kwargs) -> PooledClient:
+    """按给定参数（重新）创建全局共享客户端，参数同 PooledClient。"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = PooledClient(**kwargs)
+        return _client
+
+
+def get_client() -> PooledClient:
+    """获取全局共享客户端；首次调用时按默认参数创建。"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = PooledClient()
+    return _client
+
+
+def format_stats(stats: Dict[str, float]) -> str:
+    """把统计字典格式化成一行便于打印的文本。"""
+    return (f"连接池: 请求 {stats['requests']} 次, 新建连接 {stats['new_connections']} 条, "
+            f"复用 {stats['reused']} 次 ({stats['reuse_rate']:.0%}), "
+            f"平均等待 {stats['wait_avg_s'] * 1000:.2f} ms, 最长等待 {stats['wait_max_s'] * 1000:.2f} ms; "
+            f"重试 {stats.get('retries', 0)} 次 (429: {stats.get('throttled', 0)}, "
+            f"5xx: {stats.get('server_errors', 0)}, 网络: {stats.get('network_errors', 0)}), "
+            f"熔断 {stats.get('breaker_trips', 0)} 次")
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+本地模拟的硅基流动服务：无需 API Key 和网络即可运行各工具、做压测。
+
+支持的接口（请求/响应格式与线上一致）：
+- POST /v1/chat/completions      聊天补全，支持 "stream": true（SSE 逐段返回）
+- POST /v1/images/generations    图片生成，返回指向本服务的图片 URL
+- GET  /files/<name>.png         下载生成的“图片”（一个很小的 PNG）
+
+可注入的延迟与故障（见 MockConfig）：
+- 延迟分布：fixed / uniform / exp / lognormal，流式输出按 tokens_per_s 逐段发送；
+- 限流：rps_limit 超出时返回 429（带 Retry-After），另可按 rate_429 随机返回 429；
+- 服务端错误：按 rate_5xx 随机返回 503；
+- 格式错误：按 malformed_rate 返回截断的响应体（HTTP 200，但不是合法 JSON）；
+  按 bad_json_rate 让抽取类请求（系统提示要求输出 JSON）的回复内容带代码围栏和多余逗号；
+  打包抽取（系统提示要求 JSON array）按用户消息中 [1]、[2]… 的条数返回数组，
+  出错时条数为奇数带多余逗号、为偶数则截断，分别触发本地修复与拆分重试。
+
+用法：
+    python -m sflib.mock_server --port 8000 --latency lognormal --latency-ms 300 --rate-429 0.05
+
+或在代码中：
+    with MockServer(MockConfig(latency_ms=50)) as server:
+        url = server.url + "/v1/chat/completions"
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+from .tokens import estimate_tokens
+
+
+CHAT_PATH = "/v1/chat/completions"
+IMAGES_PATH = "/v1/images/generations"
+FILES_PREFIX = "/files/"
+
+# 1x1 像素的 PNG，作为生成图片的下载内容
+_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489"
+    "0000000d49444154789c6360000002000001e221bc330000000049454e44ae426082"
+)
+
+
+class MockConfig:
+    """模拟服务的行为参数。各 *_rate 为 0~1 之间的概率。"""
+
+    def __init__(self,
+                 latency: str = "lognormal",
+                 latency_ms: float = 200.0,
+                 latency_sigma: float = 0.5,
+                 tokens_per_s: float = 200.0,
+                 completion_tokens: int = 60,
+                 rps_limit: Optional[float] = None,
+                 rate_429: float = 0.0,
+                 rate_5xx: float = 0.0,
+                 malformed_rate: float = 0.0,
+                 bad_json_rate: float = 0.0,
+                 image_latency_ms: float = 1000.0,
+                 seed: Optional[int] = None):
+        self.latency = latency              # 首字节前的等待时间分布
+        self.latency_ms = latency_ms        # fixed/uniform/exp 为均值，lognormal 为中位数
+        self.latency_sigma = latency_sigma  # lognormal 的形状参数，越大长尾越明显
+        self.tokens_per_s = tokens_per_s    # 生成速度：流式输出的节奏，以及非流式回复的额外耗时
+        self.completion_tokens = completion_tokens  # 默认回复长度（不超过请求的 max_tokens）
+        self.rps_limit = rps_limit
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.malformed_rate = malformed_rate
+        self.bad_json_rate = bad_json_rate
+        self.image_latency_ms = image_latency_ms
+        self.seed = seed
+
+
+class _Bucket:
+    """服务端限流用的令牌桶：取不到令牌就拒绝（返回 429），而不是等待。"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = max(rate, 1.0)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def try_take(self) -> bool:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(max(self.rate, 1.0), self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return True
+            return False
+
+
+class MockServer:
+    """在后台线程中运行的模拟服务，可作为上下文管理器使用。"""
+
+    def __init__(self, config: Optional[MockConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or MockConfig()
+        self._rng = random.Random(self.config.seed)
+        self._rng_lock = threading.Lock()
+        self._bucket = _Bucket(self.config.rps_limit) if self.config.rps_limit else None
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {
+            "requests": 0, "chat": 0, "stream": 0, "images": 0, "files": 0,
+            "throttled": 0, "server_errors": 0, "malformed": 0, "bad_json": 0,
+        }
+        self._httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_forever(self):
+        """在当前线程中运行（命令行模式）。"""
+        self._httpd.serve_forever()
+
+    def start(self) -> "MockServer":
+        """在后台线程中运行，立即返回。"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "MockServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def add(self, name: str):
+        with self._lock:
+            self.counts[name] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
+
+    def chance(self, p: float) -> bool:
+        if p <= 0:
+            return False
+        with self._rng_lock:
+            return self._rng.random() < p
+
+    def sample_latency(self, mean_ms: Optional[float] = None) -> float:
+        """按配置的分布抽取一次延迟（秒）。"""
+        cfg = self.config
+        m = cfg.latency_ms if mean_ms is None else mean_ms
+        with self._rng_lock:
+            if cfg.latency == "fixed":
+                ms = m
+            elif cfg.latency == "uniform":
+                ms = self._rng.uniform(0, 2 * m)
+            elif cfg.latency == "exp":
+                ms = self._rng.expovariate(1.0 / m) if m > 0 else 0.0
+            else:
+                ms = m * math.exp(cfg.latency_sigma * self._rng.gauss(0, 1))
+        return max(ms, 0.0) / 1000.0
+
+    def admit(self) -> Optional[int]:
+        """决定本次请求是否注入错误：返回要返回的错误状态码，None 表示正常处理。"""
+        if self._bucket is not None and not self._bucket.try_take():
+            return 429
+        if self.chance(self.config.rate_429):
+            return 429
+        if self.chance(self.config.rate_5xx):
+            return 503
+        return None
+
+
+_FIELDS = '"person": "李雷", "company": "示例科技", "date": "2025-10", "location": "上海"'
+_SLOT_RE = re.compile(r"^\[\d+\]", re.M)
+
+
+def _reply_text(server: MockServer, messages, n_tokens: int) -> str:
+    """构造回复内容：抽取类请求返回 JSON，其余返回与长度匹配的占位文本。"""
+    system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+    if "JSON array" in system:
+        # 打包抽取：按用户消息里 [1]、[2]… 的编号逐条返回
+        user = next((m.get("content", "") for m in messages if m.get("role") == "user"), "")
+        slots = len(_SLOT_RE.findall(user)) or 1
+        obj = "[" + ", ".join(f'{{"slot": {i}, {_FIELDS}}}' for i in range(1, slots + 1)) + "]"
+        if server.chance(server.config.bad_json_rate):
+            server.add("bad_json")
+            return "```json\n" + obj[:-1] + ",]\n```" if slots % 2 else obj[:obj.rfind("{")]
+        return obj
+    if "JSON" in system or "json" in system:
+        obj = "{" + _FIELDS + "}"
+        if server.chance(server.config.bad_json_rate):
+            server.add("bad_json")
+            return "```json\n" + obj[:-1] + ",}\n```"
+        return obj
+    return " ".join(f"w{i}" for i in range(n_tokens))
+
+
+def _make_handler(server: MockServer):
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # 支持长连接，便于观察客户端连接池的复用
+
+        def log_message(self, *args):
+            pass
+
+        def handle(self):
+            try:
+                super().handle()
+            except (ConnectionResetError, BrokenPipeError):
+                pass  # 客户端提前断开（如流式读到 [DONE] 即关闭）属于正常情况
+
+        def _send(self, status: int, body: bytes, content_type: str = "application/json",
+                  headers: Optional[Dict[str, str]] = None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_json(self, status: int, obj, headers=None):
+            self._send(status, json.dumps(obj, ensure_ascii=False).encode("utf-8"), headers=headers)
+
+        def _error(self, status: int):
+            if status == 429:
+                server.add("throttled")
+                self._send_json(429, {"message": "rate limited (mock)"}, {"Retry-After": "0.2"})
+            else:
+                server.add("server_errors")
+                self._send_json(status, {"message": "service unavailable (mock)"})
+
+        def _read_json(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def do_GET(self):
+            server.add("requests")
+            if self.path.startswith(FILES_PREFIX):
+                server.add("files")
+                self._send(200, _PNG, "image/png")
+            else:
+                self._send_json(404, {"message": "not found"})
+
+        def do_POST(self):
+            server.add("requests")
+            try:
+                body = self._read_json()
+            except ValueError:
+                self._send_json(400, {"message": "invalid JSON body"})
+                return
+            if self.path == CHAT_PATH:
+                self._chat(body)
+            elif self.path == IMAGES_PATH:
+                self._images(body)
+            else:
+                self._send_json(404, {"message": "not found"})
+
+        def _chat(self, body):
+            server.add("chat")
+            status = server.admit()
+            if status is not None:
+                self._error(status)
+                return
+            messages = body.get("messages") or []
+            prompt_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in messages)
+            n_tokens = min(server.config.completion_tokens, int(body.get("max_tokens") or 1 << 30))
+            text = _reply_text(server, messages, n_tokens)
+            completion_tokens = estimate_tokens(text)
+            usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                     "total_tokens": prompt_tokens + completion_tokens}
+            time.sleep(server.sample_latency())
+            if body.get("stream"):
+                self._stream(body, text, usage)
+                return
+            time.sleep(completion_tokens / server.config.tokens_per_s)
+            if server.chance(server.config.malformed_rate):
+                server.add("malformed")
+                self._send(200, b'{"id": "mock", "choices": [{"message": {"content": "')
+                return
+            self._send_json(200, {
+                "id": "mock-chat",
+                "object": "chat.completion",
+                "model": body.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                             "finish_reason": "stop"}],
+                "usage": usage,
+            })
+
+        def _stream(self, body, text, usage):
+            """以 SSE 分块返回：每个空格分隔的片段一个事件，最后一个事件附带 usage。"""
+            server.add("stream")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def write_chunk(data: bytes):
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            pieces = text.split(" ")
+            delay = 1.0 / server.config.tokens_per_s
+            for i, piece in enumerate(pieces):
+                event = {"id": "mock-chat", "model": body.get("model"),
+                         "choices": [{"index": 0, "delta": {"content": piece if i == 0 else " " + piece}}]}
+                if i == len(pieces) - 1:
+                    event["usage"] = usage
+                write_chunk(b"data: " + json.dumps(event, ensure_ascii=False).encode("utf-8") + b"\n\n")
+                time.sleep(delay)
+            write_chunk(b"data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _images(self, body):
+            server.add("images")
+            status = server.admit()
+            if status is not None:
+                self._error(status)
+                return
+            time.sleep(server.sample_latency(server.config.image_latency_ms))
+            n = max(1, min(int(body.get("n") or 1), 4))
+            host = self.headers.get("Host") or "127.0.0.1"
+            stamp = int(time.time() * 1000)
+            images = [{"url": f"http://{host}{FILES_PREFIX}{stamp}-{i}.png"} for i in range(n)]
+            self._send_json(200, {"images": images, "data": images,
+                                  "timings": {"inference": 0.0}, "seed": 0})
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟的硅基流动服务")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=str, choices=["fixed", "uniform", "exp", "lognormal"], default="lognormal")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="首字节延迟：均值（lognormal 为中位数）")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="lognormal 分布的形状参数")
+    parser.add_argument("--tokens-per-s", type=float, default=200.0, help="模拟的生成速度")
+    parser.add_argument("--completion-tokens", type=int, default=60, help="默认回复长度")
+    parser.add_argument("--rps-limit", type=float, default=None, help="每秒请求数上限，超出返回 429")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="随机返回 429 的概率")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="随机返回 503 的概率")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="返回截断响应体的概率")
+    parser.add_argument("--bad-json-rate", type=float, default=0.0, help="抽取类回复内容格式错误的概率")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    config = MockConfig(args.latency, args.latency_ms, args.latency_sigma, args.tokens_per_s,
+                        args.completion_tokens, args.rps_limit, args.rate_429, args.rate_5xx,
+                        args.malformed_rate, args.bad_json_rate, seed=args.seed)
+    server = MockServer(config, args.host, args.port)
+    print(f"模拟服务已启动: {server.url}{CHAT_PATH}  （Ctrl+C 退出）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(server.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+"""
+有界并发的有序映射：把多个独立的API调用并行发出，结果按输入顺序返回。
+
+调用大模型是典型的 I/O 密集任务，线程池即可把等待时间重叠起来；
+并发数上限同时也是对服务端的保护，建议不超过连接池的 pool_maxsize。
+ordered_map_async 是协程版本，用信号量限制在途数，不占用额外线程；
+ordered_imap 是流式版本，边读输入边提交、按顺序逐个产出结果，适合处理不能整体放进内存的大文件。
+"""
+
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Iterable, Iterator, List, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+DEFAULT_CONCURRENCY = 4
+
+
+def ordered_map(fn: Callable[[T], R], items: Iterable[T], concurrency: int = DEFAULT_CONCURRENCY) -> List[R]:
+    """并发执行 fn(item)，返回与 items 顺序一致的结果列表。
+
+    - concurrency <= 1 时退化为顺序执行，便于调试；
+    - 任一调用抛出异常时，异常会在取结果时原样抛出。
+    """
+    items = list(items)
+    if concurrency <= 1 or len(items) <= 1:
+        return [fn(it) for it in items]
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(items))) as ex:
+        # Executor.map 按提交顺序产出结果，全部返回后即可进入下一阶段
+        return list(ex.map(fn, items))
+
+
+def ordered_imap(fn: Callable[[T], R], items: Iterable[T], concurrency: int = DEFAULT_CONCURRENCY) -> Iterator[R]:
+    """ordered_map 的流式版本：按需从 items 取条目并发执行，按输入顺序逐个产出结果。
+
+    已提交但尚未产出的条目最多 2×concurrency 个，items 可以是惰性生成器，
+    内存占用与输入总量无关；第一个结果就绪即可产出，不必等全部完成。
+    """
+    if concurrency <= 1:
+        for it in items:
+            yield fn(it)
+        return
+    window = concurrency * 2
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        pending = deque()
+        try:
+            for it in items:
+                pending.append(ex.submit(fn, it))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # 调用方提前停止或出错时，取消还没开始执行的条目
+            for fut in pending:
+                fut.cancel()
+
+
+async def ordered_map_async(fn: Callable[[T], Awaitable[R]], items: Iterable[T],
+                            concurrency: int = DEFAULT_CONCURRENCY) -> List[R]:
+    """ordered_map 的协程版本：并发 await fn(item)，最多 concurrency 个同时在途，结果按输入顺序返回。"""
+    sem = asyncio.Semaphore(max(concurrency, 1))
+
+    async def run(item):
+        async with sem:
+            return await fn(item)
+
+    return list(await asyncio.gather(*(run(it) for it in items)))
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+
+"""
+客户端限流、重试与熔断：让并发批处理在触及服务商限额时平稳降速，而不是成片失败。
+
+- TokenBucket / RateLimiter：令牌桶，同时限制每秒请求数（RPS）和每分钟 token 数（TPM）。
+  采用“预约”方式：先扣令牌（可以扣成负数），再按欠额计算需要等待的时间，
+  因此同一个限流器既能被多个线程阻塞等待（acquire），也能在 asyncio 中等待（acquire_async）。
+  收到 429 时把 RPS 降到 70%，之后每次成功再逐步恢复（加性增、乘性减），吞吐会稳定在服务商的上限附近。
+- RetryPolicy：指数退避 + 全抖动（full jitter）；服务端给出 Retry-After 时以其为准。
+- CircuitBreaker：连续失败达到阈值后熔断一段时间，期间直接报错而不再打到服务端；
+  冷却结束后放行一个探测请求，成功则恢复。
+"""
+
+import asyncio
+import email.utils
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+DEFAULT_RPS = 20.0           # 每秒请求数上限（收到 429 后会自动下调）
+DEFAULT_TPM = None           # 每分钟 token 上限，None 表示不限制
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_TIMEOUT = 30.0
+
+
+class CircuitOpenError(requests.RequestException):
+    """熔断器处于打开状态，请求未发出。"""
+
+
+class TokenBucket:
+    """线程安全的令牌桶，rate 为每秒补充的令牌数，capacity 为桶容量（允许的突发量）。"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """预约 amount 个令牌，返回调用方需要等待的秒数（0 表示可以立即发出）。"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class RateLimiter:
+    """同时按请求数和 token 数限流，并根据 429 自适应调整请求速率。"""
+
+    def __init__(self, requests_per_s: float = DEFAULT_RPS, tokens_per_min: Optional[float] = DEFAULT_TPM):
+        self.max_rps = requests_per_s
+        self.min_rps = max(requests_per_s / 32, 0.1)
+        self.requests = TokenBucket(requests_per_s, max(requests_per_s, 1.0))
+        self.tokens = TokenBucket(tokens_per_min / 60.0, tokens_per_min) if tokens_per_min else None
+        self._last_cut = 0.0
+        self._last_raise = 0.0
+
+    def reserve(self, est_tokens: int = 0) -> float:
+        wait = self.requests.reserve(1.0)
+        if self.tokens is not None and est_tokens:
+            wait = max(wait, self.tokens.reserve(min(est_tokens, self.tokens.capacity)))
+        return wait
+
+    def acquire(self, est_tokens: int = 0):
+        """阻塞直到可以发出请求（线程中使用）。"""
+        wait = self.reserve(est_tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, est_tokens: int = 0):
+        """协程版本：等待期间不阻塞事件循环。"""
+        wait = self.reserve(est_tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def on_throttled(self):
+        """收到 429：请求速率降到 70%（乘性减）。
+
+        并发请求往往同时收到一批 429，它们反映的是同一次超限，因此每秒最多下调一次。
+        """
+        with self.requests._lock:
+            now = time.monotonic()
+            if now - self._last_cut < 1.0:
+                return
+            self._last_cut = now
+            self.requests.rate = max(self.min_rps, self.requests.rate * 0.7)
+
+    def on_success(self):
+        """请求成功：请求速率逐步回升（加性增），每秒最多上调一次，不超过配置的上限。"""
+        with self.requests._lock:
+            now = time.monotonic()
+            if self.requests.rate >= self.max_rps or now - self._last_raise < 1.0 or now - self._last_cut < 1.0:
+                return
+            self._last_raise = now
+            self.requests.rate = min(self.max_rps, self.requests.rate + self.max_rps / 20)
+
+    @property
+    def current_rps(self) -> float:
+        return self.requests.rate
+
+
+class RetryPolicy:
+    """指数退避 + 全抖动；retry_after 优先。"""
+
+    def __init__(self, max_retries: int = DEFAULT_MAX_RETRIES, base_delay: float = 0.5, max_delay: float = 30.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 头：可能是秒数，也可能是 HTTP 日期。"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(when.timestamp() - time.time(), 0.0)
+
+
+class CircuitBreaker:
+    """连续失败 failure_threshold 次后熔断 reset_timeout 秒；之后放行一个探测请求（半开状态）。"""
+
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+                 reset_timeout: float = DEFAULT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def before_request(self) -> bool:
+        """请求前检查；熔断期间抛出 CircuitOpenError。返回 True 表示本次请求是半开状态下的探测请求。"""
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._probing:
+                raise CircuitOpenError("circuit breaker is open; upstream is failing, try again later")
+            self._probing = True  # 半开：只放行一个探测请求
+            return True
+
+    def release_probe(self):
+        """探测请求没有得出结论（429 限流、被取消等）：保持半开，允许下一个请求重新探测。"""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._probing:
+                    self.trips += 1
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+class ResilienceStats:
+    """重试/限流/熔断计数。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {"retries": 0, "throttled": 0, "server_errors": 0, "network_errors": 0}
+
+    def add(self, name: str):
+        with self._lock:
+            self.counts[name] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts)
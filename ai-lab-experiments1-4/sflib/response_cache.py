@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+"""
+聊天补全响应缓存：按 (model, messages, 参数) 的内容哈希缓存完整响应，并合并相同的在途请求。
+
+- 内存层：LRU，容量由 max_entries 控制；
+- 磁盘层（可选）：SQLite 文件，进程重启后仍可命中，可设置过期时间；
+- 请求合并：N 个线程同时发出完全相同的请求时，只有第一个真正调用上游，
+  其余线程等待并共享同一个结果（失败时同样共享异常，且不写入缓存）。
+
+缓存是按调用点显式开启的：把 ResponseCache 实例传给 PooledClient.chat(..., cache=...)
+（异步客户端 AsyncClient.chat 同样支持）。
+只适合确定性较强的任务（抽取、摘要、情感分析）；开放式聊天不应缓存。
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict, Optional
+
+
+DEFAULT_MAX_ENTRIES = 1024
+
+
+def make_key(model: str, messages, params: Optional[dict] = None) -> str:
+    """对 (model, messages, params) 做规范化 JSON 序列化后取 SHA-256。"""
+    raw = json.dumps({"model": model, "messages": messages, "params": params or {}},
+                     ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """两级（内存 LRU + 可选 SQLite）响应缓存，附带在途请求合并。线程安全。"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 disk_path: Optional[str] = None,
+                 ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, dict]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._db = None
+        if disk_path:
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS responses ("
+                             " key TEXT PRIMARY KEY, body TEXT NOT NULL, created REAL NOT NULL)")
+            self._db.commit()
+        self.metrics = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0}
+
+    def _memory_put(self, key: str, value: dict):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, key: str) -> Optional[dict]:
+        """在持有锁的情况下查内存层和磁盘层。"""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.metrics["memory_hits"] += 1
+            return self._memory[key]
+        if self._db is not None:
+            row = self._db.execute("SELECT body, created FROM responses WHERE key=?", (key,)).fetchone()
+            if row is not None:
+                if self.ttl_seconds is None or time.time() - row[1] <= self.ttl_seconds:
+                    value = json.loads(row[0])
+                    self._memory_put(key, value)
+                    self.metrics["disk_hits"] += 1
+                    return value
+                self._db.execute("DELETE FROM responses WHERE key=?", (key,))
+                self._db.commit()
+        return None
+
+    def _claim(self, key: str):
+        """返回 (缓存值, 在途 Future, 是否由本调用方负责请求)。"""
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                return value, None, False
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self.metrics["coalesced"] += 1
+                return None, fut, False
+            fut = Future()
+            self._inflight[key] = fut
+            self.metrics["misses"] += 1
+            return None, fut, True
+
+    def _fail(self, key: str, fut: Future, e: BaseException):
+        with self._lock:
+            self._inflight.pop(key, None)
+        fut.set_exception(e)
+
+    def get_or_call(self, key: str, fn: Callable[[], dict]) -> dict:
+        """命中缓存直接返回；相同请求在途时等待其结果；否则调用 fn 并写入缓存。"""
+        value, fut, owner = self._claim(key)
+        if value is not None:
+            return value
+        if not owner:
+            return fut.result()
+
+        try:
+            value = fn()
+        except BaseException as e:
+            self._fail(key, fut, e)
+            raise
+        self._store(key, fut, value)
+        return value
+
+    async def get_or_call_async(self, key: str, fn: Callable[[], Awaitable[dict]]) -> dict:
+        """get_or_call 的协程版本：fn 返回协程；等待在途请求时不阻塞事件循环。
+
+        与同步版本共用在途表，线程与协程发出的相同请求同样会被合并。
+        """
+        value, fut, owner = self._claim(key)
+        if value is not None:
+            return value
+        if not owner:
+            return await asyncio.wrap_future(fut)
+
+        try:
+            value = await fn()
+        except BaseException as e:
+            self._fail(key, fut, e)
+            raise
+        self._store(key, fut, value)
+        return value
+
+    def _store(self, key: str, fut: Future, value: dict):
+        with self._lock:
+            self._memory_put(key, value)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO responses(key, body, created) VALUES (?,?,?)",
+                                 (key, json.dumps(value, ensure_ascii=False), time.time()))
+                self._db.commit()
+            self._inflight.pop(key, None)
+        fut.set_result(value)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            m = dict(self.metrics)
+        lookups = sum(m.values())
+        m["hit_rate"] = (m["memory_hits"] + m["disk_hits"] + m["coalesced"]) / lookups if lookups else 0.0
+        return m
+
+    def close(self):
+        if self._db is not None:
+            with self._lock:
+                self._db.close()
+                self._db = None
+
+
+def format_cache_stats(stats: Dict[str, float]) -> str:
+    return (f"响应缓存: 内存命中 {stats['memory_hits']}, 磁盘命中 {stats['disk_hits']}, "
+            f"合并请求 {stats['coalesced']}, 未命中 {stats['misses']} (命中率 {stats['hit_rate']:.0%})")
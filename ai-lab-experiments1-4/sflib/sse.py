@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+"""
+流式聊天补全（Server-Sent Events）：边接收边输出，同时统计首字延迟与生成速度。
+
+请求体设置 "stream": true 后，服务端按 SSE 格式逐行返回：
+    data: {"choices":[{"delta":{"content":"你"}}]}
+    data: {"choices":[{"delta":{"content":"好"}}], "usage": {...}}
+    data: [DONE]
+"""
+
+import json
+import time
+from typing import Callable, Dict, Iterator, Optional
+
+from .http_client import API_URL, get_client
+
+
+def iter_sse_events(response) -> Iterator[Dict]:
+    """逐个产出 SSE 事件中 data 字段解析后的 JSON，遇到 [DONE] 结束。"""
+    for line in response.iter_lines(decode_unicode=False):
+        if not line or not line.startswith(b"data:"):
+            continue  # 空行是事件分隔符；": keep-alive" 等注释行直接忽略
+        payload = line[5:].strip()
+        if payload == b"[DONE]":
+            return
+        yield json.loads(payload)
+
+
+class StreamResult:
+    """一次流式回复的完整文本与耗时统计。"""
+
+    def __init__(self):
+        self.text = ""
+        self.ttft: Optional[float] = None   # 首个 token 到达耗时（秒）
+        self.elapsed = 0.0                  # 总耗时（秒）
+        self.completion_tokens = 0          # 生成的 token 数（优先使用服务端 usage）
+
+    @property
+    def tokens_per_s(self) -> float:
+        gen_time = self.elapsed - (self.ttft or 0.0)
+        return self.completion_tokens / gen_time if gen_time > 0 else 0.0
+
+    def summary(self) -> str:
+        ttft = f"{self.ttft:.2f}s" if self.ttft is not None else "-"
+        return f"首字 {ttft}, {self.completion_tokens} tokens, {self.tokens_per_s:.1f} tokens/s"
+
+
+def stream_chat(messages, model: str, api_key: str, url: str = API_URL,
+                on_delta: Optional[Callable[[str], None]] = None,
+                timeout=None, **params) -> StreamResult:
+    """以流式方式调用聊天补全；每收到一段文本就调用 on_delta，返回完整结果与统计。"""
+    data = {"model": model, "messages": messages, "stream": True}
+    data.update(params)
+    result = StreamResult()
+    t0 = time.perf_counter()
+    # 429/5xx 会在开始接收正文之前重试；一旦开始输出就不再重试，避免重复打印
+    resp = get_client().post_with_retry(url, api_key, data, timeout=timeout, stream=True)
+    try:
+        resp.raise_for_status()
+        pieces = []
+        deltas = 0
+        for event in iter_sse_events(resp):
+            usage = event.get("usage")
+            if usage and usage.get("completion_tokens"):
+                result.completion_tokens = usage["completion_tokens"]
+                if hasattr(resp, "telemetry"):
+                    resp.telemetry.set_usage(usage)  # 开启 telemetry 时把用量补充到本次请求的记录中
+            choices = event.get("choices") or []
+            if not choices:
+                continue
+            piece = (choices[0].get("delta") or {}).get("content") or ""
+            if not piece:
+                continue
+            if result.ttft is None:
+                result.ttft = time.perf_counter() - t0
+            deltas += 1
+            pieces.append(piece)
+            if on_delta is not None:
+                on_delta(piece)
+        result.text = "".join(pieces)
+        if not result.completion_tokens:
+            result.completion_tokens = deltas  # 服务端未返回 usage 时，按增量条数近似
+    finally:
+        resp.close()  # 归还连接到连接池
+    result.elapsed = time.perf_counter() - t0
+    return result
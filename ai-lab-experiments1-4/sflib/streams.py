@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+
+"""
+命令行工具的流式输入输出：--input / --output 可以是文件路径，也可以是 "-"（标准输入/标准输出）。
+
+统一按 UTF-8 打开，返回带缓冲的文本流；配合 sflib.chunker.iter_chunks 按块读取，
+输入多大都只占用固定的内存。标准输入/输出以 closefd=False 打开，关闭返回的流不会关掉进程的 stdin/stdout。
+"""
+
+import sys
+from typing import TextIO
+
+STDIO = "-"
+
+
+def open_input(path: str) -> TextIO:
+    """打开输入文本流；path 为 "-" 时读标准输入。"""
+    if path == STDIO:
+        return open(sys.stdin.fileno(), encoding="utf-8", closefd=False)
+    return open(path, encoding="utf-8")
+
+
+def open_output(path: str) -> TextIO:
+    """打开输出文本流；path 为 "-" 时写标准输出。"""
+    if path == STDIO:
+        sys.stdout.flush()
+        return open(sys.stdout.fileno(), "w", encoding="utf-8", closefd=False)
+    return open(path, "w", encoding="utf-8")
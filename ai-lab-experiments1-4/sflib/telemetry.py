@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+
+"""
+逐请求的耗时与用量记录：每次聊天/图片/下载请求结束后生成一条 RequestRecord，分发给已注册的输出端。
+
+记录内容：
+- 耗时：DNS 解析、建立连接（TCP+TLS，复用连接时为 0）、首字节（TTFB）、总耗时，以及从连接池取连接的等待；
+- 大小：请求体与响应体字节数；
+- 用量：响应中 usage 的 prompt/completion/total tokens（流式请求取最后一个事件中的 usage）；
+- 其它：接口类型（chat/images/download）、模型、状态码、第几次尝试、提示词开头（便于定位昂贵的提示词）。
+
+输出端（sink）可任意组合：
+- JsonlSink：每条记录一行 JSON，便于事后用 pandas 等分析；
+- HistogramSink：内存中的延迟直方图与累计用量，summary() 给出分位数、最慢请求与最贵提示词；
+- PrometheusSink：在直方图基础上输出 Prometheus 文本格式，可写入 node_exporter 的 textfile 目录。
+
+没有注册任何输出端时不做额外工作（不解析 usage、不复制数据）。
+"""
+
+import heapq
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+# 延迟直方图的桶上界（秒）
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf"))
+TOP_N = 5
+PREVIEW_CHARS = 40
+
+
+class RequestRecord:
+    """一次 HTTP 请求的耗时与用量。"""
+
+    FIELDS = ("ts", "kind", "model", "status", "attempt", "error",
+              "pool_wait_s", "dns_s", "connect_s", "ttfb_s", "total_s",
+              "request_bytes", "response_bytes",
+              "prompt_tokens", "completion_tokens", "total_tokens", "prompt_preview")
+
+    def __init__(self, kind: str, model: Optional[str] = None, attempt: int = 0,
+                 request_bytes: int = 0, prompt_preview: str = ""):
+        self.ts = time.time()
+        self.kind = kind
+        self.model = model
+        self.status: Optional[int] = None
+        self.attempt = attempt
+        self.error: Optional[str] = None
+        self.pool_wait_s = 0.0
+        self.dns_s = 0.0
+        self.connect_s = 0.0
+        self.ttfb_s = 0.0
+        self.total_s = 0.0
+        self.request_bytes = request_bytes
+        self.response_bytes = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.total_tokens = 0
+        self.prompt_preview = prompt_preview
+
+    def set_usage(self, usage: Optional[dict]):
+        if not usage:
+            return
+        self.prompt_tokens = int(usage.get("prompt_tokens") or 0)
+        self.completion_tokens = int(usage.get("completion_tokens") or 0)
+        self.total_tokens = int(usage.get("total_tokens") or self.prompt_tokens + self.completion_tokens)
+
+    def to_dict(self) -> Dict[str, object]:
+        d = {name: getattr(self, name) for name in self.FIELDS}
+        for name in ("pool_wait_s", "dns_s", "connect_s", "ttfb_s", "total_s"):
+            d[name] = round(d[name], 6)
+        return d
+
+
+def describe_request(url: str, body: Optional[dict]):
+    """根据 URL 与请求体得到 (接口类型, 模型, 提示词开头)。"""
+    kind = "chat" if "/chat/" in url else "images" if "/images/" in url else "other"
+    body = body or {}
+    preview = ""
+    messages = body.get("messages")
+    if messages:
+        preview = str(messages[-1].get("content", ""))
+    elif body.get("prompt"):
+        preview = str(body["prompt"])
+    preview = " ".join(preview.split())[:PREVIEW_CHARS]
+    return kind, body.get("model"), preview
+
+
+class JsonlSink:
+    """把每条记录追加写入 JSONL 文件。"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._f = open(path, "a", encoding="utf-8")
+
+    def emit(self, record: RequestRecord):
+        line = json.dumps(record.to_dict(), ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._f.write(line + "\n")
+            self._f.flush()
+
+    def close(self):
+        with self._lock:
+            self._f.close()
+
+
+class _Series:
+    """单个接口类型的计数与直方图。"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_buckets = [0] * len(LATENCY_BUCKETS)
+        self.ttfb_buckets = [0] * len(LATENCY_BUCKETS)
+        self.total_sum = 0.0
+        self.ttfb_sum = 0.0
+        self.dns_sum = 0.0
+        self.connect_sum = 0.0
+        self.new_connections = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+
+def _observe(buckets: List[int], value: float):
+    for i, upper in enumerate(LATENCY_BUCKETS):
+        if value <= upper:
+            buckets[i] += 1
+            return
+
+
+def bucket_quantile(buckets: List[int], q: float) -> float:
+    """由直方图估算分位数：在落入的桶内线性插值（与 Prometheus histogram_quantile 相同）。"""
+    total = sum(buckets)
+    if not total:
+        return 0.0
+    rank = q * total
+    seen = 0
+    lower = 0.0
+    for upper, n in zip(LATENCY_BUCKETS, buckets):
+        if n and seen + n >= rank:
+            if upper == float("inf"):
+                return lower
+            return lower + (upper - lower) * (rank - seen) / n
+        seen += n
+        if upper != float("inf"):
+            lower = upper
+    return lower
+
+
+class HistogramSink:
+    """内存中的延迟直方图与累计用量，并保留最慢的请求和 token 最多的提示词。"""
+
+    def __init__(self, top_n: int = TOP_N):
+        self.top_n = top_n
+        self._lock = threading.Lock()
+        self.series: Dict[str, _Series] = {}
+        self._slowest: List = []     # 小顶堆：(总耗时, 序号, 记录)
+        self._expensive: List = []   # 小顶堆：(prompt tokens, 序号, 记录)
+        self._seq = 0
+
+    def emit(self, record: RequestRecord):
+        with self._lock:
+            s = self.series.setdefault(record.kind, _Series())
+            s.count += 1
+            if record.error or (record.status is not None and record.status >= 400):
+                s.errors += 1
+            _observe(s.total_buckets, record.total_s)
+            _observe(s.ttfb_buckets, record.ttfb_s)
+            s.total_sum += record.total_s
+            s.ttfb_sum += record.ttfb_s
+            s.dns_sum += record.dns_s
+            s.connect_sum += record.connect_s
+            if record.connect_s > 0:
+                s.new_connections += 1
+            s.request_bytes += record.request_bytes
+            s.response_bytes += record.response_bytes
+            s.prompt_tokens += record.prompt_tokens
+            s.completion_tokens += record.completion_tokens
+            self._seq += 1
+            self._push(self._slowest, record.total_s, record)
+            if record.prompt_tokens:
+                self._push(self._expensive, record.prompt_tokens, record)
+
+    def _push(self, heap: List, key, record: RequestRecord):
+        item = (key, self._seq, record)
+        if len(heap) < self.top_n:
+            heapq.heappush(heap, item)
+        elif key > heap[0][0]:
+            heapq.heapreplace(heap, item)
+
+    def slowest(self) -> List[RequestRecord]:
+        with self._lock:
+            return [r for _, _, r in sorted(self._slowest, reverse=True)]
+
+    def most_expensive(self) -> List[RequestRecord]:
+        with self._lock:
+            return [r for _, _, r in sorted(self._expensive, reverse=True)]
+
+    def summary(self) -> str:
+        """多行文本：按接口类型汇总，再列出最慢的请求和 token 最多的提示词。"""
+        with self._lock:
+            series = {k: v for k, v in sorted(self.series.items())}
+            lines = ["请求统计:"]
+            for kind, s in series.items():
+                lines.append(
+                    f"  {kind:<9} {s.count} 次 (失败 {s.errors}), "
+                    f"总耗时 p50 {bucket_quantile(s.total_buckets, 0.5):.2f}s / p99 {bucket_quantile(s.total_buckets, 0.99):.2f}s, "
+                    f"首字节 p50 {bucket_quantile(s.ttfb_buckets, 0.5):.2f}s, "
+                    f"新建连接 {s.new_connections} 次 (DNS 共 {s.dns_sum:.2f}s, 连接共 {s.connect_sum:.2f}s), "
+                    f"发送 {s.request_bytes / 1024:.1f} KB / 接收 {s.response_bytes / 1024:.1f} KB, "
+                    f"tokens {s.prompt_tokens} + {s.completion_tokens}")
+        if not series:
+            lines.append("  （没有请求）")
+            return "\n".join(lines)
+        lines.append("最慢的请求:")
+        for r in self.slowest():
+            lines.append(f"  {r.total_s:.2f}s  {r.kind} {r.model or '-'} 首字节 {r.ttfb_s:.2f}s  「{r.prompt_preview}」")
+        expensive = self.most_expensive()
+        if expensive:
+            lines.append("token 最多的提示词:")
+            for r in expensive:
+                lines.append(f"  {r.prompt_tokens} tokens  {r.model or '-'}  「{r.prompt_preview}」")
+        return "\n".join(lines)
+
+    def close(self):
+        pass
+
+
+class PrometheusSink(HistogramSink):
+    """以 Prometheus 文本格式导出；给出 path 时在 close() 时写入文件（原子替换）。"""
+
+    def __init__(self, path: Optional[str] = None, prefix: str = "siliconflow"):
+        super().__init__()
+        self.path = path
+        self.prefix = prefix
+
+    def render(self) -> str:
+        p = self.prefix
+        out = [
+            f"# HELP {p}_request_duration_seconds Total request latency.",
+            f"# TYPE {p}_request_duration_seconds histogram",
+        ]
+        with self._lock:
+            series = dict(self.series)
+            for kind, s in sorted(series.items()):
+                cumulative = 0
+                for upper, n in zip(LATENCY_BUCKETS, s.total_buckets):
+                    cumulative += n
+                    le = "+Inf" if upper == float("inf") else repr(upper)
+                    out.append(f'{p}_request_duration_seconds_bucket{{kind="{kind}",le="{le}"}} {cumulative}')
+                out.append(f'{p}_request_duration_seconds_sum{{kind="{kind}"}} {s.total_sum:.6f}')
+                out.append(f'{p}_request_duration_seconds_count{{kind="{kind}"}} {s.count}')
+            counters = [
+                ("requests_failed_total", "Requests that failed or returned an error status.", "errors"),
+                ("ttfb_seconds_total", "Sum of time to first byte.", "ttfb_sum"),
+                ("dns_seconds_total", "Sum of DNS resolution time.", "dns_sum"),
+                ("connect_seconds_total", "Sum of TCP/TLS connect time.", "connect_sum"),
+                ("request_bytes_total", "Request body bytes sent.", "request_bytes"),
+                ("response_bytes_total", "Response body bytes received.", "response_bytes"),
+                ("prompt_tokens_total", "Prompt tokens reported in usage.", "prompt_tokens"),
+                ("completion_tokens_total", "Completion tokens reported in usage.", "completion_tokens"),
+            ]
+            for name, help_text, attr in counters:
+                out.append(f"# HELP {p}_{name} {help_text}")
+                out.append(f"# TYPE {p}_{name} counter")
+                for kind, s in sorted(series.items()):
+                    out.append(f'{p}_{name}{{kind="{kind}"}} {getattr(s, attr)}')
+        return "\n".join(out) + "\n"
+
+    def close(self):
+        if not self.path:
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp, self.path)
+
+
+_sinks: List = []
+_sinks_lock = threading.Lock()
+
+
+def add_sink(sink):
+    """注册一个输出端（任何带 emit(record) 方法的对象）。"""
+    with _sinks_lock:
+        _sinks.append(sink)
+    return sink
+
+
+def remove_sink(sink):
+    with _sinks_lock:
+        if sink in _sinks:
+            _sinks.remove(sink)
+
+
+def enabled() -> bool:
+    return bool(_sinks)
+
+
+def emit(record: RequestRecord):
+    for sink in list(_sinks):
+        sink.emit(record)
+
+
+def setup(stats: bool = False, jsonl_path: Optional[str] = None,
+          prom_path: Optional[str] = None) -> Optional[HistogramSink]:
+    """按命令行选项注册输出端，返回用于退出时打印摘要的 HistogramSink（未开启 --stats 时为 None）。"""
+    hist = None
+    if jsonl_path:
+        add_sink(JsonlSink(jsonl_path))
+    if prom_path:
+        prom = add_sink(PrometheusSink(prom_path))
+        if stats:
+            hist = prom  # PrometheusSink 本身就是直方图，不必重复统计
+    if stats and hist is None:
+        hist = add_sink(HistogramSink())
+    return hist
+
+
+def shutdown():
+    """关闭并注销所有输出端（写出 Prometheus 文件、关闭 JSONL 文件）。"""
+    with _sinks_lock:
+        sinks = list(_sinks)
+        _sinks.clear()
+    for sink in sinks:
+        sink.close()
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+
+"""
+粗略的 token 数估算（不依赖具体分词器）。
+
+经验值：
+- 中日韩文字：约 1 个字符 ≈ 1 个 token；
+- 英文等拉丁文字：约 4 个字符 ≈ 1 个 token。
+用于在发请求前判断提示词是否会超出预算，精度足够做切分/分组决策。
+"""
+
+import re
+
+# 与 is_cjk 覆盖的区间一致，用正则批量统计比逐字符判断快得多
+_CJK_RE = re.compile("[\u4e00-\u9fff\u3400-\u4dbf\u3000-\u303f\uff00-\uffef\u3040-\u30ff\uac00-\ud7af]")
+
+
+def is_cjk(ch: str) -> bool:
+    """判断字符是否属于中日韩文字或全角标点。"""
+    code = ord(ch)
+    return (0x4E00 <= code <= 0x9FFF      # 中日韩统一表意文字
+            or 0x3400 <= code <= 0x4DBF   # 扩展A
+            or 0x3000 <= code <= 0x303F   # 中日韩标点
+            or 0xFF00 <= code <= 0xFFEF   # 全角字符
+            or 0x3040 <= code <= 0x30FF   # 日文假名
+            or 0xAC00 <= code <= 0xD7AF)  # 韩文音节
+
+
+def estimate_tokens(text: str) -> int:
+    """估算一段文本的 token 数。"""
+    cjk = len(_CJK_RE.findall(text))
+    other = len(text) - cjk
+    return cjk + (other + 3) // 4